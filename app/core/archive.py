@@ -0,0 +1,87 @@
+# app/core/archive.py
+"""
+Date-based lifecycle of reservations.
+
+Booking-time queries (overlap checks, interval index, availability grids) only
+look at today and the future, but every past row still costs them index depth
+and buffer pool. archive_past() moves reservations dated more than
+ARCHIVE_AFTER_DAYS days ago from `reservas` to `reservas_historico` in chunks of
+ARCHIVE_BATCH rows, each its own short transaction, pausing ARCHIVE_PAUSE
+seconds between chunks.
+
+Run it from cron with scripts/archive_reservas.py, or set ARCHIVE_ENABLED=1 to
+have the app lifespan run it every ARCHIVE_INTERVAL seconds. Use one or the
+other, and with several app workers enable ARCHIVE_ENABLED on one only.
+Concurrent archivers are safe but wasteful: a chunk lost to another archiver
+is skipped, not retried (see archive_reservas_chunk). Archived rows are read only when history is requested
+(GET /reservas/mis?historial=true, exports); they can no longer be cancelled or
+updated.
+"""
+import asyncio
+import os
+import random
+import time
+from datetime import date, timedelta
+from typing import Tuple
+
+from app.core.database import SessionLocal
+from app.core.metrics import reservas_archived, reservas_archive_duration
+from app.crud import reserva as crud_reserva
+
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "0").lower() in ("1", "true", "yes")
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", "3600"))
+ARCHIVE_BATCH = int(os.getenv("ARCHIVE_BATCH", "1000"))
+ARCHIVE_PAUSE = float(os.getenv("ARCHIVE_PAUSE", "0.1"))
+
+def archive_cutoff() -> date:
+    """Reservations dated before this day are archived."""
+    return date.today() - timedelta(days=ARCHIVE_AFTER_DAYS)
+
+def _archive_chunk(before: date, batch: int) -> Tuple[int, int]:
+    with SessionLocal() as db:
+        return crud_reserva.archive_reservas_chunk(db, before, batch)
+
+def archive_past_sync(before: date = None, batch: int = ARCHIVE_BATCH, pause: float = ARCHIVE_PAUSE) -> int:
+    """Blocking version for scripts. Returns how many reservations moved."""
+    before = before or archive_cutoff()
+    started = time.perf_counter()
+    moved = 0
+    try:
+        while True:
+            candidates, count = _archive_chunk(before, batch)
+            moved += count
+            reservas_archived.inc(amount=count)
+            if candidates < batch:
+                return moved
+            time.sleep(pause)
+    finally:
+        reservas_archive_duration.observe(time.perf_counter() - started)
+
+async def archive_past() -> int:
+    """One pass from the event loop: chunks run in a worker thread, pauses don't block."""
+    before = archive_cutoff()
+    started = time.perf_counter()
+    moved = 0
+    try:
+        while True:
+            candidates, count = await asyncio.to_thread(_archive_chunk, before, ARCHIVE_BATCH)
+            moved += count
+            reservas_archived.inc(amount=count)
+            if candidates < ARCHIVE_BATCH:
+                return moved
+            await asyncio.sleep(ARCHIVE_PAUSE)
+    finally:
+        reservas_archive_duration.observe(time.perf_counter() - started)
+
+async def archive_loop():
+    """Background task started by the app lifespan when ARCHIVE_ENABLED."""
+    await asyncio.sleep(random.uniform(0, ARCHIVE_INTERVAL))
+    while True:
+        try:
+            moved = await archive_past()
+            if moved:
+                print(f"Archived {moved} reservations dated before {archive_cutoff()}.")
+        except Exception as e:
+            print("Warning: reservation archiving failed:", repr(e))
+        await asyncio.sleep(ARCHIVE_INTERVAL)
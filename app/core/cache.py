@@ -0,0 +1,166 @@
+# app/core/cache.py
+"""
+Small in-process caches with size-bounded LRU and TTL eviction.
+
+Caches are created with build_cache(), which registers them by name so their
+hit/miss counters can be reported together (see cache_stats()). A size or TTL
+of 0 yields a NullCache, which turns caching off without touching callers.
+
+Every invalidation bumps the cache 'version'. Readers capture it before going to
+the DB and pass it back to set(), so a value read while a write was committing
+is dropped instead of being cached stale.
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+
+class CacheBackend(ABC):
+    """Interface shared by the cache implementations."""
+
+    name: str = ""
+    version: int = 0
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Optional[Any]:
+        ...
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any, version: Optional[int] = None):
+        ...
+
+    def set_many(self, items: Dict[Hashable, Any], version: Optional[int] = None):
+        for key, value in items.items():
+            self.set(key, value, version=version)
+
+    @abstractmethod
+    def invalidate(self, key: Hashable):
+        ...
+
+    @abstractmethod
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+
+class NullCache(CacheBackend):
+    """Caching disabled: every lookup is a miss."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.misses = 0
+
+    def get(self, key):
+        self.misses += 1
+        return None
+
+    def set(self, key, value, version=None):
+        pass
+
+    def invalidate(self, key):
+        pass
+
+    def invalidate_where(self, predicate):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": "null", "hits": 0, "misses": self.misses, "size": 0}
+
+
+class TTLCache(CacheBackend):
+    """Thread-safe LRU cache whose entries also expire 'ttl' seconds after being stored."""
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 60.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # key -> (stored_at, value), least recently used first
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if time.monotonic() - entry[0] <= self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value, version=None):
+        with self._lock:
+            if version is not None and version != self.version:
+                return # Invalidated while the value was being read
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self.version += 1
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        with self._lock:
+            self.version += 1
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self.version += 1
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "ttl-lru",
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+            }
+
+
+# name -> cache, for cache_stats()
+_registry: Dict[str, CacheBackend] = {}
+
+def build_cache(name: str, maxsize: int, ttl: float) -> CacheBackend:
+    """Creates and registers a cache; maxsize or ttl <= 0 disables it."""
+    cache = TTLCache(name, maxsize=maxsize, ttl=ttl) if maxsize > 0 and ttl > 0 else NullCache(name)
+    _registry[name] = cache
+    return cache
+
+def cache_stats() -> Dict[str, dict]:
+    return {name: cache.stats() for name, cache in _registry.items()}
@@ -0,0 +1,105 @@
+# app/core/catalog_search.py
+"""
+Accent-insensitive search over the court catalog.
+
+normalize_text() folds case and Spanish accents ("Fútbol" -> "futbol",
+"Peñalolén" -> "penalolen"); the models store its output in the indexed
+`tipo_norm` / `ubicacion_norm` columns, so type filters are plain equality
+lookups.
+
+Partial location matches ("%x%") can't use a B-tree index, so they go through
+TrigramIndex: an in-process inverted index from each 3-character sequence of
+`ubicacion_norm` to the courts containing it. A query intersects the posting
+lists of its trigrams (smallest first) and confirms the substring on the few
+survivors. The index is rebuilt from the DB when its TTL lapses, which bounds how
+long courts written by other workers go unseen; local writes invalidate it.
+"""
+import threading
+import time
+import unicodedata
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+def normalize_text(value: Optional[str]) -> str:
+    """Lowercase, accent-free, single-spaced form of 'value' ('' for None)."""
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.casefold().split())
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+# (id, tipo_norm, ubicacion_norm, estado)
+CatalogRow = Tuple[int, str, str, bool]
+
+class TrigramIndex:
+    """Inverted trigram index over the normalized locations of the active courts."""
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._built_at: Optional[float] = None
+        self.version = 0
+        self._ids: List[int] = [] # Active court ids, ascending
+        self._tipo: Dict[int, str] = {}
+        self._ubicacion: Dict[int, str] = {}
+        self._postings: Dict[str, List[int]] = {}
+
+    def is_warm(self) -> bool:
+        return self._built_at is not None and time.monotonic() - self._built_at <= self.ttl
+
+    def build(self, rows: Iterable[CatalogRow], version: Optional[int] = None):
+        """Replaces the index contents; dropped if invalidated since 'version' was read."""
+        ids, tipos, ubicaciones = [], {}, {}
+        postings: Dict[str, List[int]] = {}
+        for cancha_id, tipo_norm, ubicacion_norm, estado in sorted(rows):
+            if not estado:
+                continue
+            ids.append(cancha_id)
+            tipos[cancha_id] = tipo_norm or ""
+            ubicaciones[cancha_id] = ubicacion_norm or ""
+            for gram in trigrams(ubicacion_norm or ""):
+                postings.setdefault(gram, []).append(cancha_id) # ids ascending
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._ids, self._tipo, self._ubicacion, self._postings = ids, tipos, ubicaciones, postings
+            self._built_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            self._built_at = None
+
+    def search(self, ubicacion: Optional[str] = None, tipo: Optional[str] = None) -> List[int]:
+        """Ids (ascending) of active courts whose location contains 'ubicacion' and whose type is 'tipo'."""
+        term = normalize_text(ubicacion)
+        tipo_norm = normalize_text(tipo)
+        with self._lock:
+            ids, tipos, ubicaciones, postings = self._ids, self._tipo, self._ubicacion, self._postings
+
+        if len(term) >= 3:
+            lists = sorted((postings.get(gram, []) for gram in trigrams(term)), key=len)
+            candidates = set(lists[0])
+            for posting in lists[1:]:
+                candidates.intersection_update(posting)
+                if not candidates:
+                    break
+            candidates = sorted(candidates)
+        else:
+            candidates = ids # Too short for trigrams: check every court
+        return [
+            cancha_id for cancha_id in candidates
+            if (not term or term in ubicaciones[cancha_id]) and (not tipo_norm or tipos[cancha_id] == tipo_norm)
+        ]
+
+    @staticmethod
+    def page(ids: List[int], skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[int]:
+        """Offset or keyset page of a sorted id list."""
+        if after_id is not None:
+            start = bisect_right(ids, after_id)
+            return ids[start:start + limit]
+        return ids[skip:skip + limit]
@@ -1,9 +1,15 @@
 # app/core/database.py (Revised)
 import os
+import threading
+import time
+from datetime import datetime, timezone
 from dotenv import load_dotenv # <-- New import
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.core import metrics, profiling
 
 # --- Load Environment Variables ---
 # This looks for the .env file and loads its contents into environment variables
@@ -23,14 +29,182 @@ if SQLALCHEMY_DATABASE_URL.startswith("mysql+mysqlclient"):
         "mysql+mysqlclient", "mysql+pymysql", 1
     )
 
+# SQLite (used for local runs and the scripts/ benchmarks) must allow pooled
+# connections to move between worker threads.
+def _connect_args(url: str) -> dict:
+    return {"check_same_thread": False} if url.startswith("sqlite") else {}
+
+connect_args = _connect_args(SQLALCHEMY_DATABASE_URL)
+
+# --- Pool sizing ---
+# Per engine (primary and replica alike), per worker process. Ignored for in-memory SQLite.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Seconds before a pooled connection is replaced; keep it below MySQL's wait_timeout
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Admission control: when > 0, a checkout waits at most this many seconds and the
+# request is shed with 503 + Retry-After instead of queueing for DB_POOL_TIMEOUT.
+DB_POOL_ADMISSION_TIMEOUT = float(os.getenv("DB_POOL_ADMISSION_TIMEOUT", "0"))
+DB_POOL_RETRY_AFTER = int(os.getenv("DB_POOL_RETRY_AFTER", "1")) # seconds
+
+# --- Instrumented pools ---
+# Same pools SQLAlchemy would pick, but timing how long each checkout waits for a
+# connection (reported as db_pool_checkout_wait_seconds on /metrics, by 'label')
+# and counting the checkouts currently waiting (see pool_stats()).
+class _WaiterCountMixin:
+    label = "sync"
+
+    def _do_get(self):
+        with self._waiters_lock:
+            self.waiters += 1
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.observe_pool_wait(self.label, time.perf_counter() - started)
+            with self._waiters_lock:
+                self.waiters -= 1
+
+    def _init_waiters(self):
+        self.waiters = 0
+        self._waiters_lock = threading.Lock()
+
+class InstrumentedQueuePool(_WaiterCountMixin, QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._init_waiters()
+
+class InstrumentedAsyncQueuePool(_WaiterCountMixin, AsyncAdaptedQueuePool):
+    label = "async"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._init_waiters()
+
+def _is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+def _pool_options(url: str, poolclass, label: str) -> dict:
+    # In-memory SQLite keeps its single-connection pool
+    if _is_memory_sqlite(url):
+        return {}
+    return {
+        "poolclass": type(f"{poolclass.__name__}_{label}", (poolclass,), {"label": label}),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_timeout": DB_POOL_ADMISSION_TIMEOUT or DB_POOL_TIMEOUT,
+    }
+
+def _build_engine(url: str, label: str):
+    new_engine = create_engine(
+        url,
+        pool_pre_ping=True,
+        connect_args=_connect_args(url),
+        **_pool_options(url, InstrumentedQueuePool, label)
+    )
+    metrics.instrument_engine(new_engine)
+    profiling.instrument_engine(new_engine)
+    return new_engine
+
 # 1. Create the SQLAlchemy Engine
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    pool_pre_ping=True
-)
+engine = _build_engine(SQLALCHEMY_DATABASE_URL, "sync")
 
 # 2. Create the Session Factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# --- Optional read replica ---
+# REPLICA_DATABASE_URL sends the read-only GET routes to a replica (see
+# app/core/replica.py for stickiness and health fallback). Unset, reads use the primary.
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
+if REPLICA_DATABASE_URL and REPLICA_DATABASE_URL.startswith("mysql+mysqlclient"):
+    REPLICA_DATABASE_URL = REPLICA_DATABASE_URL.replace("mysql+mysqlclient", "mysql+pymysql", 1)
+
+replica_engine = None
+ReplicaSessionLocal = None
+
+if REPLICA_DATABASE_URL:
+    replica_engine = _build_engine(REPLICA_DATABASE_URL, "replica")
+    ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+
+# --- Optional async stack ---
+# DB_ASYNC=1 serves requests through an AsyncEngine on an async driver instead of
+# blocking threadpool sessions. The sync engine above stays available for scripts.
+DB_ASYNC = os.getenv("DB_ASYNC", "0").lower() in ("1", "true", "yes")
+
+# Sync driver -> async driver for the same database
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+def to_async_url(url: str) -> str:
+    """Rewrites a sync DATABASE_URL to the matching async driver."""
+    parsed = make_url(url)
+    drivername = ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
+async_engine = None
+AsyncSessionLocal = None
+async_replica_engine = None
+AsyncReplicaSessionLocal = None
+
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    def _build_async_engine(url: str, label: str):
+        new_engine = create_async_engine(
+            to_async_url(url),
+            pool_pre_ping=True,
+            **_pool_options(url, InstrumentedAsyncQueuePool, label)
+        )
+        metrics.instrument_engine(new_engine.sync_engine)
+        profiling.instrument_engine(new_engine.sync_engine)
+        return new_engine
+
+    async_engine = _build_async_engine(SQLALCHEMY_DATABASE_URL, "async")
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False)
+
+    if REPLICA_DATABASE_URL:
+        async_replica_engine = _build_async_engine(REPLICA_DATABASE_URL, "async-replica")
+        AsyncReplicaSessionLocal = async_sessionmaker(async_replica_engine, autoflush=False)
+
+# --- Pool telemetry ---
+
+def _pool_status(pool) -> dict:
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__, "status": pool.status()}
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # Negative while fewer than 'size' connections have been opened
+        "overflow": pool.overflow(),
+        "max_overflow": pool._max_overflow,
+        "waiters": getattr(pool, "waiters", None),
+        "timeout": pool.timeout(),
+    }
+
+def pool_stats() -> dict:
+    """Live occupancy of every engine's pool in this worker process."""
+    engines = {
+        "primary": engine,
+        "replica": replica_engine,
+        "async_primary": async_engine.sync_engine if async_engine is not None else None,
+        "async_replica": async_replica_engine.sync_engine if async_replica_engine is not None else None,
+    }
+    return {name: _pool_status(e.pool) for name, e in engines.items() if e is not None}
+
 # 3. Create the Base class for declarative models
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+def utcnow() -> datetime:
+    """Current UTC time as a naive datetime, matching the DateTime columns (stored in UTC, no zone)."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
\ No newline at end of file
@@ -0,0 +1,145 @@
+# app/core/events.py
+"""
+In-process fan-out of availability changes to WebSocket/SSE subscribers.
+
+Clients subscribe to one court-day (cancha_id, fecha) and receive
+'slot_tomado' / 'slot_liberado' events instead of polling /canchas and
+/reservas. The CRUD layer publishes after every committed reservation write
+(crud.reserva._sync_index) and for every occurrence of a series created or
+cancelled (crud.reserva_recurrente); it runs in worker threads, so publish() hands the
+event to the event loop with call_soon_threadsafe and returns immediately.
+
+Each subscriber owns a bounded queue (EVENTS_QUEUE_SIZE). A subscriber whose
+queue is full is a slow consumer: it is dropped (its connection closed) rather
+than allowed to grow memory or hold back the others; the client reconnects and
+re-reads the grid. Idle subscribers cost one small object and one pending
+future, so a worker can hold thousands of them.
+
+Events only reach subscribers of the worker that made the change; with several
+workers, clients should still re-read the grid on reconnect.
+"""
+import asyncio
+import os
+from collections import deque
+from datetime import date, time
+from typing import Dict, Optional, Set, Tuple
+
+from app.core.metrics import events_dropped, events_published
+
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "32"))
+EVENTS_MAX_SUBSCRIBERS = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", "10000"))
+# SSE comment sent on idle streams so proxies don't close them
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "15"))
+
+Key = Tuple[int, date]
+
+class SubscriberDropped(Exception):
+    """Raised by Subscription.get() once the subscriber has been dropped."""
+
+class Subscription:
+    __slots__ = ("key", "_items", "_waiter", "dropped")
+
+    def __init__(self, key: Key):
+        self.key = key
+        self._items = deque()
+        self._waiter: Optional[asyncio.Future] = None
+        self.dropped = False
+
+    def _wake(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def _push(self, event: dict) -> bool:
+        if len(self._items) >= EVENTS_QUEUE_SIZE:
+            # The backlog is stale by now: discard it, the client re-reads the grid
+            self.dropped = True
+            self._items.clear()
+            self._wake()
+            return False
+        self._items.append(event)
+        self._wake()
+        return True
+
+    async def get(self) -> dict:
+        """Next event; raises SubscriberDropped as soon as the subscriber was dropped."""
+        while True:
+            if self.dropped:
+                raise SubscriberDropped()
+            if self._items:
+                return self._items.popleft()
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+
+class EventHub:
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Dict[Key, Set[Subscription]] = {}
+        self.count = 0
+
+    @property
+    def full(self) -> bool:
+        return self.count >= EVENTS_MAX_SUBSCRIBERS
+
+    def subscribe(self, cancha_id: int, fecha: date) -> Optional[Subscription]:
+        """Registers a subscriber (event loop only). None when the worker is at EVENTS_MAX_SUBSCRIBERS."""
+        if self.full:
+            return None
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription((cancha_id, fecha))
+        self._subscribers.setdefault(subscription.key, set()).add(subscription)
+        self.count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.key)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        self.count -= 1
+        if not subscribers:
+            del self._subscribers[subscription.key]
+
+    def publish(self, cancha_id: int, fecha: date, event: dict):
+        """Thread-safe; a no-op when nobody listens to the court-day."""
+        key = (cancha_id, fecha)
+        if self._loop is None or key not in self._subscribers:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._dispatch, key, event)
+        except RuntimeError:
+            pass # Loop closed (shutdown)
+
+    def _dispatch(self, key: Key, event: dict):
+        subscribers = self._subscribers.get(key)
+        if not subscribers:
+            return
+        events_published.inc()
+        for subscription in list(subscribers):
+            if not subscription._push(event):
+                events_dropped.inc()
+                self.unsubscribe(subscription)
+
+event_hub = EventHub()
+
+def slot_event(
+    tipo: str,
+    reserva_id: Optional[int],
+    cancha_id: int,
+    fecha: date,
+    hora_inicio: time,
+    hora_fin: time,
+    serie_id: Optional[int] = None
+) -> dict:
+    """Event payload; occurrences of a recurring series carry 'serie_id' instead of 'reserva_id'."""
+    return {
+        "tipo": tipo,
+        "reserva_id": reserva_id,
+        "serie_id": serie_id,
+        "cancha_id": cancha_id,
+        "fecha": fecha.isoformat(),
+        "hora_inicio": hora_inicio.isoformat(),
+        "hora_fin": hora_fin.isoformat(),
+    }
@@ -0,0 +1,73 @@
+# app/core/expiry.py
+"""
+Background expiry of abandoned holds.
+
+A reservation stays 'pendiente' until an admin acts on it, and meanwhile blocks
+its slot. With EXPIRY_ENABLED=1, expiry_loop(), started by the app lifespan,
+moves pending reservations older than RESERVA_HOLD_MINUTES to 'expirada' every
+EXPIRY_INTERVAL seconds.
+
+It is off by default: turning it on changes the approval workflow, since a
+request the admins don't decide within the hold window is released. Pick
+RESERVA_HOLD_MINUTES to match how quickly requests are actually reviewed, and
+enable it on one worker.
+
+Each sweep works in chunks of EXPIRY_BATCH reservations, each chunk one short
+transaction (see crud.reserva.expire_pending_chunk), and pauses EXPIRY_PAUSE
+seconds between chunks so a large backlog never holds row locks or a pooled
+connection for long. The UPDATE only touches rows that are still pending, so
+overlapping sweeps from several workers are harmless, just redundant.
+"""
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.core.database import SessionLocal, utcnow
+from app.core.metrics import reservas_expired, reservas_expiry_duration, reservas_expiry_runs
+from app.crud import reserva as crud_reserva
+
+EXPIRY_ENABLED = os.getenv("EXPIRY_ENABLED", "0").lower() in ("1", "true", "yes")
+RESERVA_HOLD_MINUTES = float(os.getenv("RESERVA_HOLD_MINUTES", "60"))
+EXPIRY_INTERVAL = float(os.getenv("EXPIRY_INTERVAL", "60"))
+EXPIRY_BATCH = int(os.getenv("EXPIRY_BATCH", "500"))
+EXPIRY_PAUSE = float(os.getenv("EXPIRY_PAUSE", "0.05"))
+
+def _expire_chunk(cutoff: datetime):
+    with SessionLocal() as db:
+        return crud_reserva.expire_pending_chunk(db, cutoff, EXPIRY_BATCH)
+
+async def expire_pending() -> int:
+    """One sweep over the pending reservations past their hold window. Returns how many expired."""
+    cutoff = utcnow() - timedelta(minutes=RESERVA_HOLD_MINUTES)
+    started = time.perf_counter()
+    expired = 0
+    try:
+        while True:
+            candidates, count = await asyncio.to_thread(_expire_chunk, cutoff)
+            expired += count
+            reservas_expired.inc(amount=count)
+            if candidates < EXPIRY_BATCH:
+                break
+            await asyncio.sleep(EXPIRY_PAUSE)
+    except Exception:
+        reservas_expiry_runs.inc("error")
+        raise
+    finally:
+        reservas_expiry_duration.observe(time.perf_counter() - started)
+    reservas_expiry_runs.inc("ok")
+    return expired
+
+async def expiry_loop():
+    """Background task started by the app lifespan when EXPIRY_ENABLED."""
+    # Spread the workers' sweeps over the interval
+    await asyncio.sleep(random.uniform(0, EXPIRY_INTERVAL))
+    while True:
+        try:
+            expired = await expire_pending()
+            if expired:
+                print(f"Expired {expired} pending reservations older than {RESERVA_HOLD_MINUTES:g} min.")
+        except Exception as e:
+            print("Warning: reservation expiry failed:", repr(e))
+        await asyncio.sleep(EXPIRY_INTERVAL)
@@ -0,0 +1,33 @@
+# app/core/export.py
+"""
+Encoders for streamed exports: each call turns one partition of row tuples into
+a chunk of the response body, so only one partition is ever held in memory.
+"""
+import csv
+import io
+import json
+from datetime import date, time
+from typing import Iterable, Sequence
+
+def _plain(value):
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return value
+
+def encode_csv_header(columns: Sequence[str]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(columns)
+    return buffer.getvalue()
+
+def encode_csv(rows: Iterable[tuple]) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_plain(value) for value in row])
+    return buffer.getvalue()
+
+def encode_ndjson(rows: Iterable[tuple], columns: Sequence[str]) -> str:
+    return "".join(
+        json.dumps({column: _plain(value) for column, value in zip(columns, row)}, ensure_ascii=False) + "\n"
+        for row in rows
+    )
@@ -0,0 +1,252 @@
+# app/core/idempotency.py
+"""
+Idempotency-Key support for retried POSTs (creating a reservation, registering).
+
+A client that times out and retries sends the same `Idempotency-Key` header.
+The first request runs normally; its response (status, headers, body) is stored
+and replayed, byte for byte, for every later request with the same key, caller
+and route, so a retried booking returns its own 201 instead of a 409 against
+itself. The routes and the CRUD layer are unaware of it: IdempotencyMiddleware
+wraps only the paths it is given.
+
+  * Keys are scoped by route and caller (a hash of the Authorization header, or
+    of the client IP for anonymous calls such as /register, resolved through
+    TRUSTED_PROXIES like the rate limiter), so two callers can't see each
+    other's responses. Reusing a key with a different body is rejected with 422.
+  * Concurrent duplicates are coalesced: while the first one runs, the others
+    await its completion and then replay it.
+  * Responses are kept in a bounded, TTL-evicted in-process cache
+    (IDEMPOTENCY_MAX_KEYS, IDEMPOTENCY_TTL). With IDEMPOTENCY_DB=1 they are
+    also stored in `claves_idempotencia`, which extends replay and coalescing
+    across workers: a duplicate that lands on another worker polls the row for
+    up to IDEMPOTENCY_WAIT seconds, then gets 409. The worker running the first
+    request renews a lease on the row every IDEMPOTENCY_LEASE / 3 seconds, so a
+    slow request is never run twice; only a row whose lease lapsed (its worker
+    died) can be claimed again.
+  * Only outcomes of the request itself are stored: 2xx and deterministic 4xx.
+    5xx and transient rejections (408, 425, 429: timeouts, rate limits) are
+    not, so the retry runs again once the condition has passed.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from fastapi import Request
+
+from app.core.cache import build_cache
+from app.core.database import SessionLocal, utcnow
+from app.core.rate_limit import client_ip
+from app.crud import idempotencia as crud_idempotencia
+
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+IDEMPOTENCY_DB = os.getenv("IDEMPOTENCY_DB", "0").lower() in ("1", "true", "yes")
+IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "10"))
+IDEMPOTENCY_LEASE = float(os.getenv("IDEMPOTENCY_LEASE", "30"))
+
+HEADER = b"idempotency-key"
+# 4xx that depend on timing or load rather than on the request: never replayed
+TRANSIENT_STATUSES = {408, 425, 429}
+MAX_KEY_LENGTH = 255
+
+class StoredResponse(NamedTuple):
+    huella: str # sha256 of the request body
+    status: int
+    headers: List[List[bytes]]
+    body: bytes
+
+responses = build_cache("idempotencia", IDEMPOTENCY_MAX_KEYS, IDEMPOTENCY_TTL)
+
+# --- Shared store (IDEMPOTENCY_DB) ---
+
+# Returned by _db_lookup when another worker is still running the first request
+PENDING = object()
+
+def _vigente_desde() -> datetime:
+    return utcnow() - timedelta(seconds=IDEMPOTENCY_TTL)
+
+def _abandonada_antes() -> datetime:
+    return utcnow() - timedelta(seconds=IDEMPOTENCY_LEASE)
+
+def _db_lookup(clave: str):
+    with SessionLocal() as db:
+        row = crud_idempotencia.get_clave(db, clave, _vigente_desde())
+        if row is None:
+            return None
+        if row.status is None:
+            # A lapsed lease means its worker died: free to claim
+            return PENDING if crud_idempotencia.lease_vigente(row, _abandonada_antes()) else None
+        headers = [[name.encode("latin-1"), value.encode("latin-1")] for name, value in json.loads(row.headers)]
+        return StoredResponse(row.huella, row.status, headers, row.body)
+
+def _db_claim(clave: str, huella: str) -> bool:
+    with SessionLocal() as db:
+        return crud_idempotencia.claim_clave(db, clave, huella, _vigente_desde(), _abandonada_antes())
+
+def _db_renew(clave: str):
+    with SessionLocal() as db:
+        crud_idempotencia.renew_clave(db, clave)
+
+def _db_complete(clave: str, stored: StoredResponse):
+    headers = json.dumps([[name.decode("latin-1"), value.decode("latin-1")] for name, value in stored.headers])
+    with SessionLocal() as db:
+        crud_idempotencia.complete_clave(db, clave, stored.status, headers, stored.body)
+
+def _db_release(clave: str):
+    with SessionLocal() as db:
+        crud_idempotencia.release_clave(db, clave)
+
+def _db_purge():
+    with SessionLocal() as db:
+        crud_idempotencia.purge_claves(db, _vigente_desde())
+
+# --- Middleware ---
+
+def _storable(status_code: int) -> bool:
+    return 200 <= status_code < 500 and status_code not in TRANSIENT_STATUSES
+
+async def _keep_lease(clave: str):
+    """Renews the placeholder's lease until cancelled, when the request finishes."""
+    while True:
+        await asyncio.sleep(IDEMPOTENCY_LEASE / 3)
+        try:
+            await asyncio.to_thread(_db_renew, clave)
+        except Exception as e:
+            print("Warning: idempotency lease renewal failed:", repr(e))
+
+def _caller(scope, headers: dict) -> bytes:
+    authorization = headers.get(b"authorization")
+    if authorization:
+        return b"auth:" + authorization
+    return b"ip:" + client_ip(Request(scope)).encode()
+
+async def _send_json(send, status_code: int, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [[b"content-type", b"application/json"], [b"content-length", str(len(body)).encode()]],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+class IdempotencyMiddleware:
+    """Pure ASGI middleware storing and replaying POST responses on the given paths."""
+
+    def __init__(self, app, paths: Sequence[str] = ()):
+        self.app = app
+        self.paths = {path.rstrip("/") for path in paths}
+        # clave -> future resolved when this worker's first request finishes
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._purged_at = time.monotonic()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"].rstrip("/") not in self.paths:
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        key = headers.get(HEADER)
+        if key is None:
+            return await self.app(scope, receive, send)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return await _send_json(send, 400, f"Idempotency-Key debe tener entre 1 y {MAX_KEY_LENGTH} caracteres.")
+
+        body = await self._read_body(receive)
+        if body is None:
+            return # Client disconnected
+        caller = hashlib.sha256(_caller(scope, headers)).hexdigest()
+        clave = hashlib.sha256(b"\n".join([scope["path"].rstrip("/").encode(), caller.encode(), key])).hexdigest()
+        huella = hashlib.sha256(body).hexdigest()
+
+        waited_since = None
+        while True:
+            stored = responses.get(clave)
+            if stored is None and IDEMPOTENCY_DB:
+                stored = await asyncio.to_thread(_db_lookup, clave)
+            if isinstance(stored, StoredResponse):
+                return await self._replay(stored, huella, send)
+            inflight = self._inflight.get(clave)
+            if inflight is not None:
+                # Coalesce: the first request is running in this worker
+                await asyncio.shield(inflight)
+                continue
+            if stored is PENDING:
+                # Running in another worker: poll the shared row
+                waited_since = waited_since or time.monotonic()
+                if time.monotonic() - waited_since > IDEMPOTENCY_WAIT:
+                    return await _send_json(send, 409, "Una solicitud con esta Idempotency-Key sigue en curso.")
+                await asyncio.sleep(0.05)
+                continue
+            if IDEMPOTENCY_DB and not await asyncio.to_thread(_db_claim, clave, huella):
+                continue # Claimed by another worker meanwhile
+            break
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[clave] = future
+        lease = asyncio.create_task(_keep_lease(clave)) if IDEMPOTENCY_DB else None
+        stored = None
+        try:
+            stored = await self._run(scope, receive, send, body, huella)
+        finally:
+            if lease is not None:
+                lease.cancel()
+            if stored is not None and _storable(stored.status):
+                responses.set(clave, stored)
+                if IDEMPOTENCY_DB:
+                    await asyncio.to_thread(_db_complete, clave, stored)
+            elif IDEMPOTENCY_DB:
+                await asyncio.to_thread(_db_release, clave)
+            del self._inflight[clave]
+            future.set_result(None)
+        if IDEMPOTENCY_DB and time.monotonic() - self._purged_at > 60:
+            self._purged_at = time.monotonic()
+            await asyncio.to_thread(_db_purge)
+
+    @staticmethod
+    async def _read_body(receive) -> Optional[bytes]:
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return None
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                return b"".join(chunks)
+
+    async def _run(self, scope, receive, send, body: bytes, huella: str) -> Optional[StoredResponse]:
+        """Runs the route with the buffered body, forwarding and recording its response."""
+        replayed_body = False
+        start = {}
+        chunks = []
+
+        async def receive_buffered():
+            nonlocal replayed_body
+            if not replayed_body:
+                replayed_body = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def send_recording(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        await self.app(scope, receive_buffered, send_recording)
+        if not start:
+            return None
+        return StoredResponse(huella, start["status"], [list(h) for h in start.get("headers", [])], b"".join(chunks))
+
+    @staticmethod
+    async def _replay(stored: StoredResponse, huella: str, send):
+        if stored.huella != huella:
+            return await _send_json(send, 422, "Idempotency-Key ya usada con otra solicitud.")
+        await send({
+            "type": "http.response.start",
+            "status": stored.status,
+            "headers": stored.headers + [[b"idempotent-replayed", b"true"]],
+        })
+        await send({"type": "http.response.body", "body": stored.body})
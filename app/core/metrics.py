@@ -0,0 +1,234 @@
+# app/core/metrics.py
+"""
+Low-overhead request and DB metrics in Prometheus text format.
+
+MetricsMiddleware times every request and labels it with the route template
+(e.g. /api/v1/canchas/{cancha_id}), method and status code. SQL statements are
+counted and timed through SQLAlchemy engine events (instrument_engine), both
+globally and per request: the request's counters live in a contextvar, which
+also reaches the threadpool and AsyncSession.run_sync calls that run the CRUD
+code. Pool checkout wait is reported by the pool in app/core/database.py.
+
+Everything is in-process and per worker; GET /metrics renders it.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+LabelValues = Tuple[str, ...]
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, label_values)} {value}")
+        return "\n".join(lines)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[LabelValues, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), label_values + (le,))} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, label_values)} {total}")
+                lines.append(f"{self.name}_count{_labels(self.labels, label_values)} {count}")
+        return "\n".join(lines)
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+# --- Registry ---
+
+_registry: Dict[str, object] = {}
+
+def register(metric):
+    _registry[metric.name] = metric
+    return metric
+
+def render_metrics() -> str:
+    return "\n".join(metric.render() for metric in _registry.values()) + "\n"
+
+http_requests = register(Counter(
+    "http_requests_total", "HTTP requests served.", ("route", "method", "status")))
+http_latency = register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency.", ("route", "method", "status")))
+http_db_statements = register(Histogram(
+    "http_request_db_statements", "SQL statements issued per request.", ("route",), buckets=COUNT_BUCKETS))
+http_db_time = register(Histogram(
+    "http_request_db_seconds", "Time spent executing SQL per request.", ("route",)))
+db_statements = register(Counter(
+    "db_statements_total", "SQL statements executed."))
+db_statement_latency = register(Histogram(
+    "db_statement_duration_seconds", "SQL statement execution time."))
+db_pool_wait = register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", ("pool",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)))
+db_connection_hold = register(Histogram(
+    "db_connection_hold_seconds", "Time a pooled connection stays checked out.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)))
+db_pool_rejections = register(Counter(
+    "db_pool_rejections_total", "Requests shed with 503 because no pooled connection was free in time."))
+reservas_expired = register(Counter(
+    "reservas_expired_total", "Pending reservations expired by the background sweep."))
+reservas_expiry_runs = register(Counter(
+    "reservas_expiry_runs_total", "Expiry sweeps run, by outcome.", ("outcome",)))
+reservas_expiry_duration = register(Histogram(
+    "reservas_expiry_run_seconds", "Duration of one expiry sweep, pauses between chunks included.",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)))
+reservas_archived = register(Counter(
+    "reservas_archived_total", "Past reservations moved to reservas_historico."))
+reservas_archive_duration = register(Histogram(
+    "reservas_archive_run_seconds", "Duration of one archiving pass, pauses between chunks included.",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 1800.0)))
+rate_limited = register(Counter(
+    "rate_limited_total", "Requests rejected with 429 by a rate limiter.", ("limiter",)))
+events_published = register(Counter(
+    "events_published_total", "Availability events fanned out to subscribers."))
+events_dropped = register(Counter(
+    "events_dropped_subscribers_total", "Live availability subscribers dropped because their queue was full."))
+
+
+# --- Per-request DB accounting ---
+
+class RequestStats:
+    __slots__ = ("statements", "db_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_query_started", []).append(time.perf_counter())
+
+def _record_statement(conn):
+    elapsed = time.perf_counter() - conn.info["_query_started"].pop()
+    db_statements.inc()
+    db_statement_latency.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_statement(conn)
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute: pop its start time
+    # here, or the stack on the pooled connection grows and later pops are off by one
+    conn = exception_context.connection
+    if conn is not None and exception_context.cursor is not None and conn.info.get("_query_started"):
+        _record_statement(conn)
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    connection_record.info["_checked_out_at"] = time.perf_counter()
+
+def _on_checkin(dbapi_connection, connection_record):
+    checked_out_at = connection_record.info.pop("_checked_out_at", None)
+    if checked_out_at is not None:
+        db_connection_hold.observe(time.perf_counter() - checked_out_at)
+
+def instrument_engine(engine):
+    """
+    Counts and times every SQL statement run through 'engine' (sync Engine or
+    AsyncEngine.sync_engine), and how long its pooled connections stay checked out.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    event.listen(engine, "checkout", _on_checkout)
+    event.listen(engine, "checkin", _on_checkin)
+
+def observe_pool_wait(pool_name: str, seconds: float):
+    db_pool_wait.observe(seconds, pool_name)
+
+
+# --- Middleware ---
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware overhead) recording per-route metrics."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_stats.reset(token)
+            route = scope.get("route")
+            # Unmatched paths share one label so random URLs can't blow up cardinality
+            template = getattr(route, "path_format", None) or "unmatched"
+            status_label = str(status_code)
+            http_requests.inc(template, scope["method"], status_label)
+            http_latency.observe(elapsed, template, scope["method"], status_label)
+            http_db_statements.observe(stats.statements, template)
+            http_db_time.observe(stats.db_seconds, template)
@@ -0,0 +1,209 @@
+# app/core/migrations.py
+"""
+Versioned schema migrations.
+
+The applied version lives in the `schema_version` table (one row per migration).
+migrate() applies the pending migrations in order, each in its own transaction,
+and is run once per deploy from scripts/migrate.py (or scripts/init_db.py), not
+by every worker. Workers only compare the stored version with SCHEMA_VERSION at
+startup (check_schema), or skip even that with SCHEMA_CHECK=skip.
+
+Migration 1 is the baseline: the tables as create_all builds them. A fresh
+database gets the current models through create_all and is stamped with the
+latest version. A database created by the old create_all-on-boot (tables but no
+`schema_version`) is stamped as version 1 and receives the later migrations.
+Later migrations must therefore tolerate objects that already exist (see
+_has_index / _has_column).
+
+Run migrate() from one process at a time: MySQL DDL is not transactional.
+"""
+from typing import Callable, List, NamedTuple, Optional
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, bindparam, func, inspect, select, update
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DatabaseError
+
+from app.core.catalog_search import normalize_text
+from app.core.database import Base, utcnow
+# Every model must be registered on Base.metadata for the baseline
+from app.models import usuario, cancha, reserva, reserva_slot, reserva_recurrente, reserva_historico, idempotencia
+
+
+class Migration(NamedTuple):
+    version: int
+    nombre: str
+    upgrade: Callable[[Connection], None]
+
+
+# Kept off Base.metadata: the version table belongs to the runner, not the models
+_version_metadata = MetaData()
+schema_version_table = Table(
+    "schema_version",
+    _version_metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("nombre", String(100), nullable=False),
+    Column("aplicada_en", DateTime, nullable=False),
+)
+
+# --- Helpers for idempotent migrations ---
+
+def _has_table(conn: Connection, table: str) -> bool:
+    return inspect(conn).has_table(table)
+
+def _has_index(conn: Connection, table: str, index: str) -> bool:
+    return any(ix["name"] == index for ix in inspect(conn).get_indexes(table))
+
+def _has_column(conn: Connection, table: str, column: str) -> bool:
+    return any(col["name"] == column for col in inspect(conn).get_columns(table))
+
+def _add_column(conn: Connection, model, name: str):
+    """ALTER TABLE ... ADD COLUMN from the model's column definition, if missing."""
+    if not _has_column(conn, model.__tablename__, name):
+        ddl = CreateColumn(model.__table__.c[name]).compile(dialect=conn.dialect)
+        conn.exec_driver_sql(f"ALTER TABLE {model.__tablename__} ADD COLUMN {ddl}")
+
+# --- Migrations (append only; never edit one that has shipped) ---
+
+def _baseline(conn: Connection):
+    Base.metadata.create_all(bind=conn)
+
+def _create_indexes(conn: Connection, model, names: List[str]):
+    for index in model.__table__.indexes:
+        if index.name in names and not _has_index(conn, model.__tablename__, index.name):
+            index.create(bind=conn)
+
+def _indices_reservas(conn: Connection):
+    _create_indexes(conn, reserva.Reserva, ["ix_reservas_cancha_fecha_estado_horas", "ix_reservas_usuario_fecha_hora"])
+    _create_indexes(conn, reserva_recurrente.ReservaRecurrente, ["ix_series_cancha_dia_estado", "ix_series_usuario"])
+
+def _busqueda_canchas(conn: Connection):
+    Cancha = cancha.Cancha
+    _add_column(conn, Cancha, "tipo_norm")
+    _add_column(conn, Cancha, "ubicacion_norm")
+    # Backfill in id order, 1000 courts per UPDATE batch
+    table = Cancha.__table__
+    backfill = update(table).where(table.c.id == bindparam("b_id")).values(
+        tipo_norm=bindparam("b_tipo"), ubicacion_norm=bindparam("b_ubicacion")
+    )
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(table.c.id, table.c.tipo, table.c.ubicacion).where(table.c.id > last_id).order_by(table.c.id).limit(1000)
+        ).all()
+        if not rows:
+            break
+        conn.execute(backfill, [
+            {"b_id": row.id, "b_tipo": normalize_text(row.tipo), "b_ubicacion": normalize_text(row.ubicacion)}
+            for row in rows
+        ])
+        last_id = rows[-1].id
+    _create_indexes(conn, Cancha, ["ix_canchas_estado_tipo_norm"])
+
+def _caducidad_reservas(conn: Connection):
+    Reserva = reserva.Reserva
+    _add_column(conn, Reserva, "creado_en")
+    # Existing holds have no creation time: they start their hold window now.
+    # Backfilled by id range, 5000 reservations per UPDATE.
+    table = Reserva.__table__
+    now = utcnow()
+    max_id = conn.execute(select(func.max(table.c.id))).scalar() or 0
+    for start in range(0, max_id, 5000):
+        conn.execute(
+            update(table)
+            .where(table.c.id > start, table.c.id <= start + 5000, table.c.creado_en.is_(None))
+            .values(creado_en=now)
+        )
+    _create_indexes(conn, Reserva, ["ix_reservas_estado_creado"])
+
+def _historico_reservas(conn: Connection):
+    reserva_historico.ReservaHistorico.__table__.create(bind=conn, checkfirst=True)
+    _create_indexes(conn, reserva.Reserva, ["ix_reservas_fecha"])
+
+def _claves_idempotencia(conn: Connection):
+    idempotencia.ClaveIdempotencia.__table__.create(bind=conn, checkfirst=True)
+
+def _lease_claves_idempotencia(conn: Connection):
+    # NULL on existing rows: claim_clave falls back to creado_en for those
+    _add_column(conn, idempotencia.ClaveIdempotencia, "renovada_en")
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "esquema inicial", _baseline),
+    Migration(2, "indices de reservas y series", _indices_reservas),
+    Migration(3, "columnas normalizadas de busqueda en canchas", _busqueda_canchas),
+    Migration(4, "caducidad de reservas pendientes", _caducidad_reservas),
+    Migration(5, "historico de reservas", _historico_reservas),
+    Migration(6, "claves de idempotencia", _claves_idempotencia),
+    Migration(7, "lease de claves de idempotencia", _lease_claves_idempotencia),
+]
+
+# Version the code expects
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+# --- Runner ---
+
+def current_version(conn: Connection) -> Optional[int]:
+    """Applied schema version, or None if the version table does not exist yet."""
+    try:
+        return conn.execute(select(func.max(schema_version_table.c.version))).scalar() or 0
+    except DatabaseError:
+        conn.rollback()
+        return None
+
+def _stamp(conn: Connection, migration: Migration):
+    conn.execute(schema_version_table.insert().values(
+        version=migration.version,
+        nombre=migration.nombre,
+        aplicada_en=utcnow()
+    ))
+
+def migrate(engine: Engine, target: Optional[int] = None) -> List[int]:
+    """
+    Applies the pending migrations up to 'target' (default: all) and returns the
+    versions applied. Safe to re-run: applied migrations are skipped.
+    """
+    target = SCHEMA_VERSION if target is None else target
+    with engine.connect() as conn:
+        version = current_version(conn)
+        legacy = version is None and _has_table(conn, "reservas")
+
+    with engine.begin() as conn:
+        _version_metadata.create_all(bind=conn)
+
+    applied = []
+    if version is None:
+        baseline = MIGRATIONS[0]
+        with engine.begin() as conn:
+            baseline.upgrade(conn)
+            if legacy:
+                _stamp(conn, baseline)
+                version = baseline.version
+            else:
+                # Fresh database: create_all already built the latest schema
+                for migration in MIGRATIONS:
+                    if migration.version <= target:
+                        _stamp(conn, migration)
+                version = min(target, SCHEMA_VERSION)
+        applied.append(baseline.version)
+
+    for migration in MIGRATIONS:
+        if version < migration.version <= target:
+            with engine.begin() as conn:
+                migration.upgrade(conn)
+                _stamp(conn, migration)
+            applied.append(migration.version)
+    return applied
+
+def check_schema(engine: Engine) -> Optional[int]:
+    """
+    Startup check: a single query for the applied version. Raises RuntimeError if
+    the database is behind the code; returns the version otherwise.
+    """
+    with engine.connect() as conn:
+        version = current_version(conn)
+    if version is None or version < SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema is at version {version}, the code expects {SCHEMA_VERSION}. "
+            "Run 'python -m scripts.migrate'."
+        )
+    return version
@@ -0,0 +1,36 @@
+# app/core/pagination.py
+"""
+Opaque cursor tokens for keyset pagination.
+
+A cursor is the sort key of the last row of a page (e.g. [id] for courts or
+[fecha, hora_inicio, id] for reservations), JSON-encoded and base64url-wrapped.
+The next page is fetched with WHERE key > cursor ... LIMIT n, so its cost does
+not grow with the page depth the way OFFSET does. Listing routes return the
+cursor of the next page in the NEXT_CURSOR_HEADER response header.
+"""
+import base64
+import json
+from datetime import date, time
+from typing import Any, List, Sequence
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def _default(value: Any):
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    raise TypeError(f"cannot encode {type(value).__name__} in a cursor")
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps(list(values), default=_default, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def decode_cursor(token: str, length: int) -> List[Any]:
+    """Decodes a cursor; raises ValueError if it is malformed or has the wrong arity."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("invalid cursor") from e
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError("invalid cursor")
+    return values
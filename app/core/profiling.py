@@ -0,0 +1,289 @@
+# app/core/profiling.py
+"""
+Opt-in per-request profiling with on-disk dumps.
+
+Off unless PROFILE_ENABLED is set; then ProfilingMiddleware is installed and a
+request is profiled when it carries 'X-Profile: 1' with an administrator token,
+or when it falls in the PROFILE_SAMPLE_RATE sample. Only one request is profiled
+at a time; others run untouched.
+
+Python frames come from cProfile (deterministic) around the CRUD calls that
+run_db sends to the threadpool, wrapped by profiled(): those threads run only
+this request's code. The event-loop thread is shared by every in-flight request,
+so a profiler enabled there would also record other requests' coroutines; it is
+left out unless PROFILE_EVENT_LOOP is set, in which case the dump covers the
+route too but is only trustworthy on an otherwise idle worker (the summary is
+marked 'incluye_event_loop'). SQL statements are timed through engine events,
+per request, either way. Each profile is written to PROFILE_DIR as
+'<timestamp>_<METHOD>_<route>.prof' (load it with pstats or snakeviz) next to a
+'.json' summary of the top SQL statements and Python frames.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
+
+from app.core.security import decode_access_token
+
+PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "0").lower() in ("1", "true", "yes")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+# Fraction of requests profiled without the header (0 disables sampling)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Oldest dumps are deleted past this many profiles
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+# Also profile the event-loop thread (includes concurrent requests' coroutines)
+PROFILE_EVENT_LOOP = os.getenv("PROFILE_EVENT_LOOP", "0").lower() in ("1", "true", "yes")
+PROFILE_HEADER = "x-profile"
+TOP_N = 15
+
+
+class RequestProfile:
+    """Profiler and SQL timings of the request being profiled."""
+
+    def __init__(self):
+        self.thread_id = threading.get_ident()
+        # Event-loop profiler, only with PROFILE_EVENT_LOOP
+        self.profiler = cProfile.Profile() if PROFILE_EVENT_LOOP else None
+        self.worker_profiles: List[cProfile.Profile] = []
+        # statement -> [count, total seconds]
+        self.sql: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def add_worker_profile(self, profiler: cProfile.Profile):
+        with self._lock:
+            self.worker_profiles.append(profiler)
+
+    def add_statement(self, statement: str, seconds: float):
+        with self._lock:
+            entry = self.sql.setdefault(statement, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def stats(self) -> pstats.Stats:
+        stats = pstats.Stats(stream=io.StringIO())
+        if self.profiler is not None:
+            stats.add(self.profiler)
+        for profiler in self.worker_profiles:
+            stats.add(profiler)
+        return stats
+
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+_busy = threading.Lock()
+
+# --- Hooks ---
+
+def profiled(fn):
+    """
+    Wraps a function about to run in a worker thread so it is profiled too, when
+    the current request is being profiled. Otherwise returns 'fn' unchanged.
+    """
+    profile = _current.get()
+    if profile is None:
+        return fn
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if profile.profiler is not None and threading.get_ident() == profile.thread_id:
+            return fn(*args, **kwargs) # Already under the event-loop profiler
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return fn(*args, **kwargs) # Another profiler owns the interpreter
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+            profile.add_worker_profile(profiler)
+    return wrapper
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("_profile_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    if profile is not None and conn.info.get("_profile_started"):
+        profile.add_statement(statement, time.perf_counter() - conn.info["_profile_started"].pop())
+
+def instrument_engine(engine):
+    """Times SQL statements of profiled requests; does nothing unless profiling is enabled."""
+    if PROFILE_ENABLED:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+# --- Dumps ---
+
+def _top_frames(stats: pstats.Stats, limit: int = TOP_N) -> List[dict]:
+    rows = []
+    for (filename, line, function), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            "frame": f"{filename}:{line}({function})",
+            "ncalls": ncalls,
+            "tottime": round(tottime, 6),
+            "cumtime": round(cumtime, 6),
+        })
+    rows.sort(key=lambda row: row["tottime"], reverse=True)
+    return rows[:limit]
+
+def _top_sql(sql: Dict[str, list], limit: int = TOP_N) -> List[dict]:
+    rows = [
+        {"statement": statement, "count": count, "seconds": round(seconds, 6)}
+        for statement, (count, seconds) in sql.items()
+    ]
+    rows.sort(key=lambda row: row["seconds"], reverse=True)
+    return rows[:limit]
+
+def _slug(route: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "-", route).strip("-") or "root"
+
+def _write_profile(profile: RequestProfile, route: str, method: str, status_code: int, elapsed: float, motivo: str):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    now = datetime.now(timezone.utc)
+    base = os.path.join(PROFILE_DIR, f"{now.strftime('%Y%m%dT%H%M%S%fZ')}_{method}_{_slug(route)}")
+
+    stats = profile.stats()
+    stats.dump_stats(base + ".prof")
+    summary = {
+        "profile": os.path.basename(base) + ".prof",
+        "route": route,
+        "method": method,
+        "status": status_code,
+        "timestamp": now.isoformat(),
+        "elapsed": round(elapsed, 6),
+        "motivo": motivo,
+        "incluye_event_loop": profile.profiler is not None,
+        "sql_statements": sum(count for count, _ in profile.sql.values()),
+        "sql_seconds": round(sum(seconds for _, seconds in profile.sql.values()), 6),
+        "top_sql": _top_sql(profile.sql),
+        "top_frames": _top_frames(stats),
+    }
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump(summary, f)
+    _prune()
+
+def _prune():
+    dumps = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith(".json"))
+    for name in dumps[:max(len(dumps) - PROFILE_MAX_FILES, 0)]:
+        for suffix in (".json", ".prof"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, name[:-len(".json")] + suffix))
+            except FileNotFoundError:
+                pass
+
+def list_profiles(limit: int = 50) -> dict:
+    """
+    Most recent profile summaries, plus per-route aggregates of the top SQL
+    statements and Python frames over those profiles.
+    """
+    if not os.path.isdir(PROFILE_DIR):
+        return {"enabled": PROFILE_ENABLED, "profiles": [], "por_ruta": {}}
+
+    names = sorted((name for name in os.listdir(PROFILE_DIR) if name.endswith(".json")), reverse=True)[:limit]
+    profiles = []
+    for name in names:
+        try:
+            with open(os.path.join(PROFILE_DIR, name), encoding="utf-8") as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue # Being written or pruned
+
+    por_ruta: Dict[str, dict] = {}
+    for summary in profiles:
+        key = f"{summary['method']} {summary['route']}"
+        agg = por_ruta.setdefault(key, {"perfiles": 0, "elapsed_total": 0.0, "sql": {}, "frames": {}})
+        agg["perfiles"] += 1
+        agg["elapsed_total"] += summary["elapsed"]
+        for row in summary["top_sql"]:
+            entry = agg["sql"].setdefault(row["statement"], [0, 0.0])
+            entry[0] += row["count"]
+            entry[1] += row["seconds"]
+        for row in summary["top_frames"]:
+            agg["frames"][row["frame"]] = agg["frames"].get(row["frame"], 0.0) + row["tottime"]
+
+    for agg in por_ruta.values():
+        agg["elapsed_total"] = round(agg["elapsed_total"], 6)
+        agg["sql"] = _top_sql(agg["sql"], limit=5)
+        agg["frames"] = [
+            {"frame": frame, "tottime": round(tottime, 6)}
+            for frame, tottime in sorted(agg["frames"].items(), key=lambda item: item[1], reverse=True)[:5]
+        ]
+    return {"enabled": PROFILE_ENABLED, "profiles": profiles, "por_ruta": por_ruta}
+
+# --- Middleware ---
+
+def _requested_by_admin(scope) -> bool:
+    headers = dict(scope["headers"])
+    if headers.get(PROFILE_HEADER.encode(), b"").strip() not in (b"1", b"true"):
+        return False
+    scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        return decode_access_token(token.strip()).get("rol") == "administrador"
+    except ValueError:
+        return False
+
+class ProfilingMiddleware:
+    """Profiles the selected requests; installed only when PROFILE_ENABLED is set."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        if _requested_by_admin(scope):
+            motivo = "header"
+        elif PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+            motivo = "muestreo"
+        else:
+            return await self.app(scope, receive, send)
+
+        if not _busy.acquire(blocking=False):
+            return await self.app(scope, receive, send) # Another request is being profiled
+
+        profile = RequestProfile()
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        if profile.profiler is not None:
+            try:
+                profile.profiler.enable()
+            except ValueError:
+                _busy.release() # Another profiler owns the interpreter
+                return await self.app(scope, receive, send)
+
+        token = _current.set(profile)
+        try:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                if profile.profiler is not None:
+                    profile.profiler.disable()
+                _current.reset(token)
+            elapsed = time.perf_counter() - started
+            template = getattr(scope.get("route"), "path_format", None) or "unmatched"
+            await run_in_threadpool(_write_profile, profile, template, scope["method"], status_code, elapsed, motivo)
+        finally:
+            _busy.release()
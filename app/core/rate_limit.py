@@ -0,0 +1,188 @@
+# app/core/rate_limit.py
+"""
+Token-bucket rate limiting for the expensive routes (bcrypt on /login and
+/register, overlap query plus commit on POST /reservas) and the hot catalog reads.
+
+Each limiter holds one bucket per caller: the user id from the bearer token, or
+the client IP for anonymous calls (/login, /register). A bucket refills at
+'rate' tokens per second up to 'burst'; a request takes one token or is rejected
+with 429 and a Retry-After of the time until the next token.
+
+Budgets come from RATE_LIMIT_<NAME>="<requests>/<seconds>" (e.g.
+RATE_LIMIT_LOGIN="10/60": bursts of 10, then one every 6 s); "0" turns a limiter
+off. RATE_LIMIT_<NAME>_GLOBAL adds a bucket shared by every caller, as admission
+control for the route as a whole.
+
+Behind a reverse proxy or load balancer every connection comes from the proxy's
+address, which would turn per-IP budgets into one site-wide budget. List the
+proxies in TRUSTED_PROXIES (comma-separated addresses or CIDRs): for requests
+arriving from them, the client is the right-most X-Forwarded-For hop that is
+not itself a trusted proxy. Headers from untrusted peers are ignored, so
+clients can't pick their own bucket. (uvicorn --proxy-headers
+--forwarded-allow-ips does the same one level up; either works.)
+
+Buckets live in an OrderedDict in least-recently-used order: lookups and
+updates are O(1), and a bucket idle long enough to have refilled is identical to
+a new one, so those are evicted from the front as new keys arrive
+(RATE_LIMIT_MAX_KEYS bounds the rest). State is per worker process.
+"""
+import ipaddress
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+
+from app.core.metrics import rate_limited
+from app.core.security import decode_access_token
+
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(proxy.strip(), strict=False)
+    for proxy in os.getenv("TRUSTED_PROXIES", "").split(",") if proxy.strip()
+]
+
+# Budgets used when RATE_LIMIT_<NAME> is not set
+DEFAULT_BUDGETS = {
+    "login": "10/60",
+    "register": "5/60",
+    "reservas": "30/60",
+    "canchas": "300/60",
+}
+
+class TokenBucketLimiter:
+    """Per-key token buckets. Called from the event loop only, so no lock is needed."""
+
+    def __init__(self, name: str, rate: float, burst: float, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # Idle time after which a bucket is full again, i.e. indistinguishable from a new one
+        self.idle_after = burst / rate
+        self.rejected = 0
+        # key -> (tokens, updated_at), least recently used first
+        self._buckets: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+
+    def acquire(self, key: Hashable, now: Optional[float] = None) -> float:
+        """Takes one token for 'key'. Returns 0.0 if allowed, else seconds until a token is available."""
+        if now is None:
+            now = time.monotonic()
+        buckets = self._buckets
+        bucket = buckets.get(key)
+        if bucket is None:
+            tokens = self.burst
+            self._evict(now)
+        else:
+            tokens = bucket[0] + (now - bucket[1]) * self.rate
+            if tokens > self.burst:
+                tokens = self.burst
+            buckets.move_to_end(key)
+        if tokens >= 1.0:
+            buckets[key] = (tokens - 1.0, now)
+            return 0.0
+        buckets[key] = (tokens, now)
+        self.rejected += 1
+        return (1.0 - tokens) / self.rate
+
+    def _evict(self, now: float):
+        # A couple of idle buckets per new key keeps the store at the active set
+        buckets = self._buckets
+        for _ in range(2):
+            if not buckets:
+                return
+            key = next(iter(buckets))
+            if now - buckets[key][1] < self.idle_after:
+                break
+            del buckets[key]
+        while len(buckets) >= self.max_keys:
+            buckets.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def stats(self) -> dict:
+        return {"rate": self.rate, "burst": self.burst, "keys": len(self._buckets), "rejected": self.rejected}
+
+
+def parse_budget(value: str) -> Optional[Tuple[float, float]]:
+    """'10/60' -> (rate per second, burst); None for '0' or ''."""
+    value = value.strip()
+    if not value or value == "0":
+        return None
+    requests, _, seconds = value.partition("/")
+    requests, seconds = float(requests), float(seconds or 1)
+    if requests <= 0 or seconds <= 0:
+        return None
+    return requests / seconds, requests
+
+# name -> limiter (None when disabled)
+_limiters: Dict[str, Optional[TokenBucketLimiter]] = {}
+
+def get_limiter(name: str) -> Optional[TokenBucketLimiter]:
+    if name not in _limiters:
+        budget = parse_budget(os.getenv(f"RATE_LIMIT_{name.upper()}", DEFAULT_BUDGETS.get(name, "0")))
+        _limiters[name] = TokenBucketLimiter(name, *budget) if budget else None
+    return _limiters[name]
+
+def rate_limit_stats() -> Dict[str, dict]:
+    return {name: limiter.stats() for name, limiter in _limiters.items() if limiter is not None}
+
+# --- FastAPI dependency ---
+
+def _is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in TRUSTED_PROXIES)
+
+def client_ip(request: Request) -> str:
+    """The caller's address, looking through X-Forwarded-For when the peer is a trusted proxy."""
+    host = request.client.host if request.client else "-"
+    if not TRUSTED_PROXIES or not _is_trusted_proxy(host):
+        return host
+    hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted_proxy(hop):
+            return hop
+        host = hop
+    return host
+
+def _caller_key(request: Request) -> str:
+    authorization = request.headers.get("authorization", "")
+    if authorization[:7].lower() == "bearer ":
+        try:
+            return f"u:{decode_access_token(authorization[7:])['sub']}"
+        except ValueError:
+            pass # Invalid tokens are limited by IP, then rejected by the route
+    return f"ip:{client_ip(request)}"
+
+def _too_many_requests(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Demasiadas solicitudes, intenta de nuevo más tarde.",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+def rate_limit(name: str):
+    """
+    Dependency enforcing the '<name>' budget per caller (and '<name>_global' across
+    callers, when configured). Use as dependencies=[Depends(rate_limit("login"))].
+    """
+    async def check(request: Request):
+        limiter = get_limiter(name)
+        if limiter is not None:
+            retry_after = limiter.acquire(_caller_key(request))
+            if retry_after:
+                rate_limited.inc(name)
+                raise _too_many_requests(retry_after)
+        shared = get_limiter(f"{name}_global")
+        if shared is not None:
+            retry_after = shared.acquire(None)
+            if retry_after:
+                rate_limited.inc(f"{name}_global")
+                raise _too_many_requests(retry_after)
+    return check
@@ -0,0 +1,93 @@
+# app/core/replica.py
+"""
+Routing state for the optional read replica (REPLICA_DATABASE_URL).
+
+Reads go to the replica unless:
+  * the caller wrote recently: after a booking, a user reads from the primary for
+    READ_YOUR_WRITES_SECONDS, so "my reservations" shows it despite replica lag;
+  * the replica is unhealthy: a background task pings it every
+    REPLICA_HEALTH_INTERVAL seconds and reads fall back to the primary while the
+    ping fails.
+
+Stickiness is tracked per worker process, so it should comfortably exceed the
+usual replica lag. Availability grids and every write stay on the primary; catalog
+entries cached from the replica can lag by at most the replica lag plus their TTL.
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy import text
+
+from app.core.database import replica_engine, async_replica_engine
+
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", "5"))
+
+# --- Read-your-writes stickiness ---
+
+# user_id -> monotonic time until which that user reads from the primary
+_sticky_until: Dict[int, float] = {}
+_sticky_lock = threading.Lock()
+
+def mark_write(user_id: int):
+    """Pins the user's reads to the primary for READ_YOUR_WRITES_SECONDS."""
+    if replica_engine is None and async_replica_engine is None:
+        return
+    now = time.monotonic()
+    with _sticky_lock:
+        _sticky_until[user_id] = now + READ_YOUR_WRITES_SECONDS
+        if len(_sticky_until) > 10000:
+            for uid in [uid for uid, until in _sticky_until.items() if until <= now]:
+                del _sticky_until[uid]
+
+def is_sticky(user_id: int) -> bool:
+    until = _sticky_until.get(user_id)
+    return until is not None and until > time.monotonic()
+
+# --- Health ---
+
+class ReplicaHealth:
+    def __init__(self):
+        self.healthy = True
+        self.last_error = None
+        self.last_check = None
+
+replica_health = ReplicaHealth()
+
+def use_replica(user_id=None) -> bool:
+    """Whether a read for 'user_id' (None for anonymous) may go to the replica."""
+    if not replica_health.healthy:
+        return False
+    return user_id is None or not is_sticky(user_id)
+
+def _ping_sync():
+    with replica_engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+async def check_replica():
+    try:
+        if async_replica_engine is not None:
+            async with async_replica_engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        else:
+            await asyncio.to_thread(_ping_sync)
+    except Exception as e:
+        if replica_health.healthy:
+            print("Warning: replica unavailable, reading from the primary:", repr(e))
+        replica_health.healthy = False
+        replica_health.last_error = repr(e)
+    else:
+        if not replica_health.healthy:
+            print("Replica healthy again.")
+        replica_health.healthy = True
+        replica_health.last_error = None
+    replica_health.last_check = time.time()
+
+async def replica_health_loop():
+    """Background task started by the app lifespan when a replica is configured."""
+    while True:
+        await check_replica()
+        await asyncio.sleep(REPLICA_HEALTH_INTERVAL)
@@ -0,0 +1,132 @@
+# app/core/reserva_index.py
+"""
+In-process interval index of active reservations, keyed by (cancha_id, fecha).
+
+Each key holds the active bookings of one court on one day as a list of
+(hora_inicio, hora_fin, reserva_id) tuples sorted by start time, plus the
+running maximum of their end times, so a conflict lookup is a single bisect
+even when stored intervals overlap each other. Keys are warmed lazily from the
+DB by the CRUD layer and expire after RESERVA_INDEX_TTL seconds.
+
+Changes made by this worker are applied to the index as they commit; the TTL
+bounds how long a change made by another worker process can go unseen. An index
+hit on a warm key is trusted: create_reserva rejects it with 409 without
+touching the DB, so a slot freed by another worker may be refused for up to
+RESERVA_INDEX_TTL seconds. The index never lets a booking through on its own:
+inserts are always checked against the DB under the slot lock.
+"""
+import os
+import threading
+import time as _time
+from bisect import bisect_left
+from datetime import date, time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Seconds a warmed (cancha_id, fecha) entry is trusted before it is reloaded.
+INDEX_TTL_SECONDS = float(os.getenv("RESERVA_INDEX_TTL", "15"))
+
+Interval = Tuple[time, time, int]
+Key = Tuple[int, date]
+
+
+class _Entry:
+    """Sorted intervals of one key and, per position, the interval reaching furthest so far."""
+    __slots__ = ("warmed_at", "intervals", "reach")
+
+    def __init__(self, intervals: List[Interval]):
+        self.warmed_at = _time.monotonic()
+        self.intervals = intervals
+        self.reach: List[Interval] = []
+        self._rebuild()
+
+    def _rebuild(self, start: int = 0):
+        # reach[i] is the interval with the latest end among intervals[:i + 1]
+        del self.reach[start:]
+        best = self.reach[start - 1] if start else None
+        for interval in self.intervals[start:]:
+            if best is None or interval[1] > best[1]:
+                best = interval
+            self.reach.append(best)
+
+    def add(self, interval: Interval):
+        self.remove(interval[2])
+        idx = bisect_left(self.intervals, interval)
+        self.intervals.insert(idx, interval)
+        self._rebuild(idx)
+
+    def remove(self, reserva_id: int):
+        for idx, interval in enumerate(self.intervals):
+            if interval[2] == reserva_id:
+                del self.intervals[idx]
+                self._rebuild(idx)
+                return
+
+
+class ReservaIntervalIndex:
+    def __init__(self, ttl: float = INDEX_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[Key, _Entry] = {}
+
+    def _get(self, key: Key) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if _time.monotonic() - entry.warmed_at > self.ttl:
+            del self._entries[key]
+            return None
+        return entry
+
+    def is_warm(self, cancha_id: int, fecha: date) -> bool:
+        with self._lock:
+            return self._get((cancha_id, fecha)) is not None
+
+    def warm(self, cancha_id: int, fecha: date, intervals: Iterable[Interval]):
+        """Replaces the entry for (cancha_id, fecha) with a fresh snapshot from the DB."""
+        with self._lock:
+            self._entries[(cancha_id, fecha)] = _Entry(sorted(intervals))
+
+    def find_conflict(self, cancha_id: int, fecha: date, start: time, end: time) -> Optional[int]:
+        """
+        Returns the id of an indexed reservation overlapping [start, end), or None.
+        A cold key always returns None (unknown, not free).
+        """
+        with self._lock:
+            entry = self._get((cancha_id, fecha))
+            if entry is None:
+                return None
+            # Everything before 'idx' starts before the new reservation ends; one of
+            # them overlaps iff the furthest-reaching one ends after 'start'
+            idx = bisect_left(entry.intervals, (end,))
+            if idx == 0:
+                return None
+            _, i_end, i_id = entry.reach[idx - 1]
+            return i_id if i_end > start else None
+
+    def add(self, cancha_id: int, fecha: date, start: time, end: time, reserva_id: int):
+        """Inserts a reservation into a warm entry. Cold keys are left to the next warm-up."""
+        with self._lock:
+            entry = self._get((cancha_id, fecha))
+            if entry is not None:
+                entry.add((start, end, reserva_id))
+
+    def remove(self, cancha_id: int, fecha: date, reserva_id: int):
+        with self._lock:
+            entry = self._get((cancha_id, fecha))
+            if entry is not None:
+                entry.remove(reserva_id)
+
+    def invalidate(self, cancha_id: Optional[int] = None, fecha: Optional[date] = None):
+        """Drops one key, every key of a court, or (with no arguments) the whole index."""
+        with self._lock:
+            if cancha_id is None:
+                self._entries.clear()
+            elif fecha is not None:
+                self._entries.pop((cancha_id, fecha), None)
+            else:
+                for key in [k for k in self._entries if k[0] == cancha_id]:
+                    del self._entries[key]
+
+
+# Shared instance used by app/crud/reserva.py
+reserva_index = ReservaIntervalIndex()
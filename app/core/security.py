@@ -0,0 +1,139 @@
+# app/core/security.py
+"""
+Password hashing off the request path, and signed access tokens.
+
+bcrypt is deliberately slow CPU work, so /register and /login run it in a bounded
+process pool: hashes are computed in parallel across cores and never hold the
+event loop, a threadpool slot or the GIL of the serving process. The bcrypt cost
+is configurable; hashes made with a different cost are upgraded on the next
+successful login (see verify_password_async).
+
+Access tokens are stateless: the user id and 'rol' are signed with HMAC-SHA256,
+so verifying a request needs no DB round-trip.
+
+This module must not import the app's DB layer: pool workers import it on spawn.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import multiprocessing
+import os
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+# bcrypt cost factor (2^rounds iterations). Changing it rehashes users as they log in.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Worker processes for hashing; 0 runs hashing in the default threadpool instead
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+# Hash jobs allowed in flight (queued or running) before callers wait their turn
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(max(PASSWORD_HASH_WORKERS, 1) * 4)))
+
+# Pinning min/max to the configured cost makes any other cost "needs update"
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+# --- Sync primitives (run inside the pool workers) ---
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+def verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Returns (valid, new_hash); new_hash is set when the stored cost is outdated."""
+    return pwd_context.verify_and_update(password, hashed_password)
+
+# --- Pool management ---
+
+_executor: Optional[ProcessPoolExecutor] = None
+_pending: Optional[asyncio.Semaphore] = None
+
+def _get_executor() -> Optional[ProcessPoolExecutor]:
+    global _executor
+    if _executor is None and PASSWORD_HASH_WORKERS > 0:
+        # 'spawn': workers start clean instead of forking a process that runs threads and a loop
+        _executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+async def _run(fn, *args):
+    global _pending
+    if _pending is None:
+        _pending = asyncio.Semaphore(PASSWORD_HASH_MAX_PENDING)
+    async with _pending:
+        return await asyncio.get_running_loop().run_in_executor(_get_executor(), fn, *args)
+
+def shutdown_password_pool():
+    """Stops the worker processes; called from the app lifespan on shutdown."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+# --- Async API for the routers ---
+
+async def hash_password_async(password: str) -> str:
+    return await _run(hash_password, password)
+
+async def verify_password_async(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifies a password in the pool. On success with an outdated cost, the second
+    element is a fresh hash that the caller should store (rehash-on-login).
+    """
+    return await _run(verify_and_update, password, hashed_password)
+
+# --- Access tokens ---
+
+# Must be shared by every worker and survive restarts. Without SECRET_KEY each
+# process signs with its own random key: tokens fail on other workers and after
+# every restart. The app refuses to start that way (see app/main.py) unless
+# ALLOW_EPHEMERAL_SECRET_KEY=1, meant for a single local process.
+SECRET_KEY_EPHEMERAL = not os.getenv("SECRET_KEY")
+SECRET_KEY = os.getenv("SECRET_KEY") or secrets.token_urlsafe(32)
+ALLOW_EPHEMERAL_SECRET_KEY = os.getenv("ALLOW_EPHEMERAL_SECRET_KEY", "0").lower() in ("1", "true", "yes")
+ACCESS_TOKEN_TTL = int(os.getenv("ACCESS_TOKEN_TTL", "3600")) # seconds
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(SECRET_KEY.encode(), payload.encode(), hashlib.sha256).digest())
+
+def create_access_token(user_id: int, rol: str, ttl: int = ACCESS_TOKEN_TTL) -> str:
+    """Token '<payload>.<signature>' carrying the user id ('sub'), 'rol' and expiry ('exp')."""
+    payload = _b64encode(json.dumps(
+        {"sub": user_id, "rol": rol, "exp": int(time.time()) + ttl},
+        separators=(",", ":")
+    ).encode())
+    return f"{payload}.{_sign(payload)}"
+
+def decode_access_token(token: str) -> dict:
+    """Returns the token claims; raises ValueError if the token is malformed, forged or expired."""
+    try:
+        payload, signature = token.split(".")
+    except ValueError:
+        raise ValueError("malformed token")
+    try:
+        valid = hmac.compare_digest(signature, _sign(payload))
+    except TypeError: # Non-ASCII signature
+        raise ValueError("malformed token")
+    if not valid:
+        raise ValueError("bad signature")
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        raise ValueError("malformed token")
+    if claims.get("exp", 0) < time.time():
+        raise ValueError("expired token")
+    return claims
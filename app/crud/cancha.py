@@ -1,9 +1,51 @@
 # app/crud/cancha.py
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import exists, case
+from app.core.cache import build_cache
+from app.core.catalog_search import TrigramIndex, normalize_text
 from app.models.cancha import Cancha
+from app.models.reserva import Reserva, ACTIVE_STATUSES
+from app.models.reserva_recurrente import ReservaRecurrente
 from app.schemas.cancha import CanchaCreate
-from typing import List, Optional
+from datetime import date, time
+from typing import Hashable, List, Optional
+import os
+
+# --- Court catalog cache ---
+# Read by the routers before a DB session is used, so hits never check out a
+# connection. Every court mutation below must call invalidate_catalog().
+catalog_cache = build_cache(
+    "canchas",
+    maxsize=int(os.getenv("CANCHAS_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("CANCHAS_CACHE_TTL", "300"))
+)
+
+def catalog_list_key(tipo: Optional[str], ubicacion: Optional[str], skip: int, limit: int, after_id: Optional[int] = None) -> Hashable:
+    # Normalized, so 'Fútbol' and 'futbol' share an entry
+    return ("list", normalize_text(tipo), normalize_text(ubicacion), skip, limit, after_id)
+
+def catalog_detail_key(cancha_id: int) -> Hashable:
+    return ("detail", cancha_id)
+
+def invalidate_catalog():
+    catalog_cache.clear()
+    search_index.invalidate()
+
+# --- Location search index ---
+# Partial location matches are answered in memory (see app/core/catalog_search.py)
+search_index = TrigramIndex(ttl=float(os.getenv("CANCHAS_SEARCH_TTL", "300")))
+# Larger match sets are filtered in SQL over `ubicacion_norm` instead of an id list
+MAX_IN_IDS = 2000
+
+def _location_matches(db: Session, ubicacion: str, tipo: Optional[str] = None) -> List[int]:
+    """Ids of active courts whose location contains 'ubicacion' (and of type 'tipo'), ascending."""
+    if not search_index.is_warm():
+        version = search_index.version
+        search_index.build(
+            db.query(Cancha.id, Cancha.tipo_norm, Cancha.ubicacion_norm, Cancha.estado).all(),
+            version=version
+        )
+    return search_index.search(ubicacion=ubicacion, tipo=tipo)
 
 def get_cancha_by_id(db: Session, cancha_id: int):
     """
@@ -16,25 +58,93 @@ def get_all_canchas(
     tipo: Optional[str] = None, 
     ubicacion: Optional[str] = None, 
     skip: int = 0, 
-    limit: int = 100
+    limit: int = 100,
+    after_id: Optional[int] = None
 ) -> List[Cancha]:
     """
     Retrieves a paginated list of available (activa=True) courts, applying filters.
     The query parameters handle the 'tipo' and 'ubicacion' filters. 
+    With 'after_id' (keyset pagination) the page starts after that court id and
+    'skip' is ignored, so deep pages cost the same as the first one.
     """
+    if normalize_text(ubicacion):
+        # Location search: the page of ids comes from the trigram index, the rows from the PK
+        page = TrigramIndex.page(_location_matches(db, ubicacion, tipo), skip=skip, limit=limit, after_id=after_id)
+        if not page:
+            return []
+        return db.query(Cancha).filter(Cancha.id.in_(page), Cancha.estado == True).order_by(Cancha.id).all()
+
+    query = _filtered_canchas_query(db, tipo=tipo)
+    query = query.order_by(Cancha.id)
+    if after_id is not None:
+        return query.filter(Cancha.id > after_id).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
+
+def _filtered_canchas_query(db: Session, tipo: Optional[str] = None, ubicacion: Optional[str] = None):
     # 1. Start with filtering for active courts only ("disponibles" [cite: 29])
     query = db.query(Cancha).filter(Cancha.estado == True)
     
-    # 2. Apply optional 'tipo' filter
-    if tipo:
-        # Use func.lower for case-insensitive comparison
-        query = query.filter(func.lower(Cancha.tipo) == func.lower(tipo))
+    # 2. Apply optional 'tipo' filter (indexed, case- and accent-insensitive)
+    if normalize_text(tipo):
+        query = query.filter(Cancha.tipo_norm == normalize_text(tipo))
     
-    # 3. Apply optional 'ubicacion' filter (using LIKE for partial match)
-    if ubicacion:
-        query = query.filter(func.lower(Cancha.ubicacion).like(f"%{ubicacion.lower()}%"))
-        
-    # 4. Apply pagination [cite: 40]
+    # 3. Apply optional 'ubicacion' filter (partial match through the trigram index)
+    term = normalize_text(ubicacion)
+    if term:
+        ids = _location_matches(db, term, tipo)
+        if len(ids) <= MAX_IN_IDS:
+            query = query.filter(Cancha.id.in_(ids))
+        else:
+            query = query.filter(Cancha.ubicacion_norm.like(f"%{term}%"))
+
+    return query
+
+def search_free_canchas(
+    db: Session,
+    fecha: date,
+    hora_inicio: time,
+    hora_fin: time,
+    tipo: Optional[str] = None,
+    ubicacion: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100
+) -> List[Cancha]:
+    """
+    Retrieves active courts matching 'tipo'/'ubicacion' that are free for the whole
+    [hora_inicio, hora_fin) slot on 'fecha', in a single query.
+    Busy courts are removed with anti-joins (NOT EXISTS) against active reservations
+    and against active recurring series with an occurrence on that day.
+    Results are ranked by how well the location matches (exact, prefix, partial), then by id.
+    """
+    busy = exists().where(
+        Reserva.cancha_id == Cancha.id,
+        Reserva.fecha == fecha,
+        Reserva.estado.in_(ACTIVE_STATUSES),
+        Reserva.hora_inicio < hora_fin,
+        Reserva.hora_fin > hora_inicio
+    )
+    busy_series = exists().where(
+        ReservaRecurrente.cancha_id == Cancha.id,
+        ReservaRecurrente.dia_semana == fecha.weekday(),
+        ReservaRecurrente.estado.in_(ACTIVE_STATUSES),
+        ReservaRecurrente.fecha_inicio <= fecha,
+        ReservaRecurrente.fecha_fin >= fecha,
+        ReservaRecurrente.hora_inicio < hora_fin,
+        ReservaRecurrente.hora_fin > hora_inicio
+    )
+    query = _filtered_canchas_query(db, tipo=tipo, ubicacion=ubicacion).filter(~busy, ~busy_series)
+
+    term = normalize_text(ubicacion)
+    if term:
+        rank = case(
+            (Cancha.ubicacion_norm == term, 0),
+            (Cancha.ubicacion_norm.like(f"{term}%"), 1),
+            else_=2
+        )
+        query = query.order_by(rank, Cancha.id)
+    else:
+        query = query.order_by(Cancha.id)
+
     return query.offset(skip).limit(limit).all()
 
 # --- Admin-specific function (Implied management: gestionar canchas) ---
@@ -45,4 +155,5 @@ def create_cancha(db: Session, cancha: CanchaCreate):
     db.add(db_cancha)
     db.commit()
     db.refresh(db_cancha)
+    invalidate_catalog()
     return db_cancha
\ No newline at end of file
@@ -0,0 +1,147 @@
+# app/crud/disponibilidad.py
+"""
+Free-slot grids per court and day.
+
+A day is a fixed-resolution bitmap held in a Python int: bit i is set when slot i
+([i*SLOT_MINUTES, (i+1)*SLOT_MINUTES) after midnight) is taken by an active
+reservation or an occurrence of an active recurring series. Grids for a date range
+come from a single range query (plus one over the series rules), are cached per
+(cancha_id, fecha) and dropped by the writes in app/crud/reserva.py and
+app/crud/reserva_recurrente.py.
+"""
+import os
+from datetime import date, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import build_cache
+from app.models.cancha import Cancha
+from app.models.reserva import Reserva, ACTIVE_STATUSES
+from app.models.reserva_recurrente import ReservaRecurrente, iter_ocurrencias
+
+def _parse_hhmm(value: str) -> int:
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+# Grid resolution and the opening hours the free slots are clipped to
+SLOT_MINUTES = int(os.getenv("DISPONIBILIDAD_SLOT_MINUTES", "30"))
+APERTURA_MIN = _parse_hhmm(os.getenv("DISPONIBILIDAD_APERTURA", "07:00"))
+CIERRE_MIN = _parse_hhmm(os.getenv("DISPONIBILIDAD_CIERRE", "23:00"))
+MAX_DIAS = 31
+GRID_CACHE_SIZE = int(os.getenv("DISPONIBILIDAD_CACHE_SIZE", "10000"))
+# Bounds how long writes made by other worker processes can go unseen
+GRID_CACHE_TTL = float(os.getenv("DISPONIBILIDAD_CACHE_TTL", "15"))
+
+# Bits of the slots inside opening hours
+_OPEN_LO = APERTURA_MIN // SLOT_MINUTES
+_OPEN_HI = CIERRE_MIN // SLOT_MINUTES
+OPEN_MASK = ((1 << (_OPEN_HI - _OPEN_LO)) - 1) << _OPEN_LO
+
+# --- Grid cache ---
+
+# (cancha_id, fecha) -> occupied bitmap
+grid_cache = build_cache("disponibilidad", maxsize=GRID_CACHE_SIZE, ttl=GRID_CACHE_TTL)
+
+def invalidate_grid(cancha_id: int, fecha: date):
+    """Drops the cached grid of one court-day. Called after every reservation write."""
+    grid_cache.invalidate((cancha_id, fecha))
+
+def invalidate_cancha_grids(cancha_id: int):
+    """Drops every cached grid of one court (a recurring series touches many days)."""
+    grid_cache.invalidate_where(lambda key: key[0] == cancha_id)
+
+# --- Slot arithmetic ---
+
+def _minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+def _slot_time(slot: int) -> time:
+    minutes = slot * SLOT_MINUTES
+    return time(minutes // 60, minutes % 60)
+
+def interval_mask(hora_inicio: time, hora_fin: time) -> int:
+    """Bits of every slot touched by [hora_inicio, hora_fin)."""
+    lo = _minutes(hora_inicio) // SLOT_MINUTES
+    hi = -(-_minutes(hora_fin) // SLOT_MINUTES) # ceil: a partly used slot is taken
+    if hi <= lo:
+        return 0
+    return ((1 << (hi - lo)) - 1) << lo
+
+def free_ranges(grid: int) -> List[Tuple[time, time]]:
+    """Turns the zero bits of a day grid (within opening hours) into (inicio, fin) runs."""
+    free = ~grid & OPEN_MASK
+    ranges = []
+    while free:
+        lo = (free & -free).bit_length() - 1
+        shifted = free >> lo
+        run = (~shifted & (shifted + 1)).bit_length() - 1 # length of the run of ones
+        ranges.append((_slot_time(lo), _slot_time(lo + run)))
+        free &= ~(((1 << run) - 1) << lo)
+    return ranges
+
+# --- Queries ---
+
+def get_day_grids(db: Session, cancha_id: int, desde: date, hasta: date) -> Optional[Dict[date, int]]:
+    """
+    Returns {fecha: occupied bitmap} for every day in [desde, hasta], or None if the
+    court does not exist. Cached days are served from memory; the rest come from one
+    range query over `reservas`.
+    """
+    dias = [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+    version = grid_cache.version
+    grids = {key[1]: grid for key, grid in grid_cache.get_many((cancha_id, dia) for dia in dias).items()}
+    missing = [dia for dia in dias if dia not in grids]
+    if not missing:
+        return grids
+
+    # Grids are only ever cached for existing courts, so the check is needed on misses only
+    if db.query(Cancha.id).filter(Cancha.id == cancha_id).first() is None:
+        return None
+
+    loaded = {dia: 0 for dia in missing}
+    rows = db.query(Reserva.fecha, Reserva.hora_inicio, Reserva.hora_fin).filter(
+        Reserva.cancha_id == cancha_id,
+        Reserva.fecha >= missing[0],
+        Reserva.fecha <= missing[-1],
+        Reserva.estado.in_(ACTIVE_STATUSES)
+    )
+    for fecha, hora_inicio, hora_fin in rows:
+        if fecha in loaded:
+            loaded[fecha] |= interval_mask(hora_inicio, hora_fin)
+
+    # Recurring series are stored as rules; expand only the occurrences in range
+    series = db.query(
+        ReservaRecurrente.fecha_inicio,
+        ReservaRecurrente.fecha_fin,
+        ReservaRecurrente.dia_semana,
+        ReservaRecurrente.hora_inicio,
+        ReservaRecurrente.hora_fin
+    ).filter(
+        ReservaRecurrente.cancha_id == cancha_id,
+        ReservaRecurrente.estado.in_(ACTIVE_STATUSES),
+        ReservaRecurrente.fecha_inicio <= missing[-1],
+        ReservaRecurrente.fecha_fin >= missing[0]
+    )
+    for fecha_inicio, fecha_fin, dia_semana, hora_inicio, hora_fin in series:
+        mask = interval_mask(hora_inicio, hora_fin)
+        for fecha in iter_ocurrencias(fecha_inicio, fecha_fin, dia_semana, missing[0], missing[-1]):
+            if fecha in loaded:
+                loaded[fecha] |= mask
+
+    grid_cache.set_many({(cancha_id, dia): grid for dia, grid in loaded.items()}, version=version)
+    grids.update(loaded)
+    return grids
+
+def get_disponibilidad(db: Session, cancha_id: int, desde: date, hasta: date) -> Optional[List[dict]]:
+    """Free slots per day for one court, ready for the `DisponibilidadDia` schema."""
+    grids = get_day_grids(db, cancha_id, desde, hasta)
+    if grids is None:
+        return None
+    return [
+        {
+            "fecha": dia,
+            "libres": [{"hora_inicio": inicio, "hora_fin": fin} for inicio, fin in free_ranges(grids[dia])]
+        }
+        for dia in sorted(grids)
+    ]
@@ -0,0 +1,80 @@
+# app/crud/idempotencia.py
+from sqlalchemy.orm import Session
+from sqlalchemy import delete, func, or_, and_, select, update
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
+from typing import Optional
+
+from app.core.database import utcnow
+from app.models.idempotencia import ClaveIdempotencia
+
+def get_clave(db: Session, clave: str, vigente_desde: datetime) -> Optional[ClaveIdempotencia]:
+    """The stored entry for 'clave', if created after 'vigente_desde'."""
+    return db.query(ClaveIdempotencia).filter(
+        ClaveIdempotencia.clave == clave,
+        ClaveIdempotencia.creado_en >= vigente_desde
+    ).first()
+
+def lease_vigente(row: ClaveIdempotencia, abandonada_antes: datetime) -> bool:
+    """True while the worker running the placeholder's request keeps renewing it."""
+    return (row.renovada_en or row.creado_en) >= abandonada_antes
+
+def claim_clave(db: Session, clave: str, huella: str, vigente_desde: datetime, abandonada_antes: datetime) -> bool:
+    """
+    Inserts the in-progress placeholder for 'clave'. False if another request
+    (in any worker) holds it. Expired entries and placeholders whose lease was
+    last renewed before 'abandonada_antes' (a worker that died mid-request) are
+    replaced.
+    """
+    db.execute(delete(ClaveIdempotencia).where(
+        ClaveIdempotencia.clave == clave,
+        or_(
+            ClaveIdempotencia.creado_en < vigente_desde,
+            and_(
+                ClaveIdempotencia.status.is_(None),
+                func.coalesce(ClaveIdempotencia.renovada_en, ClaveIdempotencia.creado_en) < abandonada_antes
+            )
+        )
+    ))
+    db.add(ClaveIdempotencia(clave=clave, huella=huella))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return False
+    return True
+
+def renew_clave(db: Session, clave: str):
+    """Extends the lease of a placeholder this worker is still running."""
+    db.execute(
+        update(ClaveIdempotencia)
+        .where(ClaveIdempotencia.clave == clave, ClaveIdempotencia.status.is_(None))
+        .values(renovada_en=utcnow())
+    )
+    db.commit()
+
+def complete_clave(db: Session, clave: str, status: int, headers: str, body: bytes):
+    db.execute(
+        update(ClaveIdempotencia)
+        .where(ClaveIdempotencia.clave == clave)
+        .values(status=status, headers=headers, body=body)
+    )
+    db.commit()
+
+def release_clave(db: Session, clave: str):
+    """Drops a placeholder whose request failed, so a retry can run."""
+    db.execute(delete(ClaveIdempotencia).where(ClaveIdempotencia.clave == clave, ClaveIdempotencia.status.is_(None)))
+    db.commit()
+
+def purge_claves(db: Session, vigente_desde: datetime, limit: int = 1000) -> int:
+    """Deletes up to 'limit' expired entries, oldest first."""
+    claves = db.scalars(
+        select(ClaveIdempotencia.clave)
+        .where(ClaveIdempotencia.creado_en < vigente_desde)
+        .order_by(ClaveIdempotencia.creado_en)
+        .limit(limit)
+    ).all()
+    if claves:
+        db.execute(delete(ClaveIdempotencia).where(ClaveIdempotencia.clave.in_(claves)))
+    db.commit()
+    return len(claves)
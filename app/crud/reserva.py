@@ -1,10 +1,20 @@
 # app/crud/reserva.py
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, exists, insert, select, update, delete, literal, union_all
+from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
-from app.models.reserva import Reserva
+from app.models.reserva import Reserva, ACTIVE_STATUSES
+from app.models.reserva_historico import ReservaHistorico
+from app.models.cancha import Cancha
 from app.schemas.reserva import ReservaCreate, ReservaUpdateAdmin
-from datetime import date, time
+from app.core.reserva_index import ReservaIntervalIndex, reserva_index
+from app.core.events import event_hub, slot_event
+from app.crud import disponibilidad as crud_disponibilidad
+from app.crud import reserva_recurrente as crud_recurrente
+from app.crud.reserva_slot import lock_slot
+from app.core.database import utcnow
+from datetime import date, datetime, time
+from typing import List, Optional, Tuple
 
 # --- Helper function for overlap check ---
 
@@ -26,46 +36,379 @@ def check_for_overlap(db: Session, cancha_id: int, date: date, start_time: time,
     cond3 = and_(Reserva.hora_inicio >= start_time, Reserva.hora_fin <= end_time)
 
     # 4. Check for existing reservations that are 'pending' or 'aprobada'
-    active_statuses = ["pendiente", "aprobada"]
-
     query = db.query(Reserva).filter(
         Reserva.cancha_id == cancha_id,
         Reserva.fecha == date,
-        Reserva.estado.in_(active_statuses),
+        Reserva.estado.in_(ACTIVE_STATUSES),
         or_(cond1, cond2, cond3)
     )
 
     if exclude_reserva_id:
         query = query.filter(Reserva.id != exclude_reserva_id)
 
-    return query.first()
+    conflict = query.first()
+    if conflict is None:
+        # 5. Occurrences of recurring series block their slots too (returns the series)
+        conflict = crud_recurrente.find_series_conflict(db, cancha_id, date, start_time, end_time)
+    return conflict
+
+# --- In-process interval index helpers ---
+
+def warm_reserva_index(db: Session, cancha_id: int, fecha: date, force: bool = False):
+    """
+    Loads the active reservations of one court-day into the interval index,
+    unless that key is already warm (or 'force' is set).
+    """
+    if not force and reserva_index.is_warm(cancha_id, fecha):
+        return
+    rows = db.query(Reserva.hora_inicio, Reserva.hora_fin, Reserva.id).filter(
+        Reserva.cancha_id == cancha_id,
+        Reserva.fecha == fecha,
+        Reserva.estado.in_(ACTIVE_STATUSES)
+    ).all()
+    reserva_index.warm(cancha_id, fecha, [tuple(row) for row in rows])
+
+def _sync_index(db_reserva: Reserva):
+    # Keeps the interval index and the availability grids in line with a
+    # reservation that was just committed, and tells the court-day's subscribers
+    crud_disponibilidad.invalidate_grid(db_reserva.cancha_id, db_reserva.fecha)
+    if db_reserva.estado in ACTIVE_STATUSES:
+        reserva_index.add(db_reserva.cancha_id, db_reserva.fecha, db_reserva.hora_inicio, db_reserva.hora_fin, db_reserva.id)
+        tipo = "slot_tomado"
+    else:
+        reserva_index.remove(db_reserva.cancha_id, db_reserva.fecha, db_reserva.id)
+        tipo = "slot_liberado"
+    event_hub.publish(db_reserva.cancha_id, db_reserva.fecha, slot_event(
+        tipo, db_reserva.id, db_reserva.cancha_id, db_reserva.fecha, db_reserva.hora_inicio, db_reserva.hora_fin
+    ))
 
 # --- CRUD Functions ---
 
 def create_reserva(db: Session, reserva: ReservaCreate, user_id: int):
-    # 1. Check for overlap before creating the reservation
-    if check_for_overlap(db, reserva.cancha_id, reserva.fecha, reserva.hora_inicio, reserva.hora_fin):
+    # 1. A known conflict on a warm key is rejected before the DB is touched
+    #    (stale for at most RESERVA_INDEX_TTL seconds, see app/core/reserva_index.py)
+    conflict = reserva_index.find_conflict(reserva.cancha_id, reserva.fecha, reserva.hora_inicio, reserva.hora_fin) is not None
+
+    # 2. Otherwise the DB decides, under the slot lock, which serializes bookings of
+    #    this court-day so check and insert are atomic. A cold key is warmed by that
+    #    same check: one load of the court-day replaces the overlap query.
+    if not conflict:
+        lock_slot(db, reserva.cancha_id, reserva.fecha)
+        if reserva_index.is_warm(reserva.cancha_id, reserva.fecha):
+            conflict = check_for_overlap(db, reserva.cancha_id, reserva.fecha, reserva.hora_inicio, reserva.hora_fin) is not None
+            if conflict:
+                reserva_index.invalidate(reserva.cancha_id, reserva.fecha) # Missed a booking from another worker
+        else:
+            warm_reserva_index(db, reserva.cancha_id, reserva.fecha, force=True)
+            conflict = (
+                reserva_index.find_conflict(reserva.cancha_id, reserva.fecha, reserva.hora_inicio, reserva.hora_fin) is not None
+                or crud_recurrente.find_series_conflict(db, reserva.cancha_id, reserva.fecha, reserva.hora_inicio, reserva.hora_fin) is not None
+            )
+
+    if conflict:
+        db.rollback() # Releases the slot lock
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
-            detail="Horario ya reservado o solapado con una reserva existente." [cite: 41]
+            detail="Horario ya reservado o solapado con una reserva existente." # [cite: 41]
         )
 
-    # 2. Create the Reserva object
+    # 3. Create the Reserva object
     db_reserva = Reserva(
         **reserva.model_dump(),
         usuario_id=user_id,
         estado="pendiente"
     )
     
-    # 3. Save to database
+    # 4. Save to database (the commit releases the slot lock)
     db.add(db_reserva)
     db.commit()
     db.refresh(db_reserva)
+    _sync_index(db_reserva)
     return db_reserva
 
-def get_user_reservas(db: Session, user_id: int):
-    # Get all reservations for the current user
-    return db.query(Reserva).filter(Reserva.usuario_id == user_id).all() [cite: 29]
+def create_reservas_batch(db: Session, items: List[ReservaCreate], user_id: int, todo_o_nada: bool = True) -> List[dict]:
+    """
+    Creates many reservations in one transaction and returns one result per item
+    ({"indice", "ok", "reserva", "error"}), in request order.
+
+    Conflicts against the DB are found with a single query over every court-day in
+    the batch, and conflicts between items with an in-memory sweep. With
+    'todo_o_nada' any failed item rolls back the whole batch; otherwise the items
+    that fit are inserted with one bulk INSERT.
+    """
+    keys_set = {(item.cancha_id, item.fecha) for item in items}
+    keys = sorted(keys_set)
+    cancha_ids = {cancha_id for cancha_id, _ in keys}
+
+    # 1. Lock every court-day of the batch, in a fixed order so two batches can't deadlock
+    for cancha_id, fecha in keys:
+        lock_slot(db, cancha_id, fecha)
+
+    existing_canchas = {row.id for row in db.query(Cancha.id).filter(Cancha.id.in_(cancha_ids))}
+
+    # 2. One query for the active reservations of every court-day involved (a superset,
+    #    narrowed to the exact keys in memory)
+    sweep = ReservaIntervalIndex(ttl=float("inf"))
+    for cancha_id, fecha in keys:
+        sweep.warm(cancha_id, fecha, [])
+    rows = db.query(Reserva.cancha_id, Reserva.fecha, Reserva.hora_inicio, Reserva.hora_fin, Reserva.id).filter(
+        Reserva.cancha_id.in_(cancha_ids),
+        Reserva.fecha.in_({fecha for _, fecha in keys}),
+        Reserva.estado.in_(ACTIVE_STATUSES)
+    )
+    for cancha_id, fecha, hora_inicio, hora_fin, reserva_id in rows:
+        sweep.add(cancha_id, fecha, hora_inicio, hora_fin, reserva_id)
+    # Sweep ids: reservations keep their positive ids, series occurrences use -2*serie_id
+    # and batch items -(2*indice + 1), so the three never collide
+    fechas = [fecha for _, fecha in keys]
+    for cancha_id, fecha, hora_inicio, hora_fin, serie_id in crud_recurrente.series_occurrences(db, cancha_ids, min(fechas), max(fechas)):
+        if (cancha_id, fecha) in keys_set:
+            sweep.add(cancha_id, fecha, hora_inicio, hora_fin, -2 * serie_id)
+
+    # 3. Sweep the items in request order; accepted items block later ones
+    results = []
+    accepted = []
+    for indice, item in enumerate(items):
+        error = None
+        if item.cancha_id not in existing_canchas:
+            error = "Cancha no encontrada."
+        elif item.hora_fin <= item.hora_inicio:
+            error = "'hora_fin' debe ser posterior a 'hora_inicio'."
+        elif sweep.find_conflict(item.cancha_id, item.fecha, item.hora_inicio, item.hora_fin) is not None:
+            error = "Horario ya reservado o solapado con una reserva existente."
+        else:
+            sweep.add(item.cancha_id, item.fecha, item.hora_inicio, item.hora_fin, -(2 * indice + 1))
+            accepted.append(indice)
+        results.append({"indice": indice, "ok": error is None, "reserva": None, "error": error})
+
+    if not accepted or (todo_o_nada and len(accepted) < len(items)):
+        db.rollback() # Releases the slot locks
+        if todo_o_nada:
+            for result in results:
+                if result["ok"]:
+                    result["ok"] = False
+                    result["error"] = "No creada: otra reserva del lote falló."
+        return results
+
+    # 4. One bulk INSERT for every accepted item
+    rows = [dict(items[i].model_dump(), usuario_id=user_id, estado="pendiente") for i in accepted]
+    if db.get_bind().dialect.insert_executemany_returning_sort_by_parameter_order:
+        ids = db.scalars(insert(Reserva).returning(Reserva.id, sort_by_parameter_order=True), rows).all()
+    else:
+        # e.g. MySQL: one multi-row INSERT, then read the ids back. The slot locks are
+        # still held and accepted items can't overlap, so (cancha_id, fecha, hora_inicio)
+        # identifies each new row.
+        db.execute(insert(Reserva), rows)
+        created = db.query(Reserva.id, Reserva.cancha_id, Reserva.fecha, Reserva.hora_inicio).filter(
+            Reserva.cancha_id.in_(cancha_ids),
+            Reserva.fecha.in_({row["fecha"] for row in rows}),
+            Reserva.usuario_id == user_id,
+            Reserva.estado == "pendiente"
+        )
+        by_key = {(r.cancha_id, r.fecha, r.hora_inicio): r.id for r in created}
+        ids = [by_key[(row["cancha_id"], row["fecha"], row["hora_inicio"])] for row in rows]
+    db.commit()
+
+    for indice, row, reserva_id in zip(accepted, rows, ids):
+        db_reserva = Reserva(id=reserva_id, **row)
+        _sync_index(db_reserva)
+        results[indice]["reserva"] = db_reserva
+    return results
+
+def _after_key(model, after: Tuple[date, time, int]):
+    # Keyset condition: rows strictly after (fecha, hora_inicio, id)
+    fecha, hora_inicio, reserva_id = after
+    return or_(
+        model.fecha > fecha,
+        and_(model.fecha == fecha, or_(
+            model.hora_inicio > hora_inicio,
+            and_(model.hora_inicio == hora_inicio, model.id > reserva_id)
+        ))
+    )
+
+def get_user_reservas(
+    db: Session,
+    user_id: int,
+    limit: Optional[int] = None,
+    skip: int = 0,
+    after: Optional[Tuple[date, time, int]] = None,
+    historial: bool = False
+):
+    """
+    Get the reservations of the current user, ordered by (fecha, hora_inicio, id). [cite: 29]
+    'after' is the sort key of the last row already seen (keyset pagination);
+    'skip' is the offset-based compatibility path. No 'limit' returns every row.
+    'historial' also reads the archived reservations (see get_user_reservas_historial).
+    """
+    if historial:
+        return get_user_reservas_historial(db, user_id, limit=limit, skip=skip, after=after)
+    query = db.query(Reserva).filter(Reserva.usuario_id == user_id)
+    if after is not None:
+        query = query.filter(_after_key(Reserva, after))
+    query = query.order_by(Reserva.fecha, Reserva.hora_inicio, Reserva.id)
+    if skip and after is None:
+        query = query.offset(skip)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+def get_user_reservas_historial(
+    db: Session,
+    user_id: int,
+    limit: Optional[int] = None,
+    skip: int = 0,
+    after: Optional[Tuple[date, time, int]] = None
+):
+    """
+    Same page as get_user_reservas over `reservas` UNION ALL `reservas_historico`
+    (ids are unique across both, archived rows keep theirs). Each branch is
+    filtered, ordered and limited on its own (user, fecha, hora_inicio, id) index,
+    so the outer sort only sees two short lists. Returns column rows, not ORM objects.
+    """
+    branches = []
+    for model in (Reserva, ReservaHistorico):
+        branch = select(*(getattr(model, column) for column in EXPORT_COLUMNS)).where(model.usuario_id == user_id)
+        if after is not None:
+            branch = branch.where(_after_key(model, after))
+        if limit is not None:
+            branch = branch.order_by(model.fecha, model.hora_inicio, model.id).limit(limit + (skip if after is None else 0))
+        branches.append(branch.subquery().select())
+    combined = union_all(*branches).subquery()
+    stmt = select(combined).order_by(combined.c.fecha, combined.c.hora_inicio, combined.c.id)
+    if skip and after is None:
+        stmt = stmt.offset(skip)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return db.execute(stmt).all()
+
+# --- Export ---
+
+EXPORT_COLUMNS = ("id", "usuario_id", "cancha_id", "fecha", "hora_inicio", "hora_fin", "estado")
+# Rows fetched per round-trip (and per chunk of the streamed response)
+EXPORT_BATCH = 2000
+
+def export_query(
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    cancha_id: Optional[int] = None,
+    historial: bool = False
+):
+    """
+    Column-only SELECT of the reservations in [desde, hasta], in id order.
+    Rows come back as plain tuples (no ORM objects) and, through 'yield_per',
+    from a server-side cursor in EXPORT_BATCH partitions. 'historial' adds the
+    archived reservations.
+    """
+    branches = []
+    for model in ((Reserva, ReservaHistorico) if historial else (Reserva,)):
+        branch = select(*(getattr(model, column) for column in EXPORT_COLUMNS))
+        if desde is not None:
+            branch = branch.where(model.fecha >= desde)
+        if hasta is not None:
+            branch = branch.where(model.fecha <= hasta)
+        if cancha_id is not None:
+            branch = branch.where(model.cancha_id == cancha_id)
+        branches.append(branch)
+    if len(branches) == 1:
+        stmt = branches[0].order_by(Reserva.id)
+    else:
+        combined = union_all(*branches).subquery()
+        stmt = select(combined).order_by(combined.c.id)
+    return stmt.execution_options(yield_per=EXPORT_BATCH)
+
+# --- Archive of past reservations ---
+
+def archivable_query(before: date, limit: int):
+    """Ids, courts and days of the oldest reservations dated before 'before'."""
+    return (
+        select(Reserva.id, Reserva.cancha_id, Reserva.fecha)
+        .where(Reserva.fecha < before)
+        .order_by(Reserva.fecha, Reserva.id)
+        .limit(limit)
+    )
+
+def archive_reservas_chunk(db: Session, before: date, limit: int) -> Tuple[int, int]:
+    """
+    Moves up to 'limit' reservations dated before 'before' into `reservas_historico`
+    in one short transaction: INSERT ... SELECT by primary key, then DELETE by
+    primary key. Past days take no new bookings, so no slot lock is needed.
+    Returns (candidates, moved); fewer candidates than 'limit' means nothing
+    older is left.
+
+    Concurrent archivers are safe but wasteful. Ids already in the archive are
+    not copied again, only deleted, and if two archivers pick the same chunk the
+    loser's INSERT hits the primary key: it rolls back and reports (candidates, 0),
+    and its caller goes on with the next chunk.
+    """
+    rows = db.execute(archivable_query(before, limit)).all()
+    if not rows:
+        db.rollback()
+        return 0, 0
+    ids = [row.id for row in rows]
+    columns = ("id", "usuario_id", "cancha_id", "fecha", "hora_inicio", "hora_fin", "estado", "creado_en")
+    try:
+        db.execute(
+            insert(ReservaHistorico).from_select(
+                columns + ("archivada_en",),
+                select(*(getattr(Reserva, column) for column in columns), literal(utcnow(), ReservaHistorico.archivada_en.type))
+                .where(Reserva.id.in_(ids), ~exists().where(ReservaHistorico.id == Reserva.id))
+            )
+        )
+        db.execute(delete(Reserva).where(Reserva.id.in_(ids)).execution_options(synchronize_session=False))
+        db.commit()
+    except IntegrityError:
+        db.rollback() # Another archiver moved this chunk first
+        return len(rows), 0
+    for cancha_id, fecha in {(row.cancha_id, row.fecha) for row in rows}:
+        crud_disponibilidad.invalidate_grid(cancha_id, fecha)
+        reserva_index.invalidate(cancha_id, fecha)
+    return len(rows), len(rows)
+
+# --- Expiry of abandoned holds ---
+
+def expirable_query(cutoff: datetime, limit: int):
+    """Slots of the oldest pending reservations created before 'cutoff'."""
+    return (
+        select(Reserva.id, Reserva.cancha_id, Reserva.fecha, Reserva.hora_inicio, Reserva.hora_fin)
+        .where(Reserva.estado == "pendiente", Reserva.creado_en < cutoff)
+        .order_by(Reserva.creado_en, Reserva.id)
+        .limit(limit)
+    )
+
+def expire_pending_chunk(db: Session, cutoff: datetime, limit: int) -> Tuple[int, int]:
+    """
+    Expires up to 'limit' pending reservations created before 'cutoff' in one short
+    transaction: a plain SELECT of their ids, then a single UPDATE by primary key.
+    No ORM objects are loaded and no slot lock is taken, so booking writes on the
+    same courts are not blocked. Returns (candidates, expired); fewer candidates
+    than 'limit' means the backlog is drained.
+    """
+    rows = db.execute(expirable_query(cutoff, limit)).all()
+    if not rows:
+        db.rollback()
+        return 0, 0
+    ids = [row.id for row in rows]
+    # Re-checking the state makes a concurrent admin decision win over the expiry
+    result = db.execute(
+        update(Reserva)
+        .where(Reserva.id.in_(ids), Reserva.estado == "pendiente")
+        .values(estado="expirada")
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    expired = rows
+    if result.rowcount != len(rows):
+        # Some were decided meanwhile: only sync the ones that really expired
+        gone = set(db.scalars(select(Reserva.id).where(Reserva.id.in_(ids), Reserva.estado == "expirada")))
+        db.rollback()
+        expired = [row for row in rows if row.id in gone]
+    for row in expired:
+        crud_disponibilidad.invalidate_grid(row.cancha_id, row.fecha)
+        reserva_index.remove(row.cancha_id, row.fecha, row.id)
+        event_hub.publish(row.cancha_id, row.fecha, slot_event(
+            "slot_liberado", row.id, row.cancha_id, row.fecha, row.hora_inicio, row.hora_fin
+        ))
+    return len(rows), result.rowcount
 
 def get_reserva_by_id(db: Session, reserva_id: int):
     # Helper to fetch a single reservation
@@ -86,6 +429,7 @@ def cancel_reserva(db: Session, reserva_id: int, user_id: int):
     db_reserva.estado = "cancelada"
     db.commit()
     db.refresh(db_reserva)
+    _sync_index(db_reserva)
     return db_reserva
 
 def update_reserva_status(db: Session, reserva_id: int, update_data: ReservaUpdateAdmin):
@@ -95,12 +439,23 @@ def update_reserva_status(db: Session, reserva_id: int, update_data: ReservaUpda
     if not db_reserva:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reserva no encontrada.")
 
+    # Re-activating a cancelled reservation takes its slot again, so it goes through
+    # the same slot lock and overlap check as a new booking.
+    if update_data.estado in ACTIVE_STATUSES and db_reserva.estado not in ACTIVE_STATUSES:
+        cancha_id, fecha = db_reserva.cancha_id, db_reserva.fecha
+        db.rollback() # Fresh snapshot once the lock is held; db_reserva reloads on access
+        lock_slot(db, cancha_id, fecha)
+        if check_for_overlap(db, db_reserva.cancha_id, db_reserva.fecha, db_reserva.hora_inicio, db_reserva.hora_fin, exclude_reserva_id=db_reserva.id):
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Horario ya reservado o solapado con una reserva existente."
+            )
+
     # Apply new status
     db_reserva.estado = update_data.estado 
     
-    # Optional: If the admin approves, you might want to re-run the overlap check just in case, 
-    # but for simplicity, we assume the admin handles conflicts.
-    
     db.commit()
     db.refresh(db_reserva)
+    _sync_index(db_reserva)
     return db_reserva
\ No newline at end of file
@@ -0,0 +1,172 @@
+# app/crud/reserva_recurrente.py
+from sqlalchemy.orm import Session
+from fastapi import HTTPException, status
+from app.models.cancha import Cancha
+from app.models.reserva import Reserva, ACTIVE_STATUSES
+from app.models.reserva_recurrente import ReservaRecurrente, iter_ocurrencias
+from app.schemas.reserva import ReservaRecurrenteCreate, MAX_SERIE_DIAS
+from app.crud import disponibilidad as crud_disponibilidad
+from app.crud.reserva_slot import lock_slot
+from app.core.events import event_hub, slot_event
+from datetime import date, time
+from heapq import merge
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# (cancha_id, fecha, hora_inicio, hora_fin, serie_id)
+Ocurrencia = Tuple[int, date, time, time, int]
+
+# --- Lazy expansion helpers ---
+
+def find_series_conflict(db: Session, cancha_id: int, fecha: date, start_time: time, end_time: time) -> Optional[ReservaRecurrente]:
+    """
+    Returns an active series with an occurrence on 'fecha' that overlaps
+    [start_time, end_time), or None. Used by the single-reservation overlap check.
+    """
+    return db.query(ReservaRecurrente).filter(
+        ReservaRecurrente.cancha_id == cancha_id,
+        ReservaRecurrente.dia_semana == fecha.weekday(),
+        ReservaRecurrente.fecha_inicio <= fecha,
+        ReservaRecurrente.fecha_fin >= fecha,
+        ReservaRecurrente.estado.in_(ACTIVE_STATUSES),
+        ReservaRecurrente.hora_inicio < end_time,
+        ReservaRecurrente.hora_fin > start_time
+    ).first()
+
+def series_occurrences(db: Session, cancha_ids: Iterable[int], desde: date, hasta: date) -> Iterator[Ocurrencia]:
+    """
+    Lazily expands the active series of the given courts into their occurrences
+    within [desde, hasta]. Only the rules are read from the DB.
+    """
+    rows = db.query(
+        ReservaRecurrente.cancha_id,
+        ReservaRecurrente.fecha_inicio,
+        ReservaRecurrente.fecha_fin,
+        ReservaRecurrente.dia_semana,
+        ReservaRecurrente.hora_inicio,
+        ReservaRecurrente.hora_fin,
+        ReservaRecurrente.id
+    ).filter(
+        ReservaRecurrente.cancha_id.in_(list(cancha_ids)),
+        ReservaRecurrente.estado.in_(ACTIVE_STATUSES),
+        ReservaRecurrente.fecha_inicio <= hasta,
+        ReservaRecurrente.fecha_fin >= desde
+    ).all()
+    for cancha_id, fecha_inicio, fecha_fin, dia_semana, hora_inicio, hora_fin, serie_id in rows:
+        for fecha in iter_ocurrencias(fecha_inicio, fecha_fin, dia_semana, desde, hasta):
+            yield cancha_id, fecha, hora_inicio, hora_fin, serie_id
+
+def merge_ocurrencias(series: Iterable[ReservaRecurrente], desde: date, hasta: date) -> Iterator[Tuple[date, ReservaRecurrente]]:
+    """
+    Yields (fecha, serie) for every occurrence of the given series in [desde, hasta],
+    ordered by date and start time. Each series is expanded lazily and the streams
+    are merged, so memory stays O(number of series) whatever the range.
+    """
+    streams = [
+        ((fecha, serie.hora_inicio, serie.id, serie) for fecha in serie.ocurrencias(desde, hasta))
+        for serie in series
+    ]
+    for fecha, _, _, serie in merge(*streams, key=lambda occ: occ[:3]):
+        yield fecha, serie
+
+# --- CRUD Functions ---
+
+def _publish_serie(db_serie: ReservaRecurrente, tipo: str):
+    # Tells the subscribers of every court-day the series occupies or frees
+    for fecha in iter_ocurrencias(db_serie.fecha_inicio, db_serie.fecha_fin, db_serie.dia_semana, db_serie.fecha_inicio, db_serie.fecha_fin):
+        event_hub.publish(db_serie.cancha_id, fecha, slot_event(
+            tipo, None, db_serie.cancha_id, fecha, db_serie.hora_inicio, db_serie.hora_fin, serie_id=db_serie.id
+        ))
+
+def create_serie(db: Session, serie: ReservaRecurrenteCreate, user_id: int) -> ReservaRecurrente:
+    """
+    Creates a weekly series after checking every occurrence for conflicts in a
+    single pass: one query over single reservations and one over other series.
+    """
+    if serie.hora_fin <= serie.hora_inicio:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'hora_fin' debe ser posterior a 'hora_inicio'.")
+    if serie.fecha_fin < serie.fecha_inicio or (serie.fecha_fin - serie.fecha_inicio).days > MAX_SERIE_DIAS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"'fecha_fin' debe estar entre 'fecha_inicio' y {MAX_SERIE_DIAS} días después."
+        )
+    if db.query(Cancha.id).filter(Cancha.id == serie.cancha_id).first() is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cancha no encontrada.")
+
+    dia_semana = serie.fecha_inicio.weekday()
+    fechas = list(iter_ocurrencias(serie.fecha_inicio, serie.fecha_fin, dia_semana, serie.fecha_inicio, serie.fecha_fin))
+
+    # 1. Lock every court-day the series touches (sorted, like batches)
+    db.rollback() # Fresh snapshot once the locks are held
+    for fecha in fechas:
+        lock_slot(db, serie.cancha_id, fecha)
+
+    # 2. Single reservations overlapping the slot on any date of the range, kept if on the weekday
+    conflictos = {
+        fecha for (fecha,) in db.query(Reserva.fecha).filter(
+            Reserva.cancha_id == serie.cancha_id,
+            Reserva.fecha >= serie.fecha_inicio,
+            Reserva.fecha <= serie.fecha_fin,
+            Reserva.estado.in_(ACTIVE_STATUSES),
+            Reserva.hora_inicio < serie.hora_fin,
+            Reserva.hora_fin > serie.hora_inicio
+        )
+        if fecha.weekday() == dia_semana
+    }
+
+    # 3. Other series on the same weekday whose date ranges and times overlap
+    otras = db.query(ReservaRecurrente.fecha_inicio, ReservaRecurrente.fecha_fin).filter(
+        ReservaRecurrente.cancha_id == serie.cancha_id,
+        ReservaRecurrente.dia_semana == dia_semana,
+        ReservaRecurrente.estado.in_(ACTIVE_STATUSES),
+        ReservaRecurrente.fecha_inicio <= serie.fecha_fin,
+        ReservaRecurrente.fecha_fin >= serie.fecha_inicio,
+        ReservaRecurrente.hora_inicio < serie.hora_fin,
+        ReservaRecurrente.hora_fin > serie.hora_inicio
+    )
+    for fecha_inicio, fecha_fin in otras:
+        conflictos.update(iter_ocurrencias(fecha_inicio, fecha_fin, dia_semana, serie.fecha_inicio, serie.fecha_fin))
+
+    if conflictos:
+        db.rollback() # Releases the slot locks
+        fechas_txt = ", ".join(str(f) for f in sorted(conflictos)[:10])
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"La serie choca con reservas existentes en: {fechas_txt}."
+        )
+
+    db_serie = ReservaRecurrente(
+        **serie.model_dump(),
+        dia_semana=dia_semana,
+        usuario_id=user_id,
+        estado="pendiente"
+    )
+    db.add(db_serie)
+    db.commit()
+    db.refresh(db_serie)
+    crud_disponibilidad.invalidate_cancha_grids(db_serie.cancha_id)
+    _publish_serie(db_serie, "slot_tomado")
+    return db_serie
+
+def get_user_series(db: Session, user_id: int, desde: Optional[date] = None, hasta: Optional[date] = None) -> List[ReservaRecurrente]:
+    """Series of one user, optionally only those with dates in [desde, hasta]."""
+    query = db.query(ReservaRecurrente).filter(ReservaRecurrente.usuario_id == user_id)
+    if desde:
+        query = query.filter(ReservaRecurrente.fecha_fin >= desde)
+    if hasta:
+        query = query.filter(ReservaRecurrente.fecha_inicio <= hasta)
+    return query.order_by(ReservaRecurrente.id).all()
+
+def cancel_serie(db: Session, serie_id: int, user_id: int) -> ReservaRecurrente:
+    db_serie = db.query(ReservaRecurrente).filter(ReservaRecurrente.id == serie_id).first()
+
+    if not db_serie:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Serie no encontrada.")
+    if db_serie.usuario_id != user_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tienes permiso para cancelar esta serie.")
+
+    db_serie.estado = "cancelada"
+    db.commit()
+    db.refresh(db_serie)
+    crud_disponibilidad.invalidate_cancha_grids(db_serie.cancha_id)
+    _publish_serie(db_serie, "slot_liberado")
+    return db_serie
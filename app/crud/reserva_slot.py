@@ -0,0 +1,47 @@
+# app/crud/reserva_slot.py
+from sqlalchemy.orm import Session
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from app.models.reserva_slot import ReservaSlot
+from datetime import date
+
+def lock_slot(db: Session, cancha_id: int, fecha: date):
+    """
+    Takes the write lock of the (cancha_id, fecha) slot row for the current transaction.
+    The row is upserted, so the first booking of a court-day creates it; concurrent
+    bookings of the same court-day wait here until the holder commits or rolls back,
+    while bookings of other courts or days are not blocked.
+    """
+    dialect = db.get_bind().dialect.name
+    values = {"cancha_id": cancha_id, "fecha": fecha, "version": 1}
+
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(ReservaSlot).values(**values)
+        db.execute(stmt.on_duplicate_key_update(version=ReservaSlot.version + 1))
+        return
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(ReservaSlot).values(**values)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[ReservaSlot.cancha_id, ReservaSlot.fecha],
+            set_={"version": ReservaSlot.version + 1}
+        ))
+        return
+
+    # Generic fallback: UPDATE locks an existing row; otherwise create it
+    bump = update(ReservaSlot).where(
+        ReservaSlot.cancha_id == cancha_id,
+        ReservaSlot.fecha == fecha
+    ).values(version=ReservaSlot.version + 1)
+    if db.execute(bump).rowcount:
+        return
+    try:
+        with db.begin_nested():
+            db.add(ReservaSlot(**values))
+    except IntegrityError:
+        # Another transaction created the row first; wait on its lock instead
+        db.execute(bump)
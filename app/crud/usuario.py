@@ -1,13 +1,27 @@
 # app/crud/usuario.py
+from typing import Optional
+import os
+
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
-from passlib.context import CryptContext
 
+from app.core.cache import build_cache
 from app.models.usuario import Usuario
-from app.schemas.usuario import UsuarioCreate, UsuarioBase
+from app.schemas.usuario import UsuarioCreate
+from app.core.security import pwd_context # bcrypt context with the configured cost
+
+# --- Profile cache ---
+# Full Usuario profiles for the endpoints that need more than the token claims
+# (app/dependencies/auth.py). Every write to `usuarios` below must call
+# invalidate_usuario().
+usuario_cache = build_cache(
+    "usuarios",
+    maxsize=int(os.getenv("USUARIOS_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("USUARIOS_CACHE_TTL", "60"))
+)
 
-# Initialize password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def invalidate_usuario(user_id: int):
+    usuario_cache.invalidate(user_id)
 
 # --- Security Helpers ---
 
@@ -27,10 +41,17 @@ def get_user_by_id(db: Session, user_id: int):
     """Retrieves a user by their ID."""
     return db.query(Usuario).filter(Usuario.id == user_id).first()
 
-def create_user(db: Session, user: UsuarioCreate, rol: str = "jugador"):
+def update_password_hash(db: Session, user_id: int, hashed_password: str):
+    """Stores a re-computed hash (e.g., after the bcrypt cost changed)."""
+    db.query(Usuario).filter(Usuario.id == user_id).update({Usuario.hashed_password: hashed_password})
+    db.commit()
+    invalidate_usuario(user_id)
+
+def create_user(db: Session, user: UsuarioCreate, rol: str = "jugador", hashed_password: Optional[str] = None):
     """
     Creates a new user, hashing their password before storing.
-    Default role is 'jugador'.
+    Default role is 'jugador'. Callers that already hashed the password off the
+    request path (bcrypt is CPU-bound) pass it as 'hashed_password'.
     """
     if get_user_by_email(db, user.email):
         raise HTTPException(
@@ -39,7 +60,8 @@ def create_user(db: Session, user: UsuarioCreate, rol: str = "jugador"):
         )
 
     # Hash the password
-    hashed_password = get_password_hash(user.password)
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
 
     # Use the phone number as a unique/sensitive field 
     db_user = Usuario(
@@ -1,7 +1,46 @@
 # app/dependencies/database.py
-from app.core.database import SessionLocal
+from app.core.database import (
+    SessionLocal, AsyncSessionLocal, ReplicaSessionLocal, AsyncReplicaSessionLocal, DB_ASYNC
+)
+from app.core.profiling import profiled
+from app.core.replica import use_replica
+from app.core.security import decode_access_token
+from fastapi import Request
 from sqlalchemy.orm import Session
-from typing import Generator
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from typing import AsyncGenerator, AsyncIterator, Callable, Generator, List, Optional, TypeVar, Union
+
+T = TypeVar("T")
+
+class LazySession:
+    """
+    Stand-in for the request's Session/AsyncSession, created on first use.
+
+    run_db() unwraps it, so requests that never reach the DB (cache hits, auth or
+    validation errors) never build a session or touch the pool.
+    """
+    __slots__ = ("_factory", "_session")
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._session = None
+
+    @property
+    def session(self) -> Union[Session, AsyncSession]:
+        if self._session is None:
+            self._session = self._factory()
+        return self._session
+
+    @property
+    def used(self) -> bool:
+        return self._session is not None
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+# Any of the session kinds handed to the routers
+DbSession = Union[Session, AsyncSession, LazySession]
 
 def get_db() -> Generator[Session, None, None]:
     """
@@ -12,4 +51,103 @@ def get_db() -> Generator[Session, None, None]:
         # The 'yield' statement is what makes this a dependency generator
         yield db 
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Async counterpart of get_db: yields an AsyncSession and closes it afterwards.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def _close_lazy(lazy: LazySession):
+    if not lazy.used:
+        return
+    if isinstance(lazy.session, AsyncSession):
+        await lazy.session.close()
+    else:
+        await run_in_threadpool(lazy.session.close) # Returning the connection may hit the network
+
+async def get_lazy_db() -> AsyncGenerator[LazySession, None]:
+    """
+    Lazy session on the primary (async or sync, per DB_ASYNC). Being an async
+    generator, an unused session costs no threadpool hop either.
+
+    Routers declare it with Depends(get_session, scope="function"), so the session
+    is closed and its connection returned as soon as the handler returns, before
+    the response is serialized and sent.
+    """
+    lazy = LazySession(AsyncSessionLocal if DB_ASYNC else SessionLocal)
+    try:
+        yield lazy
+    finally:
+        await _close_lazy(lazy)
+
+# Session dependency used by the routers
+get_session = get_lazy_db
+
+# --- Read replica routing ---
+
+def _caller_id(request: Request) -> Optional[int]:
+    """User id from the bearer token, if any; auth itself is left to the route."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return decode_access_token(token.strip())["sub"]
+    except (ValueError, KeyError):
+        return None
+
+async def get_lazy_read_db(request: Request) -> AsyncGenerator[LazySession, None]:
+    """
+    Lazy session for read-only routes: on the replica, unless it is unhealthy or
+    the caller wrote recently (read-your-writes), in which case on the primary.
+    """
+    if use_replica(_caller_id(request)):
+        factory = AsyncReplicaSessionLocal if DB_ASYNC else ReplicaSessionLocal
+    else:
+        factory = AsyncSessionLocal if DB_ASYNC else SessionLocal
+    lazy = LazySession(factory)
+    try:
+        yield lazy
+    finally:
+        await _close_lazy(lazy)
+
+# Session dependency for read-only GET routes; the primary when no replica is configured
+get_read_session = get_session if ReplicaSessionLocal is None else get_lazy_read_db
+
+async def run_db(db: DbSession, fn: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Awaits a CRUD function without blocking the event loop.
+
+    With an AsyncSession the function runs through `run_sync`, so its queries are
+    awaited on the async driver; with a plain Session it runs in the threadpool.
+    Either way the CRUD code in app/crud/* is shared by both stacks.
+    """
+    if isinstance(db, LazySession):
+        db = db.session
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(profiled(fn), db, *args, **kwargs)
+
+async def stream_partitions(stmt, read_only: bool = True) -> AsyncIterator[List[tuple]]:
+    """
+    Streams the rows of a 'yield_per' statement in partitions, on a session of its
+    own: a StreamingResponse body outlives the request's session. Read-only streams
+    use the replica when one is configured and healthy.
+    """
+    replica = read_only and ReplicaSessionLocal is not None and use_replica()
+    if DB_ASYNC:
+        async with (AsyncReplicaSessionLocal if replica else AsyncSessionLocal)() as db:
+            result = await db.stream(stmt)
+            async for partition in result.partitions():
+                yield partition
+        return
+
+    db = (ReplicaSessionLocal if replica else SessionLocal)()
+    try:
+        result = await run_in_threadpool(db.execute, stmt)
+        async for partition in iterate_in_threadpool(result.partitions()):
+            yield partition
+    finally:
+        await run_in_threadpool(db.close)
@@ -1,26 +1,71 @@
 # app/main.py (Updated to include Auth router)
-from fastapi import FastAPI
-from app.routers import reserva, cancha, auth # <-- Added new router
-from app.models import usuario, cancha as models_cancha, reserva as models_reserva 
-from app.core.database import Base, engine 
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.routers import reserva, cancha, auth, admin # <-- Added new router
+from app.models import usuario, cancha as models_cancha, reserva as models_reserva, reserva_slot, reserva_recurrente, reserva_historico, idempotencia
+from app.core.database import engine, async_engine, replica_engine, DB_POOL_RETRY_AFTER 
+from app.core import migrations
+from app.core.replica import replica_health_loop
+from app.core.expiry import EXPIRY_ENABLED, expiry_loop
+from app.core.archive import ARCHIVE_ENABLED, archive_loop
+from app.core.security import ALLOW_EPHEMERAL_SECRET_KEY, SECRET_KEY_EPHEMERAL, shutdown_password_pool
+from app.core.metrics import MetricsMiddleware, db_pool_rejections, render_metrics
+from app.core.profiling import PROFILE_ENABLED, ProfilingMiddleware
+from app.core.idempotency import IdempotencyMiddleware
 from contextlib import asynccontextmanager
+import asyncio
+import os
 import sqlalchemy
 
-# --- Database Table Creation ---
-def create_db_tables():
-    # Ensures all tables (Usuario, Cancha, Reserva) are created.
-    Base.metadata.create_all(bind=engine)
+# --- Schema check ---
+# Tables are created and upgraded by scripts/migrate.py, once per deploy.
+# SCHEMA_CHECK: 'check' (default) compares the schema version with a single query,
+# 'skip' trusts the deploy, 'migrate' applies pending migrations (local development).
+SCHEMA_CHECK = os.getenv("SCHEMA_CHECK", "check").lower()
+
+def prepare_schema():
+    if SCHEMA_CHECK == "skip":
+        return
+    if SCHEMA_CHECK == "migrate":
+        applied = migrations.migrate(engine)
+        if applied:
+            print("Database migrations applied:", applied)
+        return
+    migrations.check_schema(engine)
 
 # --- FastAPI Lifespan ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("Database initialization: Creating tables...")
+    if SECRET_KEY_EPHEMERAL:
+        if not ALLOW_EPHEMERAL_SECRET_KEY:
+            raise RuntimeError(
+                "SECRET_KEY is not set: tokens would only be valid on this worker until it restarts. "
+                "Set SECRET_KEY (or ALLOW_EPHEMERAL_SECRET_KEY=1 for a single local process)."
+            )
+        print("WARNING: SECRET_KEY is not set; using a random per-process key. Tokens won't survive a restart.")
+    # Only an unreachable DB is tolerated; a schema behind the code (check_schema's
+    # RuntimeError) or a failed migration stops the startup
     try:
-        create_db_tables()
-    except Exception as e:
-        print("Warning: could not create database tables at startup:", repr(e))
+        with engine.connect():
+            pass
+    except sqlalchemy.exc.OperationalError as e:
+        print("Warning: database unreachable at startup:", repr(e))
         print("Continuing without DB. Start the DB or fix DATABASE_URL to enable DB features.")
+    else:
+        prepare_schema()
+    # Reads fall back to the primary while the replica fails its health check
+    health_task = asyncio.create_task(replica_health_loop()) if replica_engine is not None else None
+    # Abandoned 'pendiente' holds release their slots after RESERVA_HOLD_MINUTES (opt-in)
+    expiry_task = asyncio.create_task(expiry_loop()) if EXPIRY_ENABLED else None
+    # Past reservations move to reservas_historico (off by default: run scripts/archive_reservas.py)
+    archive_task = asyncio.create_task(archive_loop()) if ARCHIVE_ENABLED else None
     yield
+    for task in (health_task, expiry_task, archive_task):
+        if task is not None:
+            task.cancel()
+    shutdown_password_pool()
+    if async_engine is not None:
+        await async_engine.dispose()
     print("Application shutdown.")
 
 # --- Application Initialization ---
@@ -30,11 +75,38 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# --- Middleware ---
+# Retried POSTs with the same Idempotency-Key replay the first response
+app.add_middleware(IdempotencyMiddleware, paths=["/api/v1/reservas", "/api/v1/register"])
+# Per-route latency, status and SQL accounting, exposed on /metrics
+app.add_middleware(MetricsMiddleware)
+# Opt-in profiler (X-Profile header from an admin, or sampling); absent when disabled
+if PROFILE_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# --- Load shedding ---
+# A pool checkout that outlived its budget (DB_POOL_ADMISSION_TIMEOUT, else
+# DB_POOL_TIMEOUT) means the DB is saturated: tell the client to retry shortly.
+@app.exception_handler(sqlalchemy.exc.TimeoutError)
+async def pool_timeout_handler(request: Request, exc: sqlalchemy.exc.TimeoutError):
+    db_pool_rejections.inc()
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Servicio saturado, intenta de nuevo en unos segundos."},
+        headers={"Retry-After": str(DB_POOL_RETRY_AFTER)}
+    )
+
 # --- Include Routers ---
 app.include_router(auth.router, prefix="/api/v1") # <-- Auth router first
 app.include_router(cancha.router, prefix="/api/v1")
 app.include_router(reserva.router, prefix="/api/v1")
+app.include_router(admin.router, prefix="/api/v1")
 
 @app.get("/", tags=["Root"])
 def read_root():
-    return {"message": "Welcome to the PlayTime API. See /docs for endpoints."}
\ No newline at end of file
+    return {"message": "Welcome to the PlayTime API. See /docs for endpoints."}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
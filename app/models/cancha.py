@@ -1,6 +1,11 @@
-from sqlalchemy import Column, Integer, String, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, Index
+from sqlalchemy.orm import relationship, validates
 from app.core.database import Base
+from app.core.catalog_search import normalize_text
+
+def _normalized(source: str):
+    # Column default for Core/bulk inserts, which bypass the ORM validators below
+    return lambda context: normalize_text(context.get_current_parameters().get(source))
 
 class Cancha(Base):
     __tablename__ = "canchas"
@@ -11,5 +16,20 @@ class Cancha(Base):
     ubicacion = Column(String(100)) 
     estado = Column(Boolean, default=True) # 'activa' (True) / 'inactiva' (False) [cite: 23]
 
+    # Accent- and case-folded copies for search ('Fútbol' -> 'futbol'), kept in sync on write
+    tipo_norm = Column(String(50), default=_normalized("tipo"))
+    ubicacion_norm = Column(String(100), default=_normalized("ubicacion"))
+
     # Relationship to Reserva model 
-    reservas = relationship("Reserva", back_populates="cancha")
\ No newline at end of file
+    reservas = relationship("Reserva", back_populates="cancha")
+    reservas_recurrentes = relationship("ReservaRecurrente", back_populates="cancha")
+
+    __table_args__ = (
+        # Type filter plus id order/keyset of the catalog listing
+        Index("ix_canchas_estado_tipo_norm", "estado", "tipo_norm", "id"),
+    )
+
+    @validates("tipo", "ubicacion")
+    def _sync_norm(self, key, value):
+        setattr(self, f"{key}_norm", normalize_text(value))
+        return value
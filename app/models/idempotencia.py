@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, Text, LargeBinary, DateTime
+from app.core.database import Base, utcnow
+
+class ClaveIdempotencia(Base):
+    __tablename__ = "claves_idempotencia"
+
+    # Shared store of Idempotency-Key responses (app/core/idempotency.py), used when
+    # IDEMPOTENCY_DB is on so every worker replays the same first response.
+    clave = Column(String(64), primary_key=True) # sha256 of route, caller and key
+    huella = Column(String(64), nullable=False) # sha256 of the request body
+    status = Column(Integer, nullable=True) # NULL while the first request is running
+    headers = Column(Text, nullable=True) # JSON list of [name, value]
+    body = Column(LargeBinary, nullable=True)
+    creado_en = Column(DateTime, default=utcnow, index=True)
+    # Lease on the placeholder: refreshed by the worker running the first request;
+    # once it lapses the worker is presumed dead and the key can be claimed again
+    renovada_en = Column(DateTime, default=utcnow, nullable=True)
@@ -1,6 +1,9 @@
-from sqlalchemy import Column, Integer, String, Date, Time, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, DateTime, Time, ForeignKey, Index
 from sqlalchemy.orm import relationship
-from app.core.database import Base
+from app.core.database import Base, utcnow
+
+# Reservations in these states block their time slot
+ACTIVE_STATUSES = ["pendiente", "aprobada"]
 
 class Reserva(Base):
     __tablename__ = "reservas"
@@ -9,7 +12,9 @@ class Reserva(Base):
     fecha = Column(Date) 
     hora_inicio = Column(Time) 
     hora_fin = Column(Time) 
-    estado = Column(String(20), default="pendiente") # 'pendiente', 'aprobada', 'cancelada' [cite: 25]
+    estado = Column(String(20), default="pendiente") # 'pendiente', 'aprobada', 'cancelada', 'expirada' [cite: 25]
+    # Start of the hold: pending reservations older than RESERVA_HOLD_MINUTES expire (app/core/expiry.py)
+    creado_en = Column(DateTime, default=utcnow)
 
     # Foreign Keys [cite: 25]
     usuario_id = Column(Integer, ForeignKey("usuarios.id"))
@@ -18,5 +23,17 @@ class Reserva(Base):
     # Relationships 
     usuario = relationship("Usuario", back_populates="reservas")
     cancha = relationship("Cancha", back_populates="reservas")
+
+    __table_args__ = (
+        # Overlap checks, availability grids and batch loads: equality on court, day and
+        # state, range on the times. Holding both times makes those reads index-only.
+        Index("ix_reservas_cancha_fecha_estado_horas", "cancha_id", "fecha", "estado", "hora_inicio", "hora_fin"),
+        # "My reservations": filter and keyset order (fecha, hora_inicio, id) in one index
+        Index("ix_reservas_usuario_fecha_hora", "usuario_id", "fecha", "hora_inicio", "id"),
+        # Expiry sweep: the oldest pending holds, without scanning the rest of the table
+        Index("ix_reservas_estado_creado", "estado", "creado_en", "id"),
+        # Archiver: the oldest days first (app/core/archive.py)
+        Index("ix_reservas_fecha", "fecha", "id"),
+    )
     
     # NOTE: The unique validation for overlapping times [cite: 27] will be handled in the CRUD logic.
\ No newline at end of file
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, Time, ForeignKey, Index
+from app.core.database import Base
+
+class ReservaHistorico(Base):
+    __tablename__ = "reservas_historico"
+
+    # Past reservations moved out of `reservas` by the archiver (app/core/archive.py),
+    # so booking-time queries only pay for today and the future. Rows keep their
+    # original id; nothing here blocks a slot.
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    fecha = Column(Date)
+    hora_inicio = Column(Time)
+    hora_fin = Column(Time)
+    estado = Column(String(20))
+    creado_en = Column(DateTime)
+    archivada_en = Column(DateTime)
+
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"))
+    cancha_id = Column(Integer, ForeignKey("canchas.id"))
+
+    __table_args__ = (
+        # "My reservations" with history: same keyset order as the hot table
+        Index("ix_historico_usuario_fecha_hora", "usuario_id", "fecha", "hora_inicio", "id"),
+        # Reports by date range
+        Index("ix_historico_fecha", "fecha"),
+    )
@@ -0,0 +1,44 @@
+from sqlalchemy import Column, Integer, String, Date, Time, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from app.core.database import Base
+from datetime import date, timedelta
+from typing import Iterator
+
+class ReservaRecurrente(Base):
+    __tablename__ = "reservas_recurrentes"
+
+    # A weekly rule ("every Tuesday 19:00-20:00 from fecha_inicio to fecha_fin").
+    # Occurrences are never stored; they are expanded on demand with ocurrencias().
+    id = Column(Integer, primary_key=True, index=True)
+    dia_semana = Column(Integer) # date.weekday(): 0 = lunes ... 6 = domingo
+    hora_inicio = Column(Time)
+    hora_fin = Column(Time)
+    fecha_inicio = Column(Date) # First occurrence
+    fecha_fin = Column(Date) # Last possible occurrence, inclusive
+    estado = Column(String(20), default="pendiente") # 'pendiente', 'aprobada', 'cancelada'
+
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"))
+    cancha_id = Column(Integer, ForeignKey("canchas.id"))
+
+    usuario = relationship("Usuario", back_populates="reservas_recurrentes")
+    cancha = relationship("Cancha", back_populates="reservas_recurrentes")
+
+    __table_args__ = (
+        # Series conflicts and expansion: by court (and weekday) among active series
+        Index("ix_series_cancha_dia_estado", "cancha_id", "dia_semana", "estado", "fecha_inicio"),
+        # A user's series, in id order
+        Index("ix_series_usuario", "usuario_id", "id"),
+    )
+
+    def ocurrencias(self, desde: date, hasta: date) -> Iterator[date]:
+        """Lazily yields the dates of this series that fall in [desde, hasta]."""
+        return iter_ocurrencias(self.fecha_inicio, self.fecha_fin, self.dia_semana, desde, hasta)
+
+def iter_ocurrencias(fecha_inicio: date, fecha_fin: date, dia_semana: int, desde: date, hasta: date) -> Iterator[date]:
+    """Weekly dates on 'dia_semana' within both [fecha_inicio, fecha_fin] and [desde, hasta]."""
+    current = max(fecha_inicio, desde)
+    end = min(fecha_fin, hasta)
+    current += timedelta(days=(dia_semana - current.weekday()) % 7)
+    while current <= end:
+        yield current
+        current += timedelta(days=7)
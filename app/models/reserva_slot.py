@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, Date, ForeignKey
+from app.core.database import Base
+
+class ReservaSlot(Base):
+    __tablename__ = "reserva_slots"
+
+    # One lock row per court and day. Bookings touch this row first, so the DB row
+    # lock serializes writers of the same court-day while other courts/days proceed
+    # in parallel.
+    cancha_id = Column(Integer, ForeignKey("canchas.id"), primary_key=True)
+    fecha = Column(Date, primary_key=True)
+    version = Column(Integer, default=0, nullable=False) # Bumped on every locked write
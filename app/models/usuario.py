@@ -16,4 +16,5 @@ class Usuario(Base):
     is_active = Column(Boolean, default=True)
 
     # Relationship to Reserva model 
-    reservas = relationship("Reserva", back_populates="usuario")
\ No newline at end of file
+    reservas = relationship("Reserva", back_populates="usuario")
+    reservas_recurrentes = relationship("ReservaRecurrente", back_populates="usuario")
\ No newline at end of file
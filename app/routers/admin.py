@@ -0,0 +1,55 @@
+# app/routers/admin.py
+from fastapi import APIRouter, Depends, Query, status
+from starlette.concurrency import run_in_threadpool
+from app.core.cache import cache_stats
+from app.core.database import pool_stats
+from app.core.profiling import list_profiles
+from app.core.rate_limit import rate_limit_stats
+from app.dependencies.auth import is_admin
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"]
+)
+
+# GET /api/v1/admin/cache: Contadores de las cachés en memoria
+@router.get("/cache", status_code=status.HTTP_200_OK)
+async def read_cache_stats(current_admin: dict = Depends(is_admin)):
+    """
+    Returns hit/miss/eviction counters and sizes of every in-process cache.
+    Only accessible by an Administrator.
+    """
+    return cache_stats()
+
+# GET /api/v1/admin/pool: Ocupación del pool de conexiones
+@router.get("/pool", status_code=status.HTTP_200_OK)
+async def read_pool_stats(current_admin: dict = Depends(is_admin)):
+    """
+    Returns the live state of the connection pools of this worker: size, checked
+    out, overflow and checkouts waiting for a connection.
+    Only accessible by an Administrator.
+    """
+    return pool_stats()
+
+# GET /api/v1/admin/rate-limits: Estado de los limitadores de tasa
+@router.get("/rate-limits", status_code=status.HTTP_200_OK)
+async def read_rate_limit_stats(current_admin: dict = Depends(is_admin)):
+    """
+    Returns the budget, tracked keys and rejections of every rate limiter used
+    so far by this worker.
+    Only accessible by an Administrator.
+    """
+    return rate_limit_stats()
+
+# GET /api/v1/admin/profiles: Perfiles de peticiones guardados en disco
+@router.get("/profiles", status_code=status.HTTP_200_OK)
+async def read_profiles(
+    limit: int = Query(50, ge=1, le=500),
+    current_admin: dict = Depends(is_admin)
+):
+    """
+    Lists the most recent request profiles (see PROFILE_ENABLED) and summarizes
+    the top SQL statements and Python frames per route.
+    Only accessible by an Administrator.
+    """
+    return await run_in_threadpool(list_profiles, limit)
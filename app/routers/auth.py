@@ -1,66 +1,67 @@
 # app/routers/auth.py
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.dependencies.database import get_db
+from app.dependencies.database import DbSession, get_session, run_db
+from app.core.security import hash_password_async, verify_password_async, create_access_token, ACCESS_TOKEN_TTL
+from app.dependencies.auth import get_current_usuario
 from app.schemas.usuario import Usuario, UsuarioCreate, UserLogin
 from app.crud import usuario as crud_usuario
+from app.core.rate_limit import rate_limit
 
-# --- Simple Authentication Logic (Mocked) ---
-# NOTE: In a production app, this would involve JWT tokens stored in cookies/headers.
-# For simplicity and "Login básico", we use a simple dependency mock here.
+# --- Token Authentication ---
+# /login issues a signed bearer token carrying the user id and 'rol'; protected
+# routes verify it with app.dependencies.auth.get_current_user (no DB lookup).
 
 router = APIRouter(
     tags=["Auth & Usuarios"]
 )
 
-# Mock user data store for session simulation (replace with proper session/JWT logic)
-MOCK_LOGGED_IN_USER_ID = 1
-
-def get_current_user_mock(db: Session = Depends(get_db)):
-    """
-    MOCK Dependency: Simulates retrieving the currently logged-in user.
-    In a real app, this would decode a JWT or check a session ID.
-    """
-    user = crud_usuario.get_user_by_id(db, MOCK_LOGGED_IN_USER_ID)
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="No autenticado"
-        )
-    return user
-
-# The 'is_admin' dependency from reserva.py is already sufficient:
-# from app.routers.reserva import is_admin 
-
 # --- Endpoints ---
 
-@router.post("/register", response_model=Usuario, status_code=status.HTTP_201_CREATED)
-def register_user(user: UsuarioCreate, db: Session = Depends(get_db)):
+@router.post("/register", response_model=Usuario, status_code=status.HTTP_201_CREATED, dependencies=[Depends(rate_limit("register"))])
+async def register_user(user: UsuarioCreate, db: DbSession = Depends(get_session, scope="function")):
     """
     Endpoint for a new player (Jugador) to register.
     """
-    return crud_usuario.create_user(db=db, user=user, rol="jugador")
+    # bcrypt is CPU-bound: hash in the password worker pool, never on the event loop
+    hashed_password = await hash_password_async(user.password)
+    return await run_db(db, crud_usuario.create_user, user=user, rol="jugador", hashed_password=hashed_password)
 
-@router.post("/login")
-def login_for_access_token(user_data: UserLogin, db: Session = Depends(get_db)):
+@router.post("/login", dependencies=[Depends(rate_limit("login"))])
+async def login_for_access_token(user_data: UserLogin, db: DbSession = Depends(get_session, scope="function")):
     """
-    Authenticates a user and simulates the login success.
+    Authenticates a user and returns a signed access token.
     """
-    user = crud_usuario.get_user_by_email(db, user_data.email)
+    user = await run_db(db, crud_usuario.get_user_by_email, user_data.email)
     
-    # 1. Check if user exists and password is correct
-    if not user or not crud_usuario.verify_password(user_data.password, user.hashed_password):
+    # 1. Check if user exists and password is correct (bcrypt runs in the worker pool)
+    valid, new_hash = (False, None)
+    if user:
+        valid, new_hash = await verify_password_async(user_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email o contraseña incorrecta"
         )
+
+    # Read before any commit below expires the ORM object
+    user_id, rol = user.id, user.rol
+
+    # The stored hash used an outdated bcrypt cost: replace it while we know the password
+    if new_hash:
+        await run_db(db, crud_usuario.update_password_hash, user_id=user_id, hashed_password=new_hash)
     
-    # 2. Mocking successful login: return the user object (in a real app, you'd return a JWT)
-    # The MOCK_LOGGED_IN_USER_ID above would be set here in a real session/JWT implementation.
-    return {"message": "Login exitoso", "user_id": user.id, "rol": user.rol}
+    # 2. Issue the access token (send it back as 'Authorization: Bearer <token>')
+    return {
+        "message": "Login exitoso",
+        "user_id": user_id,
+        "rol": rol,
+        "access_token": create_access_token(user_id, rol),
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_TTL
+    }
 
 @router.get("/users/me", response_model=Usuario)
-def read_users_me(current_user: Usuario = Depends(get_current_user_mock)):
+async def read_users_me(current_user: Usuario = Depends(get_current_usuario)):
     """
     Retrieves the details of the currently authenticated user (Jugador or Administrador).
     """
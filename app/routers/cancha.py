@@ -1,9 +1,16 @@
 # app/routers/cancha.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from app.schemas.cancha import Cancha
-from app.dependencies.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, WebSocket
+from fastapi.responses import StreamingResponse
+from app.schemas.cancha import Cancha, Disponibilidad
+from app.dependencies.database import DbSession, get_session, get_read_session, run_db
 from app.crud import cancha as crud_cancha
+from app.crud import disponibilidad as crud_disponibilidad
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from app.core.events import EVENTS_HEARTBEAT, SubscriberDropped, event_hub
+from app.core.rate_limit import rate_limit
+from datetime import date, time, timedelta
+import asyncio
+import json
 from typing import List, Optional
 
 router = APIRouter(
@@ -12,44 +19,234 @@ router = APIRouter(
 )
 
 # GET /api/v1/canchas: Lista canchas disponibles (filtros: tipo, ubicación). [cite: 29]
-@router.get("/", response_model=List[Cancha], status_code=status.HTTP_200_OK)
-def list_canchas_route(
-    db: Session = Depends(get_db), 
+@router.get("/", response_model=List[Cancha], status_code=status.HTTP_200_OK, dependencies=[Depends(rate_limit("canchas"))])
+async def list_canchas_route(
+    response: Response,
+    db: DbSession = Depends(get_read_session, scope="function"), 
     # Filters
     tipo: Optional[str] = Query(None, description="Filtrar por tipo de cancha (e.g., fútbol, baloncesto)."),
     ubicacion: Optional[str] = Query(None, description="Filtrar por ubicación o parte de la ubicación."),
     # Pagination
-    page: int = Query(1, ge=1, description="Número de página."),
-    limit: int = Query(10, ge=1, le=100, description="Resultados por página.")
+    page: int = Query(1, ge=1, description="Número de página (compatibilidad; preferir 'cursor')."),
+    limit: int = Query(10, ge=1, le=100, description="Resultados por página."),
+    cursor: Optional[str] = Query(None, description=f"Cursor opaco de la cabecera {NEXT_CURSOR_HEADER}; si se indica, se ignora 'page'.")
 ):
     """
     Retrieves a paginated list of available courts, with optional filters for type and location.
     The 'page' and 'limit' parameters implement the pagination requirement. [cite: 40]
+    Keyset pagination: when a full page is returned, the X-Next-Cursor header holds
+    the cursor of the next one.
+    """
+    skip = (page - 1) * limit
+    after_id = None
+    if cursor is not None:
+        try:
+            (after_id,) = decode_cursor(cursor, 1)
+            after_id = int(after_id)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido.")
+        skip = 0
+
+    # Served from the catalog cache when possible; the DB session is only used on a miss
+    key = crud_cancha.catalog_list_key(tipo, ubicacion, skip, limit, after_id)
+    canchas = crud_cancha.catalog_cache.get(key)
+    if canchas is None:
+        version = crud_cancha.catalog_cache.version
+        rows = await run_db(
+            db,
+            crud_cancha.get_all_canchas,
+            tipo=tipo, 
+            ubicacion=ubicacion, 
+            skip=skip, 
+            limit=limit,
+            after_id=after_id
+        )
+        canchas = [Cancha.model_validate(row) for row in rows]
+        crud_cancha.catalog_cache.set(key, canchas, version=version)
+
+    if len(canchas) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([canchas[-1].id])
+    return canchas
+
+# GET /api/v1/canchas/buscar: Canchas libres (filtros: tipo, ubicación) en una fecha y horario
+# Declared before /{cancha_id} so 'buscar' is not taken as an id.
+@router.get("/buscar", response_model=List[Cancha], status_code=status.HTTP_200_OK, dependencies=[Depends(rate_limit("canchas"))])
+async def search_free_canchas_route(
+    fecha: date = Query(..., description="Día de la reserva."),
+    hora_inicio: time = Query(..., description="Hora de inicio (e.g., 18:00)."),
+    hora_fin: time = Query(..., description="Hora de fin (e.g., 19:00)."),
+    tipo: Optional[str] = Query(None, description="Filtrar por tipo de cancha (e.g., fútbol, baloncesto)."),
+    ubicacion: Optional[str] = Query(None, description="Filtrar por ubicación o parte de la ubicación."),
+    page: int = Query(1, ge=1, description="Número de página."),
+    limit: int = Query(10, ge=1, le=100, description="Resultados por página."),
+    db: DbSession = Depends(get_read_session, scope="function")
+):
     """
+    Finds courts of the requested type/location that are free for the whole slot,
+    ranked by location match and paginated.
+    """
+    if hora_fin <= hora_inicio:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'hora_fin' debe ser posterior a 'hora_inicio'."
+        )
     skip = (page - 1) * limit
-    canchas = crud_cancha.get_all_canchas(
-        db=db, 
-        tipo=tipo, 
-        ubicacion=ubicacion, 
-        skip=skip, 
+    return await run_db(
+        db,
+        crud_cancha.search_free_canchas,
+        fecha=fecha,
+        hora_inicio=hora_inicio,
+        hora_fin=hora_fin,
+        tipo=tipo,
+        ubicacion=ubicacion,
+        skip=skip,
         limit=limit
     )
-    return canchas
 
 # GET /api/v1/canchas/{id}: Muestra detalles de una cancha. [cite: 29]
-@router.get("/{cancha_id}", response_model=Cancha, status_code=status.HTTP_200_OK)
-def get_cancha_details_route(
+@router.get("/{cancha_id}", response_model=Cancha, status_code=status.HTTP_200_OK, dependencies=[Depends(rate_limit("canchas"))])
+async def get_cancha_details_route(
     cancha_id: int, 
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_read_session, scope="function")
 ):
     """
     Retrieves detailed information for a specific court.
     """
-    db_cancha = crud_cancha.get_cancha_by_id(db, cancha_id=cancha_id)
+    key = crud_cancha.catalog_detail_key(cancha_id)
+    db_cancha = crud_cancha.catalog_cache.get(key)
+    if db_cancha is not None:
+        return db_cancha
+
+    version = crud_cancha.catalog_cache.version
+    db_cancha = await run_db(db, crud_cancha.get_cancha_by_id, cancha_id=cancha_id)
+    if db_cancha is not None:
+        db_cancha = Cancha.model_validate(db_cancha)
+        crud_cancha.catalog_cache.set(key, db_cancha, version=version)
     if db_cancha is None:
         # Use the specified 404 error code for 'cancha no encontrada' [cite: 41]
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail="Cancha no encontrada."
         )
-    return db_cancha
\ No newline at end of file
+    return db_cancha
+
+# GET /api/v1/canchas/{id}/disponibilidad: Franjas libres de una cancha por día
+@router.get("/{cancha_id}/disponibilidad", response_model=Disponibilidad, status_code=status.HTTP_200_OK, dependencies=[Depends(rate_limit("canchas"))])
+async def get_cancha_disponibilidad_route(
+    cancha_id: int,
+    desde: Optional[date] = Query(None, description="Primer día (por defecto, hoy)."),
+    hasta: Optional[date] = Query(None, description="Último día, inclusive (por defecto, desde + 6 días)."),
+    db: DbSession = Depends(get_session, scope="function")
+):
+    """
+    Returns the free time slots of a court for each day in [desde, hasta] in one call,
+    so clients don't have to probe POST /reservas for conflicts.
+    """
+    desde = desde or date.today()
+    hasta = hasta or desde + timedelta(days=6)
+    if hasta < desde:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'hasta' no puede ser anterior a 'desde'."
+        )
+    if (hasta - desde).days >= crud_disponibilidad.MAX_DIAS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El rango no puede superar {crud_disponibilidad.MAX_DIAS} días."
+        )
+
+    dias = await run_db(db, crud_disponibilidad.get_disponibilidad, cancha_id=cancha_id, desde=desde, hasta=hasta)
+    if dias is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, 
+            detail="Cancha no encontrada."
+        )
+    return {
+        "cancha_id": cancha_id,
+        "desde": desde,
+        "hasta": hasta,
+        "resolucion_minutos": crud_disponibilidad.SLOT_MINUTES,
+        "dias": dias
+    }
+
+
+# --- Live availability ---
+
+# WS /api/v1/canchas/{id}/disponibilidad/ws?fecha=: Cambios de disponibilidad en vivo
+@router.websocket("/{cancha_id}/disponibilidad/ws")
+async def disponibilidad_ws(
+    websocket: WebSocket,
+    cancha_id: int,
+    fecha: date = Query(..., description="Día a observar.")
+):
+    """
+    Pushes a JSON message ('slot_tomado' / 'slot_liberado') whenever a reservation
+    of the court-day is created, cancelled, re-decided or expires. A client that
+    can't keep up is disconnected with code 1013 and should re-read the grid.
+    """
+    if event_hub.full:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+    await websocket.accept()
+    # Subscribed only once the handshake succeeded, so a failed accept() leaves nothing behind
+    subscription = event_hub.subscribe(cancha_id, fecha)
+    if subscription is None:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+
+    async def pump():
+        try:
+            while True:
+                await websocket.send_json(await subscription.get())
+        except SubscriberDropped:
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Cliente lento.")
+        except Exception:
+            pass # Client gone; the receive loop below notices
+
+    sender = asyncio.create_task(pump())
+    try:
+        # Nothing is expected from the client: just wait for it to leave
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        sender.cancel()
+        event_hub.unsubscribe(subscription)
+
+
+# GET /api/v1/canchas/{id}/disponibilidad/eventos?fecha=: Lo mismo como Server-Sent Events
+@router.get("/{cancha_id}/disponibilidad/eventos")
+async def disponibilidad_eventos(
+    cancha_id: int,
+    fecha: date = Query(..., description="Día a observar.")
+):
+    """
+    Server-Sent Events version of the WebSocket feed, for clients behind proxies
+    that don't pass WebSockets. The stream ends if the client falls behind.
+    """
+    if event_hub.full:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Demasiadas suscripciones, intenta de nuevo en unos segundos."
+        )
+
+    async def body():
+        # Subscribed when streaming starts: a client that leaves before that never
+        # runs the generator, and so never leaves a subscription behind
+        yield "retry: 3000\n\n"
+        subscription = event_hub.subscribe(cancha_id, fecha)
+        if subscription is None:
+            return # Filled up meanwhile; the client reconnects after 'retry'
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {event['tipo']}\ndata: {json.dumps(event)}\n\n"
+        except SubscriberDropped:
+            return
+        finally:
+            event_hub.unsubscribe(subscription)
+
+    return StreamingResponse(body(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
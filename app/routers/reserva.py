@@ -1,20 +1,23 @@
 # app/routers/reserva.py
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.schemas.reserva import Reserva, ReservaCreate, ReservaUpdateAdmin
-from app.dependencies.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import StreamingResponse
+from app.schemas.reserva import (
+    Reserva, ReservaCreate, ReservaUpdateAdmin, ReservaBatchCreate, ReservaBatchResult,
+    ReservaRecurrente, ReservaRecurrenteCreate, MAX_SERIE_DIAS
+)
+from app.models.reserva import ACTIVE_STATUSES
+from app.dependencies.database import DbSession, get_session, get_read_session, run_db, stream_partitions
+from app.dependencies.auth import get_current_user, is_admin
 from app.crud import reserva as crud_reserva
-from typing import List
-
-# Mock function for getting the current user (simplifies the example)
-def get_current_user(user_id: int = 1, rol: str = "jugador"): # Mocking a logged-in user 
-    return {"id": user_id, "rol": rol}
-
-# Dependency for Admin role checking (as required by PUT route [cite: 12])
-def is_admin(current_user: dict = Depends(get_current_user)):
-    if current_user["rol"] != "administrador":
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso denegado: solo para administradores.")
-    return current_user
+from app.crud import reserva_recurrente as crud_recurrente
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from app.core.replica import mark_write
+from app.core.rate_limit import rate_limit
+from app.core.export import encode_csv, encode_csv_header, encode_ndjson
+from datetime import date, time, timedelta
+from typing import List, Literal, Optional
+import json
+import sqlalchemy.exc
 
 router = APIRouter(
     prefix="/reservas",
@@ -22,10 +25,10 @@ router = APIRouter(
 )
 
 # POST /api/v1/reservas: Crea una reserva [cite: 29]
-@router.post("/", response_model=Reserva, status_code=status.HTTP_201_CREATED)
-def create_reserva_route(
+@router.post("/", response_model=Reserva, status_code=status.HTTP_201_CREATED, dependencies=[Depends(rate_limit("reservas"))])
+async def create_reserva_route(
     reserva: ReservaCreate, 
-    db: Session = Depends(get_db), 
+    db: DbSession = Depends(get_session, scope="function"), 
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -33,31 +36,216 @@ def create_reserva_route(
     Checks for conflicts before creation.
     """
     try:
-        return crud_reserva.create_reserva(db=db, reserva=reserva, user_id=current_user["id"])
-    except HTTPException as e:
-        raise e
+        db_reserva = await run_db(db, crud_reserva.create_reserva, reserva=reserva, user_id=current_user["id"])
+        mark_write(current_user["id"]) # Read-your-writes: next reads go to the primary
+        return db_reserva
+    except (HTTPException, sqlalchemy.exc.TimeoutError):
+        raise # Pool timeouts are turned into 503 by the app's handler
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
+# POST /api/v1/reservas/batch: Crea varias reservas en una sola transacción
+@router.post("/batch", response_model=ReservaBatchResult, status_code=status.HTTP_201_CREATED, dependencies=[Depends(rate_limit("reservas"))])
+async def create_reservas_batch_route(
+    batch: ReservaBatchCreate,
+    db: DbSession = Depends(get_session, scope="function"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Creates many reservations at once (e.g., a league season) with per-item results.
+    In 'todo_o_nada' mode any conflict rejects the whole batch with 409;
+    in 'parcial' mode the items that fit are created, and 409 is returned only
+    when none did.
+    """
+    resultados = await run_db(
+        db,
+        crud_reserva.create_reservas_batch,
+        items=batch.items,
+        user_id=current_user["id"],
+        todo_o_nada=batch.modo == "todo_o_nada"
+    )
+    creadas = sum(1 for r in resultados if r["ok"])
+    if creadas:
+        mark_write(current_user["id"])
+    if creadas == 0:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=ReservaBatchResult(modo=batch.modo, creadas=0, resultados=resultados).model_dump(mode="json")
+        )
+    return {"modo": batch.modo, "creadas": creadas, "resultados": resultados}
+
+
 # GET /api/v1/reservas/mis: Muestra reservas del usuario [cite: 29]
 @router.get("/mis", response_model=List[Reserva])
-def read_my_reservas(
-    db: Session = Depends(get_db), 
+async def read_my_reservas(
+    response: Response,
+    page: Optional[int] = Query(None, ge=1, description="Número de página (compatibilidad; preferir 'cursor')."),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Resultados por página (100 si se usa 'page' o 'cursor')."),
+    cursor: Optional[str] = Query(None, description=f"Cursor opaco de la cabecera {NEXT_CURSOR_HEADER}."),
+    historial: bool = Query(False, description="Incluir las reservas pasadas ya archivadas."),
+    db: DbSession = Depends(get_read_session, scope="function"), 
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Retrieves the reservations made by the current logged-in user, ordered by date and time.
+    Without 'limit', 'page' or 'cursor' every reservation is returned, as before
+    pagination existed. Otherwise it pages (100 per page by default) by keyset:
+    when a full page is returned, the X-Next-Cursor header holds the cursor of the
+    next one. Past reservations moved to the archive are only included with
+    'historial'.
+    """
+    after = None
+    if cursor is not None:
+        try:
+            fecha, hora_inicio, reserva_id = decode_cursor(cursor, 3)
+            after = (date.fromisoformat(fecha), time.fromisoformat(hora_inicio), int(reserva_id))
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido.")
+    if limit is None and (page or after is not None):
+        limit = 100
+    skip = (page - 1) * limit if page and after is None else 0
+
+    reservas = await run_db(
+        db,
+        crud_reserva.get_user_reservas,
+        user_id=current_user["id"],
+        limit=limit,
+        skip=skip,
+        after=after,
+        historial=historial
+    )
+    if limit is not None and len(reservas) == limit:
+        last = reservas[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([last.fecha, last.hora_inicio, last.id])
+    return reservas
+
+
+# GET /api/v1/reservas/export: Exporta reservas para reportes (admin)
+@router.get("/export")
+async def export_reservas_route(
+    desde: Optional[date] = Query(None, description="Primer día, inclusive."),
+    hasta: Optional[date] = Query(None, description="Último día, inclusive."),
+    cancha_id: Optional[int] = Query(None, description="Solo las reservas de esta cancha."),
+    formato: Literal["csv", "ndjson"] = Query("csv", description="Formato de salida."),
+    historial: bool = Query(True, description="Incluir las reservas archivadas."),
+    current_admin: dict = Depends(is_admin)
+):
+    """
+    Streams every matching reservation as CSV or NDJSON, in id order.
+    Rows are read as plain tuples from a server-side cursor and written one
+    partition at a time, so memory stays flat whatever the result size.
+    Only accessible by an Administrator.
+    """
+    if desde and hasta and hasta < desde:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'hasta' no puede ser anterior a 'desde'.")
+    stmt = crud_reserva.export_query(desde=desde, hasta=hasta, cancha_id=cancha_id, historial=historial)
+    columns = crud_reserva.EXPORT_COLUMNS
+
+    async def body():
+        if formato == "csv":
+            yield encode_csv_header(columns)
+        async for rows in stream_partitions(stmt):
+            yield encode_csv(rows) if formato == "csv" else encode_ndjson(rows, columns)
+
+    media_type = "text/csv" if formato == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="reservas.{formato}"'}
+    )
+
+
+# --- Recurring series ---
+
+# POST /api/v1/reservas/recurrentes: Crea una serie semanal
+@router.post("/recurrentes", response_model=ReservaRecurrente, status_code=status.HTTP_201_CREATED, dependencies=[Depends(rate_limit("reservas"))])
+async def create_serie_route(
+    serie: ReservaRecurrenteCreate,
+    db: DbSession = Depends(get_session, scope="function"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Creates a weekly series ('pendiente') on the weekday of 'fecha_inicio'.
+    Every occurrence is checked for conflicts before the series is stored.
+    """
+    db_serie = await run_db(db, crud_recurrente.create_serie, serie=serie, user_id=current_user["id"])
+    mark_write(current_user["id"])
+    return db_serie
+
+
+# GET /api/v1/reservas/recurrentes/mis: Series del usuario
+@router.get("/recurrentes/mis", response_model=List[ReservaRecurrente])
+async def read_my_series(
+    db: DbSession = Depends(get_read_session, scope="function"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Retrieves the recurring series (rules, not occurrences) of the current user.
+    """
+    return await run_db(db, crud_recurrente.get_user_series, user_id=current_user["id"])
+
+
+# GET /api/v1/reservas/recurrentes/mis/ocurrencias: Ocurrencias de las series del usuario
+@router.get("/recurrentes/mis/ocurrencias")
+async def stream_my_ocurrencias(
+    desde: Optional[date] = Query(None, description="Primer día (por defecto, hoy)."),
+    hasta: Optional[date] = Query(None, description="Último día, inclusive (por defecto, un año después de 'desde')."),
+    db: DbSession = Depends(get_read_session, scope="function"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Streams the occurrences of the user's active series in [desde, hasta] as a JSON
+    array ordered by date. Occurrences are expanded while the response is written,
+    never materialized as a list.
+    """
+    desde = desde or date.today()
+    hasta = hasta or desde + timedelta(days=MAX_SERIE_DIAS)
+    if hasta < desde:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'hasta' no puede ser anterior a 'desde'.")
+
+    series = await run_db(db, crud_recurrente.get_user_series, user_id=current_user["id"], desde=desde, hasta=hasta)
+    series = [s for s in series if s.estado in ACTIVE_STATUSES]
+
+    def body():
+        yield "["
+        separator = ""
+        for fecha, serie in crud_recurrente.merge_ocurrencias(series, desde, hasta):
+            yield separator + json.dumps({
+                "serie_id": serie.id,
+                "cancha_id": serie.cancha_id,
+                "fecha": fecha.isoformat(),
+                "hora_inicio": serie.hora_inicio.isoformat(),
+                "hora_fin": serie.hora_fin.isoformat(),
+                "estado": serie.estado
+            })
+            separator = ","
+        yield "]"
+
+    return StreamingResponse(body(), media_type="application/json")
+
+
+# DELETE /api/v1/reservas/recurrentes/{id}: Cancela una serie completa
+@router.delete("/recurrentes/{serie_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_serie_route(
+    serie_id: int,
+    db: DbSession = Depends(get_session, scope="function"),
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Retrieves all reservations made by the current logged-in user.
+    Cancels every remaining occurrence of a series. Only the owner can use this route.
     """
-    return crud_reserva.get_user_reservas(db=db, user_id=current_user["id"])
+    await run_db(db, crud_recurrente.cancel_serie, serie_id=serie_id, user_id=current_user["id"])
+    mark_write(current_user["id"])
+    return None
 
 
 # PUT /api/v1/reservas/{id}: Aprueba o cancela una reserva (admin) [cite: 29]
 @router.put("/{reserva_id}", response_model=Reserva)
-def update_reserva_route(
+async def update_reserva_route(
     reserva_id: int,
     update_data: ReservaUpdateAdmin,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_session, scope="function"),
     # Requires Admin role to approve/reject
     current_admin: dict = Depends(is_admin) 
 ):
@@ -65,18 +253,21 @@ def update_reserva_route(
     Updates the status of a reservation (e.g., 'aprobada', 'cancelada'). 
     Only accessible by an Administrator.
     """
-    return crud_reserva.update_reserva_status(db=db, reserva_id=reserva_id, update_data=update_data)
+    db_reserva = await run_db(db, crud_reserva.update_reserva_status, reserva_id=reserva_id, update_data=update_data)
+    mark_write(db_reserva.usuario_id) # The owner sees the new status on their next read
+    return db_reserva
 
 
 # DELETE /api/v1/reservas/{id}: Cancela una reserva (jugador) [cite: 29]
 @router.delete("/{reserva_id}", status_code=status.HTTP_204_NO_CONTENT)
-def cancel_reserva_route(
+async def cancel_reserva_route(
     reserva_id: int,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_session, scope="function"),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Cancels a reservation. Only the owner (Jugador) can use this route.
     """
-    crud_reserva.cancel_reserva(db=db, reserva_id=reserva_id, user_id=current_user["id"])
+    await run_db(db, crud_reserva.cancel_reserva, reserva_id=reserva_id, user_id=current_user["id"])
+    mark_write(current_user["id"])
     return None # Return 204 No Content for a successful DELETE
\ No newline at end of file
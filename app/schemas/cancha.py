@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from typing import Optional
+from datetime import date, time
+from typing import List, Optional
 
 class CanchaBase(BaseModel):
     nombre: str
@@ -14,4 +15,20 @@ class Cancha(CanchaBase):
     estado: bool # True for 'activa'
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+# For GET /canchas/{id}/disponibilidad
+class FranjaLibre(BaseModel):
+    hora_inicio: time
+    hora_fin: time
+
+class DisponibilidadDia(BaseModel):
+    fecha: date
+    libres: List[FranjaLibre]
+
+class Disponibilidad(BaseModel):
+    cancha_id: int
+    desde: date
+    hasta: date
+    resolucion_minutos: int
+    dias: List[DisponibilidadDia]
\ No newline at end of file
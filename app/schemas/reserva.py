@@ -1,6 +1,11 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import date, time
-from typing import Optional
+from typing import List, Literal, Optional
+
+# Largest number of items accepted by POST /reservas/batch
+MAX_BATCH_ITEMS = 500
+# Longest span of a recurring series, in days
+MAX_SERIE_DIAS = 366
 
 # For Request (POST /reservas) [cite: 30]
 class ReservaCreate(BaseModel):
@@ -27,4 +32,47 @@ class Reserva(BaseModel):
     cancha_id: int
     
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+# For Request (POST /reservas/batch)
+class ReservaBatchCreate(BaseModel):
+    items: List[ReservaCreate] = Field(..., min_length=1, max_length=MAX_BATCH_ITEMS)
+    # 'todo_o_nada': any conflict rejects the whole batch; 'parcial': create what fits
+    modo: Literal["todo_o_nada", "parcial"] = "todo_o_nada"
+
+# Per-item outcome of a batch
+class ReservaBatchItem(BaseModel):
+    indice: int # Position in the request's 'items'
+    ok: bool
+    reserva: Optional[Reserva] = None
+    error: Optional[str] = None
+
+# For Response (POST /reservas/batch)
+class ReservaBatchResult(BaseModel):
+    modo: str
+    creadas: int
+    resultados: List[ReservaBatchItem]
+
+# For Request (POST /reservas/recurrentes): weekly on the weekday of 'fecha_inicio'
+class ReservaRecurrenteCreate(BaseModel):
+    cancha_id: int
+    fecha_inicio: date # e.g., "2025-11-04" (a Tuesday -> every Tuesday)
+    fecha_fin: date # Last possible occurrence, inclusive
+    hora_inicio: time
+    hora_fin: time
+
+# For Response
+class ReservaRecurrente(BaseModel):
+    id: int
+    dia_semana: int # 0 = lunes ... 6 = domingo
+    fecha_inicio: date
+    fecha_fin: date
+    hora_inicio: time
+    hora_fin: time
+    estado: str
+
+    usuario_id: int
+    cancha_id: int
+
+    class Config:
+        orm_mode = True
@@ -0,0 +1,26 @@
+# scripts/archive_reservas.py
+"""
+Moves reservations dated more than ARCHIVE_AFTER_DAYS days ago from `reservas`
+to `reservas_historico` (app/core/archive.py), in bounded batches. Meant for a
+nightly cron job; safe to interrupt and re-run.
+
+python -m scripts.archive_reservas
+python -m scripts.archive_reservas --before 2025-01-01 --batch 5000
+"""
+import argparse
+import time
+from datetime import date
+
+from app.core.archive import ARCHIVE_BATCH, ARCHIVE_PAUSE, archive_cutoff, archive_past_sync
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--before", type=date.fromisoformat, default=None, help="Archive reservations dated before this day.")
+parser.add_argument("--batch", type=int, default=ARCHIVE_BATCH, help="Reservations moved per transaction.")
+parser.add_argument("--pause", type=float, default=ARCHIVE_PAUSE, help="Seconds between batches.")
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    before = args.before or archive_cutoff()
+    started = time.perf_counter()
+    moved = archive_past_sync(before, batch=args.batch, pause=args.pause)
+    print(f"archived {moved} reservations dated before {before} in {time.perf_counter() - started:.1f} s")
@@ -0,0 +1,121 @@
+# scripts/bench_busqueda.py
+"""
+Catalog search at scale: accent-insensitive type/location filters backed by the
+normalized columns and the in-process trigram index, against the previous
+func.lower(...) LIKE '%x%' full scans.
+
+Seeds DATABASE_URL (defaults to a SQLite file) with --canchas courts whose types
+and locations carry Spanish accents in mixed case, then:
+
+1. checks that searches match regardless of accents and case ('futbol' finds
+   'Fútbol', 'penalolen' finds 'Peñalolén', ...), against a brute-force answer;
+2. times first pages of type and location searches, old query vs new.
+
+python -m scripts.bench_busqueda --canchas 100000
+"""
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_busqueda.db")
+
+from sqlalchemy import func, insert
+
+from app.core.database import SessionLocal, engine
+from app.core.catalog_search import normalize_text
+from app.models import cancha as models_cancha
+from app.crud import cancha as crud_cancha
+
+Cancha = models_cancha.Cancha
+
+from scripts.disposable_db import add_drop_argument, require_disposable_db, reset_schema
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--canchas", type=int, default=100000)
+parser.add_argument("--limit", type=int, default=20)
+parser.add_argument("--repeat", type=int, default=20)
+add_drop_argument(parser)
+
+TIPOS = ["Fútbol", "fútbol", "FUTBOL", "Baloncesto", "Tenis", "Pádel", "Vóleibol"]
+LUGARES = ["Bogotá - Usaquén", "Medellín - El Poblado", "Santiago - Peñalolén", "Cúcuta", "Ibagué",
+           "Popayán", "Chía", "Zipaquirá", "Málaga", "Cali - San Antonio"]
+
+def seed(canchas: int):
+    reset_schema(engine)
+    rows = [
+        {
+            "nombre": f"Cancha {i}",
+            "tipo": TIPOS[i % len(TIPOS)],
+            "ubicacion": f"{LUGARES[(i // 7) % len(LUGARES)]} sector {i % 300}",
+            "estado": i % 10 != 0, # Some inactive courts
+        }
+        for i in range(canchas)
+    ]
+    with engine.begin() as conn:
+        for start in range(0, len(rows), 10000):
+            # Core insert: the normalized columns come from their column defaults
+            conn.execute(insert(Cancha), rows[start:start + 10000])
+
+def brute_force(db, tipo=None, ubicacion=None):
+    t, u = normalize_text(tipo), normalize_text(ubicacion)
+    return [
+        row.id for row in db.query(Cancha.id, Cancha.tipo, Cancha.ubicacion, Cancha.estado).order_by(Cancha.id)
+        if row.estado and (not t or normalize_text(row.tipo) == t) and (not u or u in normalize_text(row.ubicacion))
+    ]
+
+def check_accents(db, canchas: int):
+    cases = [
+        ({"tipo": "futbol"}, [{"tipo": "Fútbol"}, {"tipo": "FÚTBOL"}, {"tipo": " fútbol "}]),
+        ({"tipo": "padel"}, [{"tipo": "Pádel"}]),
+        ({"ubicacion": "bogota"}, [{"ubicacion": "Bogotá"}, {"ubicacion": "BOGOTÁ"}]),
+        ({"ubicacion": "penalolen"}, [{"ubicacion": "Peñalolén"}]),
+        ({"ubicacion": "usaquen"}, [{"ubicacion": "Usaquén"}]),
+        ({"ubicacion": "ch"}, [{"ubicacion": "Ch"}]), # Shorter than a trigram
+        ({"ubicacion": "cucuta sector 12", "tipo": "voleibol"}, [{"ubicacion": "Cúcuta Sector 12", "tipo": "Vóleibol"}]),
+    ]
+    for base, variants in cases:
+        expected = brute_force(db, **base)
+        assert expected, f"seed produced no match for {base}"
+        for filters in [base] + variants:
+            got = [c.id for c in crud_cancha.get_all_canchas(db, limit=canchas, **filters)]
+            assert got == expected, f"{filters}: {len(got)} results, expected {len(expected)}"
+            free = crud_cancha._filtered_canchas_query(db, **filters).order_by(Cancha.id).all()
+            assert [c.id for c in free] == expected, f"{filters}: filtered query differs"
+        print(f"  ok  {base} and {len(variants)} accent/case variants -> {len(expected)} courts")
+
+def old_query(db, limit, tipo=None, ubicacion=None):
+    query = db.query(Cancha).filter(Cancha.estado == True)
+    if tipo:
+        query = query.filter(func.lower(Cancha.tipo) == func.lower(tipo))
+    if ubicacion:
+        query = query.filter(func.lower(Cancha.ubicacion).like(f"%{ubicacion.lower()}%"))
+    return query.order_by(Cancha.id).limit(limit).all()
+
+def timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    require_disposable_db(args)
+    print(f"Seeding {args.canchas} courts...")
+    seed(args.canchas)
+    with SessionLocal() as db:
+        started = time.perf_counter()
+        crud_cancha._location_matches(db, "warm-up")
+        print(f"Trigram index built in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        print("Accent/case checks:")
+        check_accents(db, args.canchas)
+
+        print(f"First page (limit {args.limit}), median of {args.repeat}:")
+        for filters in ({"tipo": "tenis"}, {"ubicacion": "poblado"}, {"ubicacion": "sector 299"},
+                        {"ubicacion": "zipaquira", "tipo": "futbol"}, {"ubicacion": "no existe"}):
+            old = timed(lambda: old_query(db, args.limit, **filters), args.repeat)
+            new = timed(lambda: crud_cancha.get_all_canchas(db, limit=args.limit, **filters), args.repeat)
+            print(f"  {str(filters):<45} old {old:8.2f} ms   new {new:8.2f} ms")
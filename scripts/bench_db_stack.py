@@ -0,0 +1,106 @@
+# scripts/bench_db_stack.py
+"""
+Compares requests/sec and latency percentiles of the sync (threadpool) and async
+(AsyncEngine) database stacks under high concurrency.
+
+For each mode the script starts a uvicorn server with DB_ASYNC set accordingly,
+opens --concurrency keep-alive connections and fires --requests GETs at --path.
+DATABASE_URL selects the database (defaults to a seeded SQLite file); the async
+run needs the matching async driver installed (aiomysql / aiosqlite).
+
+python -m scripts.bench_db_stack --concurrency 256 --requests 20000
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_db_stack.db")
+
+from scripts.disposable_db import add_drop_argument, require_disposable_db, reset_schema
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--concurrency", type=int, default=128)
+parser.add_argument("--requests", type=int, default=10000)
+parser.add_argument("--path", default="/api/v1/canchas/?limit=10")
+parser.add_argument("--canchas", type=int, default=1000, help="Courts to seed (0 keeps existing data).")
+parser.add_argument("--port", type=int, default=8765)
+add_drop_argument(parser)
+
+def seed(canchas: int):
+    from app.core.database import SessionLocal, engine
+    from app.models import cancha as models_cancha
+
+    reset_schema(engine)
+    with SessionLocal() as db:
+        db.add_all(
+            models_cancha.Cancha(nombre=f"Cancha {i}", tipo=("fútbol", "baloncesto")[i % 2], ubicacion=f"Zona {i % 20}", estado=True)
+            for i in range(canchas)
+        )
+        db.commit()
+
+def wait_for_port(port: int, timeout: float = 20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server did not start on port {port}")
+
+async def client(port: int, path: str, counter: list, latencies: list):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    request = f"GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n".encode()
+    try:
+        while counter[0] > 0:
+            counter[0] -= 1
+            started = time.perf_counter()
+            writer.write(request)
+            headers = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in headers.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        writer.close()
+
+async def load(port: int, path: str, requests: int, concurrency: int):
+    counter = [requests]
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*(client(port, path, counter, latencies) for _ in range(concurrency)))
+    return time.perf_counter() - started, latencies
+
+def run(mode: str, args):
+    env = dict(os.environ, DB_ASYNC="1" if mode == "async" else "0")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        env=env
+    )
+    try:
+        wait_for_port(args.port)
+        elapsed, latencies = asyncio.run(load(args.port, args.path, args.requests, args.concurrency))
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{mode:>5}: {len(latencies) / elapsed:8.1f} req/s   p50 {p50:7.2f} ms   p99 {p99:7.2f} ms")
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    if args.canchas:
+        require_disposable_db(args)
+        seed(args.canchas)
+    print(f"GET {args.path}  concurrency={args.concurrency}  requests={args.requests}")
+    for mode in ("sync", "async"):
+        run(mode, args)
@@ -0,0 +1,123 @@
+# scripts/bench_export.py
+"""
+Memory and throughput of the streamed reservation export on a multi-million-row
+table.
+
+Seeds DATABASE_URL (defaults to a SQLite file) with --reservas rows, then drives
+the same path GET /reservas/export uses (export_query + stream_partitions +
+the CSV/NDJSON encoders) and tracks peak traced memory with tracemalloc:
+
+  * after the first --sample rows and after the whole table: the two peaks
+    should be about equal (flat memory), and the script fails if the final peak
+    exceeds --max-growth times the early one;
+  * for contrast, the previous approach (.all() over ORM objects) on the first
+    --sample rows only.
+
+python -m scripts.bench_export --reservas 3000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date, time as dtime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_export.db")
+
+from sqlalchemy import func, insert, select
+
+from app.core.database import SessionLocal, engine
+from app.core.export import encode_csv, encode_csv_header, encode_ndjson
+from app.models import usuario, cancha as models_cancha, reserva as models_reserva
+from app.crud import reserva as crud_reserva
+from app.dependencies.database import stream_partitions
+
+Reserva = models_reserva.Reserva
+
+from scripts.disposable_db import add_drop_argument, require_disposable_db, reset_schema
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--reservas", type=int, default=2000000)
+parser.add_argument("--sample", type=int, default=100000, help="Rows after which the early peak is taken.")
+parser.add_argument("--formato", choices=("csv", "ndjson"), default="csv")
+parser.add_argument("--max-growth", type=float, default=1.5)
+parser.add_argument("--no-seed", action="store_true", help="Reuse the rows already in DATABASE_URL.")
+add_drop_argument(parser)
+
+def seed(reservas: int):
+    reset_schema(engine)
+    rng = random.Random(11)
+    start = date(2020, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(usuario.Usuario), [{"nombre": "u", "telefono": "1", "email": "u@example.com", "hashed_password": "x"}])
+        conn.execute(insert(models_cancha.Cancha), [
+            {"nombre": f"Cancha {i}", "tipo": "fútbol", "ubicacion": f"Zona {i}", "estado": True} for i in range(200)
+        ])
+        chunk = []
+        for _ in range(reservas):
+            hora = rng.randrange(7, 22)
+            chunk.append({
+                "usuario_id": 1,
+                "cancha_id": rng.randrange(1, 201),
+                "fecha": start + timedelta(days=rng.randrange(2000)),
+                "hora_inicio": dtime(hora),
+                "hora_fin": dtime(hora + 1),
+                "estado": "aprobada",
+            })
+            if len(chunk) == 50000:
+                conn.execute(insert(Reserva), chunk)
+                chunk = []
+        if chunk:
+            conn.execute(insert(Reserva), chunk)
+
+async def export(formato: str, sample: int):
+    columns = crud_reserva.EXPORT_COLUMNS
+    rows = 0
+    size = 0
+    early_peak = None
+    tracemalloc.start()
+    started = time.perf_counter()
+    if formato == "csv":
+        size += len(encode_csv_header(columns))
+    async for partition in stream_partitions(crud_reserva.export_query()):
+        chunk = encode_csv(partition) if formato == "csv" else encode_ndjson(partition, columns)
+        size += len(chunk) # The response would write the chunk out here
+        rows += len(partition)
+        if early_peak is None and rows >= sample:
+            early_peak = tracemalloc.get_traced_memory()[1]
+    elapsed = time.perf_counter() - started
+    final_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return rows, size, elapsed, early_peak or final_peak, final_peak
+
+def orm_baseline(sample: int):
+    tracemalloc.start()
+    with SessionLocal() as db:
+        objects = db.query(Reserva).order_by(Reserva.id).limit(sample).all()
+        encode_csv(tuple(getattr(o, c) for c in crud_reserva.EXPORT_COLUMNS) for o in objects)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    if not args.no_seed:
+        require_disposable_db(args)
+        print(f"Seeding {args.reservas} reservations...")
+        seed(args.reservas)
+    with engine.connect() as conn:
+        total = conn.execute(select(func.count()).select_from(Reserva)).scalar()
+
+    rows, size, elapsed, early_peak, final_peak = asyncio.run(export(args.formato, args.sample))
+    assert rows == total, f"exported {rows} rows, table has {total}"
+    mb = 1024 * 1024
+    print(f"Streamed {rows} rows ({size / mb:.1f} MB of {args.formato}) in {elapsed:.1f} s, {rows / elapsed:,.0f} rows/s")
+    print(f"Peak traced memory after {args.sample} rows: {early_peak / mb:7.1f} MB")
+    print(f"Peak traced memory after {rows} rows: {final_peak / mb:7.1f} MB")
+    print(f".all() over ORM objects, first {args.sample} rows only: {orm_baseline(args.sample) / mb:7.1f} MB")
+    if final_peak > early_peak * args.max_growth:
+        print(f"FAIL: memory grew {final_peak / early_peak:.2f}x over the export (limit {args.max_growth}x).")
+        sys.exit(1)
+    print("Memory stayed flat.")
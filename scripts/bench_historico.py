@@ -0,0 +1,153 @@
+# scripts/bench_historico.py
+"""
+Overlap-check latency with years of history in `reservas`, before and after the
+past rows are moved to `reservas_historico` (app/core/archive.py).
+
+Seeds DATABASE_URL (defaults to a SQLite file) through the migration runner with
+--years years of past bookings plus --future-days of upcoming ones (--por-dia
+bookings per court and day), then:
+
+1. times --repeat check_for_overlap calls on upcoming court-days (the booking
+   path) with the full history in the hot table;
+2. archives everything dated before today in ARCHIVE_BATCH chunks and checks
+   that no reservation was lost (hot + archive = before, and a user's
+   'historial' listing is unchanged);
+3. times the same overlap checks again. On SQLite the file is VACUUMed first, as
+   a long-running archived table would be compact; on MySQL InnoDB reclaims the
+   freed pages itself.
+
+python -m scripts.bench_historico --years 5 --canchas 200
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from datetime import date, time as dtime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_historico.db")
+
+from sqlalchemy import func, insert, select, text
+
+from app.core.database import SessionLocal, engine
+from app.core.archive import ARCHIVE_BATCH, archive_past_sync
+from app.models import usuario, cancha as models_cancha, reserva as models_reserva, reserva_historico
+from app.crud import reserva as crud_reserva
+
+Reserva = models_reserva.Reserva
+ReservaHistorico = reserva_historico.ReservaHistorico
+
+from scripts.disposable_db import add_drop_argument, require_disposable_db, reset_schema
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--years", type=int, default=3)
+parser.add_argument("--future-days", type=int, default=60)
+parser.add_argument("--canchas", type=int, default=100)
+parser.add_argument("--por-dia", type=int, default=10, help="Bookings per court and day (at most 14).")
+parser.add_argument("--usuarios", type=int, default=1000)
+parser.add_argument("--repeat", type=int, default=2000)
+parser.add_argument("--batch", type=int, default=ARCHIVE_BATCH)
+add_drop_argument(parser)
+
+TODAY = date.today()
+
+def seed(years: int, future_days: int, canchas: int, por_dia: int, usuarios: int):
+    reset_schema(engine)
+    rng = random.Random(5)
+    first = TODAY - timedelta(days=365 * years)
+    days = (TODAY - first).days + future_days
+    with engine.begin() as conn:
+        conn.execute(insert(usuario.Usuario), [
+            {"nombre": f"u{i}", "telefono": str(i), "email": f"u{i}@example.com", "hashed_password": "x"}
+            for i in range(usuarios)
+        ])
+        conn.execute(insert(models_cancha.Cancha), [
+            {"nombre": f"Cancha {i}", "tipo": "fútbol", "ubicacion": f"Zona {i % 50}", "estado": True}
+            for i in range(canchas)
+        ])
+        chunk = []
+        for d in range(days):
+            fecha = first + timedelta(days=d)
+            for cancha_id in range(1, canchas + 1):
+                for hora in sorted(rng.sample(range(7, 21), por_dia)):
+                    chunk.append({
+                        "usuario_id": rng.randrange(1, usuarios + 1),
+                        "cancha_id": cancha_id,
+                        "fecha": fecha,
+                        "hora_inicio": dtime(hora),
+                        "hora_fin": dtime(hora + 1),
+                        "estado": rng.choice(("aprobada", "aprobada", "cancelada")),
+                    })
+            if len(chunk) >= 50000:
+                conn.execute(insert(Reserva), chunk)
+                chunk = []
+        if chunk:
+            conn.execute(insert(Reserva), chunk)
+    analyze()
+
+def analyze():
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            conn.execute(text("ANALYZE"))
+        elif engine.dialect.name == "mysql":
+            conn.execute(text("ANALYZE TABLE reservas, reservas_historico"))
+
+def count(model) -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(model)).scalar()
+
+def overlap_latency(repeat: int, canchas: int, future_days: int):
+    rng = random.Random(9)
+    samples = []
+    with SessionLocal() as db:
+        for _ in range(repeat):
+            cancha_id = rng.randrange(1, canchas + 1)
+            fecha = TODAY + timedelta(days=rng.randrange(future_days))
+            hora = rng.randrange(7, 21)
+            started = time.perf_counter()
+            crud_reserva.check_for_overlap(db, cancha_id, fecha, dtime(hora), dtime(hora + 1))
+            samples.append(time.perf_counter() - started)
+            db.rollback()
+    samples.sort()
+    return (
+        statistics.median(samples) * 1e6,
+        samples[int(len(samples) * 0.95)] * 1e6,
+        samples[int(len(samples) * 0.99)] * 1e6,
+    )
+
+def report(label, latencies):
+    median, p95, p99 = latencies
+    print(f"  {label:<28} median {median:8.1f} us   p95 {p95:8.1f} us   p99 {p99:8.1f} us")
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    require_disposable_db(args)
+    print(f"Seeding {args.years} years of history on {args.canchas} courts ({engine.dialect.name})...")
+    seed(args.years, args.future_days, args.canchas, args.por_dia, args.usuarios)
+    total = count(Reserva)
+    with SessionLocal() as db:
+        history_before = len(crud_reserva.get_user_reservas(db, user_id=1, historial=True))
+    print(f"{total} reservations in `reservas`")
+
+    print(f"Overlap check on upcoming days, {args.repeat} calls:")
+    before = overlap_latency(args.repeat, args.canchas, args.future_days)
+    report("with history", before)
+
+    started = time.perf_counter()
+    moved = archive_past_sync(TODAY, batch=args.batch, pause=0)
+    elapsed = time.perf_counter() - started
+    print(f"Archived {moved} reservations in {elapsed:.1f} s ({moved / max(elapsed, 1e-9):,.0f} rows/s, batches of {args.batch})")
+    hot, archived = count(Reserva), count(ReservaHistorico)
+    assert hot + archived == total, f"{hot} + {archived} != {total}"
+    with SessionLocal() as db:
+        history_after = len(crud_reserva.get_user_reservas(db, user_id=1, historial=True))
+    assert history_after == history_before, f"user 1 history: {history_after} rows, expected {history_before}"
+    print(f"{hot} reservations left in `reservas`, {archived} in `reservas_historico`; user history unchanged")
+
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+    analyze()
+    after = overlap_latency(args.repeat, args.canchas, args.future_days)
+    report("archived", after)
+    print(f"  median speed-up: {before[0] / after[0]:.2f}x")
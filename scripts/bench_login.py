@@ -0,0 +1,69 @@
+# scripts/bench_login.py
+"""
+Login throughput for the three ways of running bcrypt verification:
+
+  inline      on the event loop (what a sync call inside an async route does)
+  threadpool  in the default thread executor
+  procpool    in app.core.security's process pool (what /login uses)
+
+For each mode it verifies --logins passwords with --concurrency in flight and
+reports logins/sec plus the worst event-loop stall seen by a 10 ms ticker; a
+large stall means every other endpoint was frozen meanwhile. No DB is needed.
+
+python -m scripts.bench_login --logins 200 --concurrency 32 --rounds 12
+"""
+import argparse
+import asyncio
+import os
+import time
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost (BCRYPT_ROUNDS).")
+    args = parser.parse_args()
+
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    from app.core import security
+
+    hashed = security.hash_password("secreto123")
+
+    async def ticker(stop: asyncio.Event, worst: list):
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            worst[0] = max(worst[0], time.perf_counter() - started - 0.01)
+
+    async def run(mode: str):
+        loop = asyncio.get_running_loop()
+        limit = asyncio.Semaphore(args.concurrency)
+
+        async def one():
+            async with limit:
+                if mode == "inline":
+                    security.verify_and_update("secreto123", hashed)
+                elif mode == "threadpool":
+                    await loop.run_in_executor(None, security.verify_and_update, "secreto123", hashed)
+                else:
+                    await security.verify_password_async("secreto123", hashed)
+
+        if mode == "procpool":
+            await security.verify_password_async("secreto123", hashed) # start the workers outside the timing
+
+        stop, worst = asyncio.Event(), [0.0]
+        tick = asyncio.create_task(ticker(stop, worst))
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(args.logins)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await tick
+        print(f"{mode:>10}: {args.logins / elapsed:8.1f} logins/s   worst loop stall {worst[0] * 1000:8.1f} ms")
+
+    print(f"bcrypt rounds={args.rounds}  logins={args.logins}  concurrency={args.concurrency}  workers={security.PASSWORD_HASH_WORKERS}")
+    for mode in ("inline", "threadpool", "procpool"):
+        asyncio.run(run(mode))
+    security.shutdown_password_pool()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# scripts/bench_paginacion.py
+"""
+Page-fetch latency at increasing depth: OFFSET pagination vs keyset (cursor)
+pagination, for the court catalog and for one heavy user's reservations.
+
+Keyset pages should cost the same at any depth; OFFSET pages grow linearly.
+Seeds DATABASE_URL (defaults to a SQLite file) with --canchas courts and
+--reservas reservations for a single user.
+
+python -m scripts.bench_paginacion --canchas 500000 --reservas 200000
+"""
+import argparse
+import os
+import time
+from datetime import date, time as dtime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_paginacion.db")
+
+from sqlalchemy import insert
+
+from app.core.database import SessionLocal, engine
+from app.models import usuario, cancha as models_cancha, reserva as models_reserva
+from app.crud import cancha as crud_cancha, reserva as crud_reserva
+
+from scripts.disposable_db import add_drop_argument, require_disposable_db, reset_schema
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--canchas", type=int, default=200000)
+parser.add_argument("--reservas", type=int, default=100000)
+parser.add_argument("--limit", type=int, default=50)
+parser.add_argument("--repeat", type=int, default=20)
+add_drop_argument(parser)
+
+def seed(canchas: int, reservas: int):
+    reset_schema(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(usuario.Usuario), [{"nombre": "heavy", "telefono": "1", "email": "heavy@example.com", "hashed_password": "x"}])
+        conn.execute(insert(models_cancha.Cancha), [
+            {"nombre": f"Cancha {i}", "tipo": "fútbol", "ubicacion": f"Zona {i % 50}", "estado": True}
+            for i in range(canchas)
+        ])
+        start = date(2020, 1, 1)
+        conn.execute(insert(models_reserva.Reserva), [
+            {
+                "fecha": start + timedelta(days=i // 12),
+                "hora_inicio": dtime(8 + i % 12),
+                "hora_fin": dtime(9 + i % 12),
+                "estado": "aprobada",
+                "usuario_id": 1,
+                "cancha_id": 1 + i % 100,
+            }
+            for i in range(reservas)
+        ])
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+def depths(total: int):
+    depth = 0
+    while depth < total:
+        yield depth
+        depth = depth * 10 if depth else 1000
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    require_disposable_db(args)
+    seed(args.canchas, args.reservas)
+    with SessionLocal() as db:
+        print(f"canchas (limit={args.limit})        offset ms   keyset ms")
+        for depth in depths(args.canchas):
+            # Ids are dense from 1, so the keyset cursor at 'depth' is simply 'depth'
+            offset_ms = timed(lambda: crud_cancha.get_all_canchas(db, skip=depth, limit=args.limit), args.repeat)
+            keyset_ms = timed(lambda: crud_cancha.get_all_canchas(db, limit=args.limit, after_id=depth), args.repeat)
+            print(f"  depth {depth:>9}               {offset_ms:9.3f}   {keyset_ms:9.3f}")
+
+        print(f"reservas/mis (limit={args.limit})   offset ms   keyset ms")
+        for depth in depths(args.reservas):
+            last = crud_reserva.get_user_reservas(db, user_id=1, skip=depth - 1, limit=1)[0] if depth else None
+            after = (last.fecha, last.hora_inicio, last.id) if last else None
+            offset_ms = timed(lambda: crud_reserva.get_user_reservas(db, user_id=1, skip=depth, limit=args.limit), args.repeat)
+            keyset_ms = timed(lambda: crud_reserva.get_user_reservas(db, user_id=1, limit=args.limit, after=after), args.repeat)
+            print(f"  depth {depth:>9}               {offset_ms:9.3f}   {keyset_ms:9.3f}")
@@ -0,0 +1,154 @@
+# scripts/bench_pool_ocupacion.py
+"""
+Pool occupancy under mixed traffic: how many connection checkouts each request
+causes and how long connections stay checked out relative to request time.
+
+Starts a uvicorn server and fires a mix of requests that do and don't need the
+DB: cached catalog pages, court details, "my reservations" with a valid token,
+the same without a token (401) and with a bad query (422). Afterwards the
+counters are read from /metrics (db_connection_hold_seconds and
+http_request_duration_seconds).
+
+With lazy, function-scoped sessions, cache hits and rejected requests check out
+no connection, and hold time stays below request time because the connection is
+returned before the response is serialized and sent.
+
+python -m scripts.bench_pool_ocupacion --concurrency 64 --requests 20000
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+from datetime import date, time as dtime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_pool_ocupacion.db")
+os.environ.setdefault("SECRET_KEY", "bench-pool-ocupacion")
+
+from scripts.disposable_db import add_drop_argument, require_disposable_db, reset_schema
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--concurrency", type=int, default=64)
+parser.add_argument("--requests", type=int, default=10000)
+parser.add_argument("--canchas", type=int, default=200)
+parser.add_argument("--reservas", type=int, default=500)
+parser.add_argument("--port", type=int, default=8766)
+parser.add_argument("--async-stack", action="store_true", help="Run the server with DB_ASYNC=1.")
+add_drop_argument(parser)
+
+def seed(canchas: int, reservas: int) -> str:
+    from sqlalchemy import insert
+    from app.core.database import engine
+    from app.core.security import create_access_token
+    from app.models import usuario, cancha as models_cancha, reserva as models_reserva
+
+    reset_schema(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(usuario.Usuario), [{"nombre": "bench", "telefono": "1", "email": "bench@example.com", "hashed_password": "x"}])
+        conn.execute(insert(models_cancha.Cancha), [
+            {"nombre": f"Cancha {i}", "tipo": "fútbol", "ubicacion": f"Zona {i % 20}", "estado": True}
+            for i in range(canchas)
+        ])
+        start = date.today()
+        conn.execute(insert(models_reserva.Reserva), [
+            {
+                "usuario_id": 1,
+                "cancha_id": 1 + i % canchas,
+                "fecha": start + timedelta(days=i // canchas),
+                "hora_inicio": dtime(8 + i % 12),
+                "hora_fin": dtime(9 + i % 12),
+                "estado": "pendiente",
+            }
+            for i in range(reservas)
+        ])
+    return create_access_token(1, "jugador")
+
+def wait_for_port(port: int, timeout: float = 20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server did not start on port {port}")
+
+def build_mix(token: str, canchas: int) -> list:
+    auth = f"Authorization: Bearer {token}\r\n"
+    return [
+        ("GET /api/v1/canchas/?limit=10", ""),
+        ("GET /api/v1/canchas/?limit=10&tipo=f%C3%BAtbol", ""),
+        (f"GET /api/v1/canchas/{random.randint(1, canchas)}", ""),
+        ("GET /api/v1/reservas/mis?limit=50", auth),
+        ("GET /api/v1/reservas/mis?limit=50", ""),
+        ("GET /api/v1/reservas/mis?limit=0", auth),
+    ]
+
+async def client(port: int, counter: list, mix: list):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while counter[0] > 0:
+            counter[0] -= 1
+            line, headers = random.choice(mix)
+            writer.write(f"{line} HTTP/1.1\r\nHost: bench\r\n{headers}\r\n".encode())
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for header in head.split(b"\r\n"):
+                if header.lower().startswith(b"content-length:"):
+                    length = int(header.split(b":", 1)[1])
+            await reader.readexactly(length)
+    finally:
+        writer.close()
+
+async def load(port: int, mix: list, requests: int, concurrency: int) -> float:
+    counter = [requests]
+    started = time.perf_counter()
+    await asyncio.gather(*(client(port, counter, mix) for _ in range(concurrency)))
+    return time.perf_counter() - started
+
+async def fetch_metrics(port: int) -> str:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /metrics HTTP/1.1\r\nHost: bench\r\nConnection: close\r\n\r\n")
+    raw = await reader.read()
+    writer.close()
+    return raw.split(b"\r\n\r\n", 1)[1].decode()
+
+def metric_total(text: str, name: str, exclude_route: str = "/metrics") -> float:
+    total = 0.0
+    for match in re.finditer(rf"^{name}(\{{[^}}]*\}})? (\S+)$", text, re.MULTILINE):
+        if exclude_route and f'route="{exclude_route}"' in (match.group(1) or ""):
+            continue
+        total += float(match.group(2))
+    return total
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    require_disposable_db(args)
+    token = seed(args.canchas, args.reservas)
+    env = dict(os.environ, DB_ASYNC="1" if args.async_stack else "0")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        env=env
+    )
+    try:
+        wait_for_port(args.port)
+        elapsed = asyncio.run(load(args.port, build_mix(token, args.canchas), args.requests, args.concurrency))
+        text = asyncio.run(fetch_metrics(args.port))
+    finally:
+        server.terminate()
+        server.wait()
+
+    requests = metric_total(text, "http_requests_total")
+    request_seconds = metric_total(text, "http_request_duration_seconds_sum")
+    checkouts = metric_total(text, "db_connection_hold_seconds_count", exclude_route="")
+    hold_seconds = metric_total(text, "db_connection_hold_seconds_sum", exclude_route="")
+
+    print(f"{'async' if args.async_stack else 'sync'} stack  concurrency={args.concurrency}  requests={int(requests)}  {requests / elapsed:.1f} req/s")
+    print(f"checkouts per request:           {checkouts / requests:.3f}")
+    print(f"mean connection hold:            {hold_seconds / max(checkouts, 1) * 1000:.2f} ms")
+    print(f"mean request time:               {request_seconds / requests * 1000:.2f} ms")
+    print(f"connection-seconds per request-s {hold_seconds / request_seconds:.3f}")
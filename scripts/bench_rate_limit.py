@@ -0,0 +1,120 @@
+# scripts/bench_rate_limit.py
+"""
+Overhead and behaviour of the token-bucket limiter (app/core/rate_limit.py).
+
+1. Correctness on a simulated clock: a burst is allowed, the next request gets
+   the right Retry-After, tokens refill at the configured rate, and a global
+   bucket is shared by every key.
+2. Cost of TokenBucketLimiter.acquire(): allowed checks on --keys warm keys,
+   rejected checks, and first-seen keys (with eviction). The check fails if the
+   allowed path is slower than --max-ns per call.
+3. Idle-key eviction under churn: --churn distinct one-off callers must leave
+   the store bounded by the active set, not by every IP ever seen.
+
+python -m scripts.bench_rate_limit --keys 10000
+"""
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_rate_limit.db")
+
+from app.core.rate_limit import TokenBucketLimiter, parse_budget
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--keys", type=int, default=10000)
+parser.add_argument("--calls", type=int, default=2000000)
+parser.add_argument("--churn", type=int, default=1000000)
+parser.add_argument("--max-ns", type=float, default=1000.0)
+
+def check_behaviour():
+    rate, burst = parse_budget("10/60")
+    assert (rate, burst) == (10 / 60, 10)
+    assert parse_budget("0") is None
+    limiter = TokenBucketLimiter("login", rate, burst)
+    now = 1000.0
+    assert all(limiter.acquire("ip:1", now=now) == 0.0 for _ in range(10)), "burst rejected"
+    retry_after = limiter.acquire("ip:1", now=now)
+    assert abs(retry_after - 6.0) < 1e-9, f"Retry-After {retry_after}, expected 6 s"
+    assert limiter.acquire("ip:2", now=now) == 0.0, "keys must not share buckets"
+    assert limiter.acquire("ip:1", now=now + 5.9) > 0.0
+    assert limiter.acquire("ip:1", now=now + 6.1) == 0.0, "token not refilled"
+    assert limiter.acquire("ip:1", now=now + 10_000) == 0.0
+    shared = TokenBucketLimiter("login_global", 1.0, 3)
+    assert [shared.acquire(None, now=now) for _ in range(4)][-1] == 1.0
+    print("ok  burst, Retry-After, refill and shared bucket")
+
+def per_call_ns(fn, calls: int) -> float:
+    started = time.perf_counter_ns()
+    fn(calls)
+    return (time.perf_counter_ns() - started) / calls
+
+def bench_overhead():
+    keys = [f"u:{i}" for i in range(args.keys)]
+    # Generous budget: every call below is allowed
+    limiter = TokenBucketLimiter("bench", rate=1e9, burst=1e9)
+    for key in keys:
+        limiter.acquire(key)
+
+    def loop_only(calls):
+        n = len(keys)
+        for i in range(calls):
+            keys[i % n]
+
+    def allowed(calls):
+        acquire, n = limiter.acquire, len(keys)
+        for i in range(calls):
+            acquire(keys[i % n])
+
+    tight = TokenBucketLimiter("bench_tight", rate=1e-6, burst=1)
+    for key in keys:
+        tight.acquire(key)
+
+    def rejected(calls):
+        acquire, n = tight.acquire, len(keys)
+        for i in range(calls):
+            acquire(keys[i % n])
+
+    fresh_keys = [f"ip:{i}" for i in range(args.calls // 4)]
+    churning = TokenBucketLimiter("bench_new", rate=10.0, burst=10, max_keys=args.keys)
+
+    def new_keys(calls):
+        acquire = churning.acquire
+        for key in fresh_keys[:calls]:
+            acquire(key)
+
+    baseline = per_call_ns(loop_only, args.calls)
+    results = {
+        "allowed (warm key)": per_call_ns(allowed, args.calls) - baseline,
+        "rejected (429)": per_call_ns(rejected, args.calls) - baseline,
+        "first-seen key, store full": per_call_ns(new_keys, len(fresh_keys)) - baseline,
+    }
+    print(f"acquire() cost over {args.keys} keys (loop overhead of {baseline:.0f} ns subtracted):")
+    for name, ns in results.items():
+        print(f"  {name:<28} {ns:7.0f} ns")
+    return results["allowed (warm key)"]
+
+def bench_churn():
+    limiter = TokenBucketLimiter("churn", rate=10 / 60, burst=10, max_keys=10 ** 9)
+    now = 0.0
+    peak = 0
+    # One new caller every millisecond, each making a single request; buckets go
+    # idle after burst / rate = 60 s, so about 60 000 should be live at a time
+    for i in range(args.churn):
+        now += 0.001
+        limiter.acquire(f"ip:{i}", now=now)
+        peak = max(peak, len(limiter))
+    expected = limiter.idle_after / 0.001
+    print(f"{args.churn} one-off callers: store peaked at {peak} keys (active set ~{expected:.0f})")
+    assert peak <= expected * 1.1 + 2, "idle keys are not being evicted"
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    check_behaviour()
+    allowed_ns = bench_overhead()
+    bench_churn()
+    if allowed_ns > args.max_ns:
+        print(f"FAIL: {allowed_ns:.0f} ns per allowed check (budget {args.max_ns:.0f} ns).")
+        sys.exit(1)
+    print(f"Allowed checks cost {allowed_ns:.0f} ns, under the {args.max_ns:.0f} ns budget.")
@@ -0,0 +1,95 @@
+# scripts/bench_startup.py
+"""
+Worker startup cost: import time of app.main and duration of the lifespan startup.
+
+1. Import time: runs 'python -X importtime -c "import app.main"' --repeat times in
+   fresh interpreters and reports the median self+cumulative time of app.main and
+   the slowest imported packages.
+2. Lifespan startup: in fresh interpreters, times what the old boot path did
+   (Base.metadata.create_all) against the versioned check (SCHEMA_CHECK=check)
+   and SCHEMA_CHECK=skip, on an already migrated DATABASE_URL.
+
+Point DATABASE_URL at MySQL to see the reflection cost of create_all that
+rolling restarts paid on every worker.
+
+python -m scripts.bench_startup --repeat 10
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_startup.db")
+os.environ.setdefault("SECRET_KEY", "bench-startup")
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--repeat", type=int, default=5)
+parser.add_argument("--top", type=int, default=15, help="Slowest top-level packages to list.")
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+def import_times():
+    cumulative = defaultdict(list)
+    for _ in range(args.repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import app.main"],
+            capture_output=True, text=True, env=os.environ
+        )
+        if result.returncode != 0:
+            raise SystemExit(result.stderr)
+        for line in result.stderr.splitlines():
+            match = IMPORTTIME_LINE.match(line)
+            if match and len(match.group(3)) == 1: # Top-level imports only
+                cumulative[match.group(4)].append(int(match.group(2)))
+
+    print(f"Import time (median of {args.repeat}, cumulative):")
+    print(f"  app.main: {statistics.median(cumulative['app.main']) / 1000:8.1f} ms")
+    slowest = sorted(cumulative.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+    for name, samples in slowest[:args.top]:
+        print(f"  {name:<40} {statistics.median(samples) / 1000:8.1f} ms")
+
+STARTUP_SNIPPET = """
+import asyncio, time
+started = time.perf_counter()
+if {create_all}:
+    from app.core.database import Base, engine
+    import app.core.migrations
+    Base.metadata.create_all(bind=engine)
+else:
+    from app.main import app
+    async def boot():
+        async with app.router.lifespan_context(app):
+            pass
+    import_done = time.perf_counter()
+    asyncio.run(boot())
+    started = import_done
+print(time.perf_counter() - started)
+"""
+
+def startup_time(label: str, create_all: bool = False, schema_check: str = "check"):
+    samples = []
+    env = dict(os.environ, SCHEMA_CHECK=schema_check)
+    for _ in range(args.repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", STARTUP_SNIPPET.format(create_all=create_all)],
+            capture_output=True, text=True, env=env
+        )
+        if result.returncode != 0:
+            raise SystemExit(result.stderr)
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    print(f"  {label:<32} median {statistics.median(samples) * 1000:8.1f} ms   max {max(samples) * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    from app.core.database import engine
+    from app.core.migrations import migrate
+    migrate(engine)
+
+    import_times()
+    print(f"Lifespan startup (median of {args.repeat}, excluding imports):")
+    startup_time("create_all (previous boot)", create_all=True)
+    startup_time("SCHEMA_CHECK=check", schema_check="check")
+    startup_time("SCHEMA_CHECK=skip", schema_check="skip")
@@ -0,0 +1,142 @@
+# scripts/bench_suscriptores.py
+"""
+Thousands of idle live-availability subscribers on one worker.
+
+Opens --conexiones WebSocket connections to /api/v1/canchas/{id}/disponibilidad/ws
+spread over --canchas court-days, driving the real ASGI app in-process (the
+client side is a pair of stub receive/send callables, so no sockets or server
+are needed), then:
+
+1. measures traced memory per idle connection (handler tasks, subscriptions,
+   stubs included) and fails above --max-kb;
+2. publishes events from a worker thread, as the CRUD layer does, and times the
+   fan-out to every subscriber of the court-day;
+3. checks that a subscriber that stops reading is dropped once its queue is
+   full, while the others still get every event;
+4. disconnects everyone and checks that no subscription is left behind.
+
+python -m scripts.bench_suscriptores --conexiones 10000
+"""
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, time as dtime
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_suscriptores.db")
+
+from app.main import app
+from app.core.events import EVENTS_QUEUE_SIZE, event_hub, slot_event
+from app.core.metrics import events_dropped
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--conexiones", type=int, default=5000)
+parser.add_argument("--canchas", type=int, default=50)
+parser.add_argument("--eventos", type=int, default=10, help="Events published to the busiest court-day.")
+parser.add_argument("--max-kb", type=float, default=16.0, help="Memory budget per idle connection.")
+
+FECHA = date(2030, 1, 7)
+
+class StubClient:
+    """Client side of one WebSocket: connects, then only listens."""
+    __slots__ = ("gone", "accepted", "received", "closed_with", "stalled")
+
+    def __init__(self, loop):
+        self.gone = loop.create_future()
+        self.accepted = loop.create_future()
+        self.received = 0
+        self.closed_with = None
+        self.stalled = False
+
+    async def receive(self):
+        if not self.accepted.done():
+            return {"type": "websocket.connect"}
+        await self.gone
+        return {"type": "websocket.disconnect", "code": 1000}
+
+    async def send(self, message):
+        if message["type"] == "websocket.accept":
+            self.accepted.set_result(None)
+        elif message["type"] == "websocket.send":
+            if self.stalled:
+                await self.gone # Stops reading: the send never completes
+            self.received += 1
+        elif message["type"] == "websocket.close":
+            self.closed_with = message.get("code")
+
+def scope(cancha_id: int, n: int) -> dict:
+    path = f"/api/v1/canchas/{cancha_id}/disponibilidad/ws"
+    return {
+        "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "http_version": "1.1",
+        "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": f"fecha={FECHA.isoformat()}".encode(), "headers": [],
+        "client": ("127.0.0.1", 10000 + n), "server": ("testserver", 80), "subprotocols": [],
+    }
+
+def event(n: int) -> dict:
+    return slot_event("slot_tomado", n, 1, FECHA, dtime(10), dtime(11))
+
+async def wait_until(condition, timeout=30.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise SystemExit("FAIL: timed out waiting for the subscribers.")
+        await asyncio.sleep(0.001)
+
+async def main():
+    loop = asyncio.get_running_loop()
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    clients, tasks = [], []
+    for n in range(args.conexiones):
+        client = StubClient(loop)
+        clients.append(client)
+        tasks.append(asyncio.create_task(app(scope(1 + n % args.canchas, n), client.receive, client.send)))
+    await asyncio.gather(*(client.accepted for client in clients))
+    await asyncio.sleep(0.1) # Let every handler reach its idle await
+    gc.collect()
+    per_connection = (tracemalloc.get_traced_memory()[0] - baseline) / args.conexiones
+    tracemalloc.stop()
+    assert event_hub.count == args.conexiones, f"{event_hub.count} subscriptions for {args.conexiones} connections"
+    print(f"{args.conexiones} idle connections over {args.canchas} court-days: {per_connection / 1024:.1f} KB each")
+
+    # Fan-out to the busiest court-day (cancha 1), published from a worker thread
+    audience = [c for n, c in enumerate(clients) if n % args.canchas == 0]
+    started = time.perf_counter()
+    for n in range(args.eventos):
+        await asyncio.to_thread(event_hub.publish, 1, FECHA, event(n))
+    await wait_until(lambda: all(c.received == args.eventos for c in audience))
+    elapsed = time.perf_counter() - started
+    print(f"{args.eventos} events to {len(audience)} subscribers in {elapsed * 1000:.1f} ms "
+          f"({args.eventos * len(audience) / elapsed:,.0f} deliveries/s)")
+
+    # Slow consumer: stops reading, gets dropped, the rest keep up
+    slow = audience[0]
+    slow.stalled = True
+    dropped_before = sum(events_dropped._values.values())
+    count_before = event_hub.count
+    extra = EVENTS_QUEUE_SIZE + 2
+    for n in range(extra):
+        await asyncio.to_thread(event_hub.publish, 1, FECHA, event(args.eventos + n))
+    await wait_until(lambda: all(c.received == args.eventos + extra for c in audience[1:]))
+    assert sum(events_dropped._values.values()) == dropped_before + 1, "the stalled subscriber was not dropped"
+    assert event_hub.count == count_before - 1
+    print(f"Stalled subscriber dropped after {EVENTS_QUEUE_SIZE} queued events; {len(audience) - 1} others got all {extra}")
+
+    for client in clients:
+        client.gone.set_result(None)
+    await asyncio.gather(*tasks)
+    assert event_hub.count == 0, f"{event_hub.count} subscriptions left after disconnecting"
+    print("All connections closed, no subscription left.")
+    if per_connection > args.max_kb * 1024:
+        print(f"FAIL: {per_connection / 1024:.1f} KB per idle connection (budget {args.max_kb} KB).")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    asyncio.run(main())
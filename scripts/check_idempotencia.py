@@ -0,0 +1,111 @@
+# scripts/check_idempotencia.py
+"""
+Behaviour check for IdempotencyMiddleware (app/core/idempotency.py), in-process.
+
+Wraps a stand-in for POST /api/v1/reservas that counts its executions and takes
+--latencia seconds (like a booking waiting on the slot lock), then:
+
+1. fires --duplicados concurrent requests with the same Idempotency-Key: the
+   route must run once and every client must get the same 201 body;
+2. retries after completion: replayed, marked 'idempotent-replayed';
+3. reuses the key with a different body: 422;
+4. same key from another caller (Authorization), or from another client IP
+   when anonymous (/register): runs again;
+5. a 5xx or a 429 is not stored: the retry runs again.
+
+python -m scripts.check_idempotencia --duplicados 200
+"""
+import argparse
+import asyncio
+import json
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./check_idempotencia.db")
+
+from app.core.idempotency import IdempotencyMiddleware
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--duplicados", type=int, default=100)
+parser.add_argument("--latencia", type=float, default=0.2)
+
+PATH = "/api/v1/reservas/"
+executions = 0
+fail_next = None
+
+async def route(scope, receive, send):
+    global executions, fail_next
+    executions += 1
+    message = await receive()
+    await asyncio.sleep(args.latencia)
+    if fail_next:
+        status, payload = fail_next, {"detail": "Intenta de nuevo en unos segundos."}
+        fail_next = None
+    else:
+        status, payload = 201, {"id": executions, "pedido": json.loads(message["body"])}
+    body = json.dumps(payload).encode()
+    await send({"type": "http.response.start", "status": status, "headers": [[b"content-type", b"application/json"]]})
+    await send({"type": "http.response.body", "body": body})
+
+app = IdempotencyMiddleware(route, paths=[PATH])
+
+async def post(key: str, payload: dict, token: str = "token-a", ip: str = "203.0.113.7"):
+    body = json.dumps(payload).encode()
+    headers = [[b"idempotency-key", key.encode()]]
+    if token:
+        headers.append([b"authorization", f"Bearer {token}".encode()])
+    scope = {"type": "http", "method": "POST", "path": PATH, "headers": headers, "client": (ip, 50000)}
+    sent = iter([{"type": "http.request", "body": body, "more_body": False}])
+    response = {"body": b""}
+
+    async def receive():
+        return next(sent, {"type": "http.disconnect"})
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = dict(message["headers"])
+        else:
+            response["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return response
+
+async def main():
+    pedido = {"cancha_id": 1, "fecha": "2030-01-07", "hora_inicio": "10:00", "hora_fin": "11:00"}
+
+    responses = await asyncio.gather(*(post("k-1", pedido) for _ in range(args.duplicados)))
+    assert executions == 1, f"route ran {executions} times for {args.duplicados} concurrent duplicates"
+    assert {r["status"] for r in responses} == {201}
+    assert len({r["body"] for r in responses}) == 1
+    print(f"ok  {args.duplicados} concurrent duplicates -> 1 execution, identical 201 responses")
+
+    retry = await post("k-1", pedido)
+    assert executions == 1 and retry["status"] == 201 and retry["body"] == responses[0]["body"]
+    assert retry["headers"].get(b"idempotent-replayed") == b"true"
+    print("ok  retry after completion replayed")
+
+    other = await post("k-1", dict(pedido, hora_inicio="12:00"))
+    assert other["status"] == 422 and executions == 1
+    print("ok  same key, different body -> 422")
+
+    await post("k-1", pedido, token="token-b")
+    assert executions == 2
+    print("ok  same key from another caller runs separately")
+
+    await post("k-anon", pedido, token=None)
+    await post("k-anon", pedido, token=None)
+    await post("k-anon", pedido, token=None, ip="198.51.100.9")
+    assert executions == 4
+    print("ok  anonymous callers are scoped by client IP")
+
+    global fail_next
+    for n, status in enumerate((503, 429)):
+        fail_next = status
+        first = await post(f"k-{status}", pedido)
+        second = await post(f"k-{status}", pedido)
+        assert first["status"] == status and second["status"] == 201 and executions == 6 + 2 * n
+        print(f"ok  {status} not stored, retry ran again")
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    asyncio.run(main())
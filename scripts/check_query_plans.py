@@ -0,0 +1,199 @@
+# scripts/check_query_plans.py
+"""
+Query plan regression check for the reservation hot paths.
+
+Seeds DATABASE_URL (defaults to a SQLite file) with a large dataset through the
+migration runner, runs each CRUD read (overlap check, interval index warm-up,
+batch sweep load, "my reservations" pages with and without history, availability
+grids, series lookups, expiry and archiver sweeps) while capturing the SQL it
+issues, and EXPLAINs every captured SELECT. The check fails (exit code 1) when a
+plan reads `reservas`, `reservas_recurrentes` or `reservas_historico` with a
+full scan instead of an index lookup:
+
+  * SQLite: a 'SCAN <table>' step (a full table or full index scan);
+  * MySQL: an access type of ALL (table scan) or index (full index scan).
+
+Run it in CI or before merging changes to app/crud/reserva*.py or the indexes.
+
+python -m scripts.check_query_plans --reservas 200000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+from datetime import date, time as dtime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./check_query_plans.db")
+
+from sqlalchemy import event, insert, text
+
+from app.core.database import SessionLocal, engine, utcnow
+from app.models import usuario, cancha as models_cancha, reserva as models_reserva, reserva_recurrente
+from app.crud import reserva as crud_reserva, reserva_recurrente as crud_recurrente, disponibilidad as crud_disponibilidad
+from app.core.reserva_index import reserva_index
+from app.schemas.reserva import ReservaCreate
+
+from scripts.disposable_db import add_drop_argument, require_disposable_db, reset_schema
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--reservas", type=int, default=200000)
+parser.add_argument("--canchas", type=int, default=500)
+parser.add_argument("--usuarios", type=int, default=2000)
+parser.add_argument("--series", type=int, default=2000)
+parser.add_argument("--no-seed", action="store_true", help="Reuse the data already in DATABASE_URL.")
+add_drop_argument(parser)
+
+WATCHED_TABLES = ("reservas", "reservas_recurrentes", "reservas_historico")
+START = date(2025, 1, 1)
+
+def seed(reservas: int, canchas: int, usuarios: int, series: int):
+    reset_schema(engine)
+    rng = random.Random(7)
+    with engine.begin() as conn:
+        conn.execute(insert(usuario.Usuario), [
+            {"nombre": f"u{i}", "telefono": str(i), "email": f"u{i}@example.com", "hashed_password": "x"}
+            for i in range(usuarios)
+        ])
+        conn.execute(insert(models_cancha.Cancha), [
+            {"nombre": f"Cancha {i}", "tipo": "fútbol", "ubicacion": f"Zona {i % 50}", "estado": True}
+            for i in range(canchas)
+        ])
+        chunk = []
+        for i in range(reservas):
+            hora = rng.randrange(7, 22)
+            chunk.append({
+                "usuario_id": rng.randrange(1, usuarios + 1),
+                "cancha_id": rng.randrange(1, canchas + 1),
+                "fecha": START + timedelta(days=rng.randrange(365)),
+                "hora_inicio": dtime(hora),
+                "hora_fin": dtime(hora + 1),
+                "estado": rng.choice(("pendiente", "aprobada", "cancelada")),
+            })
+            if len(chunk) == 10000:
+                conn.execute(insert(models_reserva.Reserva), chunk)
+                chunk = []
+        if chunk:
+            conn.execute(insert(models_reserva.Reserva), chunk)
+        conn.execute(insert(reserva_recurrente.ReservaRecurrente), [
+            {
+                "usuario_id": rng.randrange(1, usuarios + 1),
+                "cancha_id": rng.randrange(1, canchas + 1),
+                "dia_semana": (START + timedelta(days=d)).weekday(),
+                "fecha_inicio": START + timedelta(days=d),
+                "fecha_fin": START + timedelta(days=d + 84),
+                "hora_inicio": dtime(6),
+                "hora_fin": dtime(7),
+                "estado": "aprobada",
+            }
+            for d in (rng.randrange(280) for _ in range(series))
+        ])
+    # Planner statistics, as a production database would have them
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            conn.execute(text("ANALYZE"))
+        elif engine.dialect.name == "mysql":
+            conn.execute(text("ANALYZE TABLE reservas, reservas_recurrentes"))
+
+# --- Capture ---
+
+captured = []
+
+def _capture(conn, cursor, statement, parameters, context, executemany):
+    if not executemany and statement.lstrip().upper().startswith("SELECT"):
+        captured.append((statement, parameters))
+
+def run_case(name, fn):
+    captured.clear()
+    event.listen(engine, "before_cursor_execute", _capture)
+    try:
+        with SessionLocal() as db:
+            fn(db)
+            db.rollback()
+    finally:
+        event.remove(engine, "before_cursor_execute", _capture)
+    return [(name, statement, parameters) for statement, parameters in captured
+            if any(re.search(rf"\b{table}\b", statement) for table in WATCHED_TABLES)]
+
+# --- Plans ---
+
+def explain(statement, parameters):
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+            plan = [row[-1] for row in rows]
+            full_scans = [step for step in plan if re.match(rf"SCAN ({'|'.join(WATCHED_TABLES)})\b", step)]
+        elif engine.dialect.name == "mysql":
+            result = conn.exec_driver_sql("EXPLAIN " + statement, parameters)
+            rows = [dict(zip(result.keys(), row)) for row in result]
+            plan = [f"{row['table']}: type={row['type']} key={row['key']}" for row in rows]
+            full_scans = [
+                step for row, step in zip(rows, plan)
+                if row["table"] in WATCHED_TABLES and row["type"] in ("ALL", "index")
+            ]
+        else:
+            raise SystemExit(f"EXPLAIN checks are not implemented for {engine.dialect.name}.")
+    return plan, full_scans
+
+def cases():
+    user_id = 1
+    cancha_id = 1
+    fecha = START + timedelta(days=30)
+    with SessionLocal() as db:
+        page = crud_reserva.get_user_reservas(db, user_id=user_id, limit=20)
+        after = (page[-1].fecha, page[-1].hora_inicio, page[-1].id) if page else None
+
+    def warm(db):
+        reserva_index.invalidate(cancha_id, fecha)
+        crud_reserva.warm_reserva_index(db, cancha_id, fecha)
+
+    def grids(db):
+        crud_disponibilidad.grid_cache.clear()
+        crud_disponibilidad.get_day_grids(db, cancha_id, fecha, fecha + timedelta(days=6))
+
+    def batch(db):
+        items = [
+            ReservaCreate(cancha_id=cancha_id + i, fecha=fecha, hora_inicio=dtime(5), hora_fin=dtime(6))
+            for i in range(3)
+        ]
+        # The first item collides with a series added in this transaction, so the
+        # 'todo_o_nada' batch is rolled back and nothing is inserted
+        db.add(reserva_recurrente.ReservaRecurrente(
+            usuario_id=user_id, cancha_id=cancha_id, dia_semana=fecha.weekday(), fecha_inicio=fecha,
+            fecha_fin=fecha, hora_inicio=dtime(5), hora_fin=dtime(6), estado="aprobada"
+        ))
+        db.flush()
+        crud_reserva.create_reservas_batch(db, items, user_id=user_id, todo_o_nada=True)
+
+    yield from run_case("check_for_overlap", lambda db: crud_reserva.check_for_overlap(db, cancha_id, fecha, dtime(10), dtime(11)))
+    yield from run_case("warm_reserva_index", warm)
+    yield from run_case("create_reservas_batch (sweep load)", batch)
+    yield from run_case("get_user_reservas (first page)", lambda db: crud_reserva.get_user_reservas(db, user_id=user_id, limit=20))
+    yield from run_case("get_user_reservas (keyset page)", lambda db: crud_reserva.get_user_reservas(db, user_id=user_id, limit=20, after=after))
+    yield from run_case("get_day_grids", grids)
+    yield from run_case("find_series_conflict", lambda db: crud_recurrente.find_series_conflict(db, cancha_id, fecha, dtime(6), dtime(7)))
+    yield from run_case("series_occurrences", lambda db: list(crud_recurrente.series_occurrences(db, [cancha_id, cancha_id + 1], fecha, fecha + timedelta(days=30))))
+    yield from run_case("get_user_series", lambda db: crud_recurrente.get_user_series(db, user_id=user_id))
+    yield from run_case("get_user_reservas (historial)", lambda db: crud_reserva.get_user_reservas(db, user_id=user_id, limit=20, after=after, historial=True))
+    yield from run_case("archivable_query", lambda db: db.execute(crud_reserva.archivable_query(fecha, 500)).all())
+    yield from run_case("expirable_query", lambda db: db.execute(crud_reserva.expirable_query(utcnow(), 500)).all())
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    if not args.no_seed:
+        require_disposable_db(args)
+        print(f"Seeding {args.reservas} reservations on {engine.dialect.name}...")
+        seed(args.reservas, args.canchas, args.usuarios, args.series)
+
+    failures = 0
+    for name, statement, parameters in cases():
+        plan, full_scans = explain(statement, parameters)
+        verdict = "FULL SCAN" if full_scans else "ok"
+        failures += bool(full_scans)
+        print(f"[{verdict:^9}] {name}")
+        for step in plan:
+            print(f"              {step}")
+    if failures:
+        print(f"{failures} statement(s) read reservations with a full scan.")
+        sys.exit(1)
+    print("All hot-path queries use an index.")
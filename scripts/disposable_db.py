@@ -0,0 +1,38 @@
+# scripts/disposable_db.py
+"""
+Helpers for the scripts that reseed the database from scratch.
+
+They default DATABASE_URL to a local SQLite file, but an exported DATABASE_URL
+wins, and running one against the real MySQL database would wipe it. Any
+non-SQLite URL is refused unless --drop is given.
+
+reset_schema() rebuilds the tables through app/core/migrations.py, so every
+benchmark runs against the schema and indexes production actually gets.
+"""
+import os
+import re
+import sys
+
+def add_drop_argument(parser):
+    parser.add_argument(
+        "--drop", action="store_true",
+        help="Allow dropping and reseeding a non-SQLite DATABASE_URL (destroys its data)."
+    )
+
+def require_disposable_db(args):
+    url = os.environ.get("DATABASE_URL", "")
+    if url.startswith("sqlite") or args.drop:
+        return
+    shown = re.sub(r"//[^@/]*@", "//***@", url) # Hide credentials
+    sys.exit(
+        f"Refusing to run: this script drops every table of DATABASE_URL ({shown}).\n"
+        "Point it at a disposable database, or pass --drop to confirm."
+    )
+
+def reset_schema(engine):
+    """Drops every table, schema version included, and migrates from scratch."""
+    from app.core import migrations
+    from app.core.database import Base
+    Base.metadata.drop_all(bind=engine)
+    migrations.schema_version_table.drop(bind=engine, checkfirst=True)
+    migrations.migrate(engine)
@@ -1,6 +1,7 @@
 # scripts/init_db.py
 """
-Create the MySQL database (if missing) and run SQLAlchemy `create_all` to create tables.
+Create the MySQL database (if missing) and apply the schema migrations
+(app/core/migrations.py) to create or upgrade the tables.
 Run with the project's virtualenv activated:
 
 & ".venv\Scripts\Activate.ps1"
@@ -57,19 +58,18 @@ except Exception as e:
     print("ERROR: could not create database:", repr(e))
     sys.exit(1)
 
-# Now import the app's Base and models and create tables using the app's engine
+# Now import the app's migration runner and apply the pending migrations
 try:
-    from app.core.database import engine as app_engine, Base
-    # Import models so they are registered on Base.metadata
-    import app.models
+    from app.core.database import engine as app_engine
+    from app.core.migrations import migrate, SCHEMA_VERSION
 except Exception as e:
     print("ERROR: could not import application models:", repr(e))
     sys.exit(1)
 
 try:
-    print("Creating tables...")
-    Base.metadata.create_all(bind=app_engine)
-    print("Tables created successfully (if they did not exist).")
+    print("Applying migrations...")
+    applied = migrate(app_engine)
+    print(f"Schema at version {SCHEMA_VERSION} (applied now: {applied or 'none'}).")
 except Exception as e:
-    print("ERROR: could not create tables:", repr(e))
+    print("ERROR: could not migrate the database:", repr(e))
     sys.exit(1)
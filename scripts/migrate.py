@@ -0,0 +1,30 @@
+# scripts/migrate.py
+"""
+Applies the pending schema migrations (app/core/migrations.py) to DATABASE_URL.
+Run once per deploy, before starting the workers.
+
+python -m scripts.migrate            # upgrade to the latest version
+python -m scripts.migrate --status   # show applied and expected versions
+python -m scripts.migrate --target 3
+"""
+import argparse
+
+from app.core.database import engine
+from app.core.migrations import MIGRATIONS, SCHEMA_VERSION, current_version, migrate
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--target", type=int, default=None, help="Version to migrate to (default: latest).")
+parser.add_argument("--status", action="store_true", help="Only report the schema version.")
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    if args.status:
+        with engine.connect() as conn:
+            version = current_version(conn)
+        print(f"applied: {version if version is not None else 'none (no schema_version table)'}   expected: {SCHEMA_VERSION}")
+        for migration in MIGRATIONS:
+            mark = "x" if version is not None and migration.version <= version else " "
+            print(f"  [{mark}] {migration.version:3d} {migration.nombre}")
+    else:
+        applied = migrate(engine, target=args.target)
+        print(f"applied: {applied or 'nothing to do'}")
@@ -0,0 +1,55 @@
+# scripts/replica_local.py
+"""
+Local stand-in for a read replica: copies the primary SQLite file over the
+replica SQLite file every --interval seconds (the copy period acts as replica lag).
+
+Run the API against both files, then run this next to it:
+
+    DATABASE_URL=sqlite:///./primary.db REPLICA_DATABASE_URL=sqlite:///./replica.db uvicorn app.main:app
+    DATABASE_URL=sqlite:///./primary.db REPLICA_DATABASE_URL=sqlite:///./replica.db python -m scripts.replica_local --interval 10
+
+A booking is then visible in GET /reservas/mis right away for its author
+(read-your-writes), and for other readers of the replica after the next copy.
+Stopping this script and deleting the replica file exercises the health fallback.
+"""
+import argparse
+import os
+import sqlite3
+import time
+
+from sqlalchemy.engine import make_url
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--interval", type=float, default=5.0, help="Seconds between copies (simulated lag).")
+parser.add_argument("--once", action="store_true", help="Copy once and exit.")
+
+def sqlite_path(env_name: str) -> str:
+    url = os.getenv(env_name)
+    if not url:
+        raise SystemExit(f"{env_name} is not set.")
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite" or not parsed.database or parsed.database == ":memory:":
+        raise SystemExit(f"{env_name} must point to a SQLite file.")
+    return parsed.database
+
+def copy_once(primary_path: str, replica_path: str):
+    # The backup API gives a consistent snapshot even while the API is writing
+    source = sqlite3.connect(primary_path)
+    target = sqlite3.connect(replica_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    primary_path = sqlite_path("DATABASE_URL")
+    replica_path = sqlite_path("REPLICA_DATABASE_URL")
+    while True:
+        started = time.perf_counter()
+        copy_once(primary_path, replica_path)
+        print(f"{time.strftime('%H:%M:%S')} replica updated from {primary_path} in {(time.perf_counter() - started) * 1000:.1f} ms")
+        if args.once:
+            break
+        time.sleep(args.interval)
@@ -0,0 +1,119 @@
+# scripts/stress_reservas.py
+"""
+Multithreaded booking stress test for `create_reserva`.
+
+Many threads book random (and deliberately overlapping) slots on a handful of
+courts at once, each thread with its own session. Afterwards the script checks
+the `reservas` table for double-bookings and reports bookings/sec. It exits with
+status 1 if any two active reservations of the same court-day overlap.
+
+Point DATABASE_URL at a local, disposable database (defaults to a SQLite file):
+
+python -m scripts.stress_reservas --threads 32 --attempts 200
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from datetime import date, time as dtime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./stress_reservas.db")
+
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from app.core.database import SessionLocal, engine
+from app.models import usuario, cancha as models_cancha
+from app.crud import reserva as crud_reserva
+from app.schemas.reserva import ReservaCreate
+
+from scripts.disposable_db import add_drop_argument, require_disposable_db, reset_schema
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--threads", type=int, default=16)
+parser.add_argument("--attempts", type=int, default=100, help="Booking attempts per thread.")
+parser.add_argument("--canchas", type=int, default=4)
+parser.add_argument("--dias", type=int, default=3)
+add_drop_argument(parser)
+
+def seed(canchas: int):
+    """Fresh schema with one user and 'canchas' courts. Returns (user_id, cancha_ids)."""
+    reset_schema(engine)
+    with SessionLocal() as db:
+        db.add(usuario.Usuario(nombre="stress", telefono="000", email="stress@example.com", hashed_password="x"))
+        for i in range(canchas):
+            db.add(models_cancha.Cancha(nombre=f"Cancha {i}", tipo="fútbol", ubicacion="Centro", estado=True))
+        db.commit()
+        return db.query(usuario.Usuario.id).scalar(), [row.id for row in db.query(models_cancha.Cancha.id)]
+
+def worker(rnd_seed: int, attempts: int, user_id: int, cancha_ids: list, dias: list, results: dict, results_lock: threading.Lock):
+    rnd = random.Random(rnd_seed)
+    counts = {"ok": 0, "conflict": 0, "error": 0}
+    for _ in range(attempts):
+        # Half-hour starts with 1h/1.5h lengths make partial overlaps common
+        start_min = rnd.randrange(8 * 60, 21 * 60, 30)
+        end_min = start_min + rnd.choice((60, 90))
+        reserva = ReservaCreate(
+            cancha_id=rnd.choice(cancha_ids),
+            fecha=rnd.choice(dias),
+            hora_inicio=dtime(start_min // 60, start_min % 60),
+            hora_fin=dtime(end_min // 60, end_min % 60),
+        )
+        with SessionLocal() as db:
+            try:
+                crud_reserva.create_reserva(db, reserva, user_id=user_id)
+                counts["ok"] += 1
+            except HTTPException:
+                counts["conflict"] += 1
+            except Exception as e:
+                counts["error"] += 1
+                print("error:", repr(e), file=sys.stderr)
+    with results_lock:
+        for k, v in counts.items():
+            results[k] += v
+
+def count_double_booked() -> int:
+    """Pairs of active reservations of the same court-day that overlap."""
+    with engine.connect() as conn:
+        return conn.execute(text("""
+            SELECT COUNT(*) FROM reservas a JOIN reservas b
+              ON a.cancha_id = b.cancha_id AND a.fecha = b.fecha AND a.id < b.id
+             AND a.hora_inicio < b.hora_fin AND b.hora_inicio < a.hora_fin
+             WHERE a.estado IN ('pendiente', 'aprobada') AND b.estado IN ('pendiente', 'aprobada')
+        """)).scalar()
+
+def main(args) -> int:
+    user_id, cancha_ids = seed(args.canchas)
+    dias = [date.today() + timedelta(days=d) for d in range(args.dias)]
+    results = {"ok": 0, "conflict": 0, "error": 0}
+    results_lock = threading.Lock()
+
+    threads = [
+        threading.Thread(target=worker, args=(n, args.attempts, user_id, cancha_ids, dias, results, results_lock))
+        for n in range(args.threads)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    double_booked = count_double_booked()
+    attempts = args.threads * args.attempts
+    print(f"attempts:      {attempts} ({args.threads} threads)")
+    print(f"booked:        {results['ok']}")
+    print(f"conflicts:     {results['conflict']}")
+    print(f"errors:        {results['error']}")
+    print(f"elapsed:       {elapsed:.2f}s")
+    print(f"attempts/sec:  {attempts / elapsed:.1f}")
+    print(f"bookings/sec:  {results['ok'] / elapsed:.1f}")
+    print(f"double-booked: {double_booked}")
+    return 1 if double_booked else 0
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    require_disposable_db(args)
+    sys.exit(main(args))